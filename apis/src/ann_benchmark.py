@@ -0,0 +1,134 @@
+"""
+ANN check for large catalogs.
+
+Builds a synthetic catalog of L2-normalized embeddings, clustered like product embeddings (topic
+centres plus noise), and an IVF index with the `vector_index.params` of search_config.json. For a
+sample of held-out queries it then compares the IVF shortlist, re-ranked exactly as VectorIndex does
+for unfiltered queries, against the exact scan. It reports recall@k and p50 / p99 latency per query
+for each n_probe. BLAS is pinned to one thread, so the numbers are single-CPU. Exits non-zero when,
+at the configured n_probe, p99 misses TARGET_P99_MS or recall@k falls below MIN_RECALL.
+The gate targets a 1M-row catalog, the default; smaller runs are quicker but do not show that the
+latency target holds at that scale. At 1M x 384 the catalog takes ~1.5 GiB of RAM.
+
+    python ann_benchmark.py [rows] [queries] [n_probe ...]
+"""
+
+import os
+
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+import sys
+import time
+from sys import path as sys_path
+from os import path as os_path
+
+import numpy as np
+
+sys_path.append(os_path.realpath('../../'))
+sys_path.append(os_path.realpath('../'))
+sys_path.append(os_path.realpath('./'))
+
+from utils.operation_utils import read_json
+from utils.ann_utils import IVFIndex
+from utils.vector_utils import normalize_rows
+
+TARGET_P99_MS = 500.0
+MIN_RECALL = 0.9
+K = 10
+DIMENSION = 384
+TOPICS = 2000
+CHUNK = 65536
+NOISE = 1.5
+
+
+def synthetic_embeddings(rng: np.random.Generator, centres: np.ndarray, n: int) -> np.ndarray:
+    """
+    `n` normalized vectors around random topic centres (cosine to their centre ~ 0.55).
+    """
+    matrix = np.empty((n, centres.shape[1]), dtype=np.float32)
+    for start in range(0, n, CHUNK):
+        size = min(CHUNK, n - start)
+        noise = rng.standard_normal((size, centres.shape[1]), dtype=np.float32)
+        noise *= NOISE / np.sqrt(centres.shape[1])
+        matrix[start:start + size] = centres[rng.integers(0, len(centres), size)] + noise
+    return normalize_rows(matrix)
+
+
+def exact_top_k(matrix: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), k), dtype=np.int64)
+    for start in range(0, matrix.shape[0], CHUNK):
+        scores = queries @ matrix[start:start + CHUNK].T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        merged_scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+        merged_ids = np.concatenate([best_ids, top + start], axis=1)
+        keep = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+        best_ids = np.take_along_axis(merged_ids, keep, axis=1)
+    return best_ids
+
+
+def ivf_top_k(index: IVFIndex, matrix: np.ndarray, query: np.ndarray, k: int, n_probe: int) -> np.ndarray:
+    shortlist = index.candidates(query, n_probe=n_probe)
+    scores = matrix[shortlist] @ query
+    top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+    return shortlist[top[np.argsort(-scores[top])]]
+
+
+def percentiles(latencies: list) -> tuple:
+    ms = np.asarray(latencies) * 1000
+    return float(np.percentile(ms, 50)), float(np.percentile(ms, 99))
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    rows = int(args[0]) if len(args) > 0 else 1_000_000
+    n_queries = int(args[1]) if len(args) > 1 else 200
+    params = read_json(path="../configs/search_config.json").get("vector_index", {}).get("params", {})
+    configured_probe = int(params.get("n_probe") or 8)
+    probes = sorted({int(value) for value in args[2:]} | {configured_probe}) if len(args) > 2 else \
+        sorted({max(1, configured_probe // 2), configured_probe, configured_probe * 2})
+
+    rng = np.random.default_rng(7)
+    centres = normalize_rows(rng.standard_normal((TOPICS, DIMENSION), dtype=np.float32))
+    started = time.perf_counter()
+    matrix = synthetic_embeddings(rng, centres, rows)
+    queries = synthetic_embeddings(rng, centres, n_queries)
+    print(f"(*) Catalog: {rows} x {DIMENSION} float32 ({matrix.nbytes / 2 ** 20:.0f} MiB) "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    index = IVFIndex(**params).build(matrix)
+    truth = exact_top_k(matrix, queries, K)
+    exact_latencies = []
+    for query in queries[:min(n_queries, 50)]:
+        started = time.perf_counter()
+        scores = matrix @ query
+        np.argpartition(-scores, K - 1)[:K]
+        exact_latencies.append(time.perf_counter() - started)
+    p50, p99 = percentiles(exact_latencies)
+    print(f"(*) Exact scan: p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+
+    failed = False
+    for n_probe in probes:
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            found = ivf_top_k(index, matrix, query, K, n_probe)
+            latencies.append(time.perf_counter() - started)
+            hits += len(np.intersect1d(found, expected))
+        recall = hits / (K * n_queries)
+        p50, p99 = percentiles(latencies)
+        line = f"n_probe={n_probe}: recall@{K} {recall:.3f}, p50 {p50:.1f} ms, p99 {p99:.1f} ms"
+        if n_probe == configured_probe:
+            ok = p99 < TARGET_P99_MS and recall >= MIN_RECALL
+            failed |= not ok
+            print(f"(*) {'OK' if ok else 'FAILED'} {line} "
+                  f"(configured; target p99 < {TARGET_P99_MS:.0f} ms, recall >= {MIN_RECALL})")
+        else:
+            print(f"(*) {line}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
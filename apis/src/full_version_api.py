@@ -7,7 +7,9 @@ Backed by PostgreSQL + pgvector.
 import os
 import yaml
 import numpy as np
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, HTTPException
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
@@ -22,136 +24,63 @@ sys_path.append(os_path.realpath('./'))
 
 from utils.operation_utils import read_json
 from utils.db_utils import DBUtil
-from pricing_logic.transcript_parser import TranscriptParser
+from utils.async_db_utils import AsyncDBUtil
+from utils.startup_utils import StartupManager, StageNotReady, warm_up_encoder
+from utils.embedding_utils import build_embedding_backend
+from semantic_matcher import SemanticMatcher, IndexUnavailable
 from pricing_logic.labor_calc import parse_transcript, estimate_hours, compute_labor_cost
 from pricing_logic.vat_rules import get_vat_rate
 
 
 
-# -----------------------------
-# Embedding Generator
-# -----------------------------
-class Embedder:
-    def __init__(self, model):
-        self.model = model
-
-    def embed(self, data: str) -> List[float]:
-        if not data: return []
-        vector = self.model.encode(data)
-        # Convert to Python list of floats
-        return vector.tolist()
-
-
-# -----------------------------
-# Semantic Matcher
-# -----------------------------
-class SemanticMatcher:
-    def __init__(self, config: dict, model):
-        self.db_client = DBUtil(db_config=config)
-        self.embedder = Embedder(model=model)
-    
-    def __cosine_similarity(self, vec1, vec2):
-        vec1 = np.array(vec1)
-        vec2 = np.array(vec2)
-        return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
-
-    def search(self, query: str, region: Optional[str] = None,
-               vendor: Optional[str] = None, limit: int = 5) -> List[dict]:
-        vec = self.embedder.embed(query)
-        print(f"{query = }")
-        rows = []
-        try:
-            sql = """
-            SELECT *,
-                1 - (embedding <=> %s::float[]) AS similarity
-            FROM Products
-            WHERE TRUE
-            """
-            params = [vec]
-
-            if region:
-                sql += " AND region = %s"
-                params.append(region)
-            if vendor:
-                sql += " AND vendor = %s"
-                params.append(vendor)
-
-            sql += " ORDER BY similarity DESC LIMIT %s"
-            params.append(limit)
-
-            rows = self.db_client.execute_query(query=sql, params=params)
-            if not rows:
-                raise Exception("Empty rows!")
-            print(rows)
-        except:
-            sql = "SELECT * FROM Products;"
-            db_data = self.db_client.execute_query(query=sql)
-            scored = []
-            rows = []
-            for row in db_data:
-                emb = row[-1]
-                score = self.__cosine_similarity(vec, emb)
-                scored.append((score, row))
-                row = list(row)
-                row.append(score)
-                rows.append(row)
-            scored.sort(reverse=True, key=lambda x: x[0])  # higher = better
-            rows.sort(reverse=True, key=lambda x: x[-1])
-
-        results = []
-        for r in rows[:5]:
-            similarity = float(r[-1])
-            confidence = "high" if similarity > 0.8 else "medium" if similarity > 0.6 else "low"
-            # print(confidence)
-            r = [val if isinstance(val, str) else str(val or "") for val in r]
-            results.append({
-                "product_id": r[0],
-                "material_name": r[1],
-                "description": r[2],
-                "unit_price": r[3],
-                "unit": r[4],
-                "region": r[5],
-                "vendor": r[6],
-                "vat_rate": r[7],
-                "quality_score": r[8],
-                "updated_at": r[9],
-                "source": r[10],
-                "similarity_score": str(round(similarity, 4)),
-                "confidence_tier": confidence
-            })
-
-        return results
-
 class FeedbackDB:
-    def __init__(self, db_client):
+    CREATE_TABLE_QUERY = """
+    CREATE TABLE IF NOT EXISTS Feedback (
+        id SERIAL PRIMARY KEY,
+        task_id VARCHAR(60) NOT NULL,
+        quote_id VARCHAR(60) NOT NULL,
+        user_type VARCHAR(50) NOT NULL CHECK (user_type IN ('contractor', 'client')),
+        verdict VARCHAR(255) NOT NULL,
+        comments TEXT,
+        created_at TIMESTAMP DEFAULT NOW()
+    );
+    """
+    INSERT_QUERY = """
+        INSERT INTO Feedback (task_id, quote_id, user_type, verdict, comments, created_at)
+    VALUES (%s, %s, %s, %s, %s, NOW())
+    """
+
+    def __init__(self, db_client, async_db_client: Optional[AsyncDBUtil] = None):
         self.db_client = db_client
+        self.async_db_client = async_db_client
+        self._table_ready = False
+
+    @staticmethod
+    def _params(data: dict) -> list:
+        return [
+            data.get("task_id"),
+            data.get("quote_id"),
+            data.get("user_type"),
+            data.get("verdict"),
+            data.get("comments")
+        ]
 
     def save_feedback(self, data: dict):
         try:
-            table_confirmation_query = """
-            CREATE TABLE IF NOT EXISTS Feedback (
-                id SERIAL PRIMARY KEY,
-                task_id VARCHAR(60) NOT NULL,
-                quote_id VARCHAR(60) NOT NULL,
-                user_type VARCHAR(50) NOT NULL CHECK (user_type IN ('contractor', 'client')),
-                verdict VARCHAR(255) NOT NULL,
-                comments TEXT,
-                created_at TIMESTAMP DEFAULT NOW()
-            );
-            """
-            self.db_client.execute_query(table_confirmation_query)
-            insert_query = """
-                INSERT INTO Feedback (task_id, quote_id, user_type, verdict, comments, created_at)
-            VALUES (%s, %s, %s, %s, %s, NOW())
-            """
-            params = [
-                data.get("task_id"),
-                data.get("quote_id"),
-                data.get("user_type"),
-                data.get("verdict"),
-                data.get("comments")
-            ]
-            self.db_client.execute_query(insert_query, params=params)
+            self.db_client.execute_query(self.CREATE_TABLE_QUERY)
+            self.db_client.execute_query(self.INSERT_QUERY, params=self._params(data))
+            return {"status": "success", "message": "Feedback recorded"}
+        except Exception as ex:
+            return {"status": "fail", "message": f"Error -- {ex}"}
+
+    async def save_feedback_async(self, data: dict):
+        if self.async_db_client is None:
+            return await run_in_threadpool(self.save_feedback, data)
+        try:
+            if not self._table_ready:
+                await self.async_db_client.execute(self.CREATE_TABLE_QUERY)
+                self._table_ready = True
+            await self.async_db_client.execute(self.INSERT_QUERY, self._params(data))
             return {"status": "success", "message": "Feedback recorded"}
         except Exception as ex:
             return {"status": "fail", "message": f"Error -- {ex}"}
@@ -163,29 +92,116 @@ class FeedbackDB:
 db_config_path = f"../configs/db_creds.json"
 db_config = read_json(path=db_config_path)
 print(f"(*) Config: {db_config}")
+search_config_path = f"../configs/search_config.json"
+search_config = read_json(path=search_config_path)
+
+startup_config = search_config.get("startup", {})
 
-from sentence_transformers import SentenceTransformer
-# lightweight embedding model
-model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-matcher = SemanticMatcher(db_config, model=model)
-transcript_parser = TranscriptParser()
+
+def load_embedding_model():
+    # Heavy imports stay off the module import path: the backend imports torch / onnxruntime here.
+    # lightweight embedding model (all-MiniLM-L6-v2), backend selected in search_config["embedding"]
+    model = build_embedding_backend(**search_config.get("embedding", {}))
+    print(f"(*) Embedding model warm-up: {warm_up_encoder(model, startup_config.get('warmup_queries', [])):.2f}s")
+    return model
+
+
+def load_transcript_parser():
+    from pricing_logic.transcript_parser import TranscriptParser
+    parser = TranscriptParser()
+    if startup_config.get("warmup_transcript"):
+        parser.parse(startup_config["warmup_transcript"])
+    return parser
+
+
+def load_matcher():
+    async_db_config = search_config.get("async_db")
+    async_db = AsyncDBUtil(db_config=db_config, session_settings=search_config.get("pgvector"),
+                           pool=async_db_config) if async_db_config else None
+    return SemanticMatcher(db_config, model=startup.get("embedding_model"), search_config=search_config,
+                           async_db=async_db)
+
+
+def load_feedback_db():
+    matcher = startup.get("matcher")
+    return FeedbackDB(matcher.db_client, async_db_client=matcher.async_db)  # reuse DB clients
+
+
+# The spaCy pipeline loads concurrently with the embedding model; the matcher waits for the model.
+startup = StartupManager()
+startup.add_stage("embedding_model", load_embedding_model)
+startup.add_stage("transcript_parser", load_transcript_parser)
+startup.add_stage("matcher", load_matcher)
+startup.add_stage("feedback_db", load_feedback_db)
 app = FastAPI(title="Donizo User Exposed API")
 
 
+@app.on_event("startup")
+def start_background_loading():
+    startup.start()
+
+
+@app.on_event("shutdown")
+async def close_async_db():
+    try:
+        matcher = startup.require("matcher")
+    except StageNotReady:
+        return
+    if matcher.async_db is not None:
+        await matcher.async_db.close()
+
+
+@app.exception_handler(IndexUnavailable)
+async def index_unavailable(request, ex: IndexUnavailable):
+    # pgvector failed and the in-memory index cannot serve the query: retryable, not a server bug
+    return JSONResponse(status_code=503, content={"detail": f"Search index unavailable: {ex}"})
+
+
+def require_stage(name: str):
+    """
+    Resource loaded by the startup manager, or 503 while it is still warming up.
+    """
+    try:
+        return startup.require(name)
+    except StageNotReady as ex:
+        raise HTTPException(status_code=503, detail=f"Service warming up: {ex}")
+
+
 class MaterialMatchResponse(BaseModel):
     product_id: str
     material_name: str
     description: str
-    unit_price: str
+    unit_price: Optional[float] = None
     unit: Optional[str] = None
     region: Optional[str] = None
     vendor: Optional[str] = None
-    vat_rate: Optional[str] = None
+    vat_rate: Optional[float] = None
+    quality_score: Optional[float] = None
     updated_at: Optional[str] = None
     source: Optional[str] = None
     similarity_score: float
     confidence_tier: str
 
+
+class MaterialQuery(BaseModel):
+    query: str
+    region: Optional[str] = None
+    vendor: Optional[str] = None
+    limit: int = 5
+
+
+class MaterialBatchRequest(BaseModel):
+    items: List[MaterialQuery]
+
+
+class MaterialBatchResult(BaseModel):
+    query: str
+    matches: List[MaterialMatchResponse]
+
+
+class MaterialBatchResponse(BaseModel):
+    results: List[MaterialBatchResult]
+
 class ProposalInvoiceRequest(BaseModel):
     transcript: str
 
@@ -215,8 +231,18 @@ def de_duplicate_products(items: list[dict]):
     return unique_list
 
 
+@app.get("/health")
+def get_health():
+    """
+    Readiness probe: 200 once every required model/index is loaded, 503 while warming up
+    (per-stage status and load timings in the body).
+    """
+    status = startup.status()
+    return JSONResponse(status_code=200 if status["status"] == "ready" else 503, content=status)
+
+
 @app.get("/material-price", response_model=List[MaterialMatchResponse])
-def get_material_price(query: str = Query(..., description="Contractor query"),
+async def get_material_price(query: str = Query(..., description="Contractor query"),
                        region: Optional[str] = None,
                        vendor: Optional[str] = None,
                        limit: int = 5):
@@ -224,11 +250,65 @@ def get_material_price(query: str = Query(..., description="Contractor query"),
     Semantic material match endpoint.
     Example: /material-price?query=carrelage beige 60x60&region=Île-de-France
     """
-    return matcher.search(query, region=region, vendor=vendor, limit=limit)
+    matcher = require_stage("matcher")
+    return await matcher.search_async(query, region=region, vendor=vendor, limit=limit, endpoint="/material-price")
+
+
+@app.post("/material-price/batch", response_model=MaterialBatchResponse)
+async def get_material_price_batch(request: MaterialBatchRequest):
+    """
+    Batched semantic material match: one encode and one matrix product for all items.
+    Results are returned in the same order as `items`.
+    """
+    matcher = require_stage("matcher")
+    items = [item.dict() for item in request.items]
+    # One batched encode + matrix product: CPU-bound, so it runs in the threadpool
+    matches = await run_in_threadpool(matcher.search_batch, items, endpoint="/material-price/batch")
+    return {"results": [{"query": item["query"], "matches": found} for item, found in zip(items, matches)]}
+
+
+@app.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Hit/miss counters of the query-embedding cache and per-endpoint search-result cache.
+    """
+    matcher = require_stage("matcher")
+    cache = matcher.embedder.cache
+    return {
+        "embedding_cache": cache.stats() if cache is not None else None,
+        "search_results": matcher.result_cache.stats() if matcher.result_cache is not None else None,
+    }
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Runtime metrics: embedding scheduler queue depth / batch sizes, index size and DB pool usage.
+    """
+    matcher = require_stage("matcher")
+    batcher = matcher.embedder.batcher
+    return {
+        "embedding_batcher": batcher.stats() if batcher is not None else None,
+        "indexed_rows": len(matcher.index),
+        "index_memory": matcher.index.memory_usage(),
+        "db_pool": matcher.db_client.pool_stats(),
+        "async_db_pool": matcher.async_db.pool_stats() if matcher.async_db is not None else None,
+    }
+
+
+@app.post("/refresh-index")
+def refresh_index():
+    """
+    Reload the in-memory vector index after a catalog ingest.
+    """
+    matcher = require_stage("matcher")
+    return {"status": "success", "indexed_rows": matcher.refresh_index()}
 
 
 @app.post("/generate-proposal", response_model=ProposalInvoiceResponse)
 def get_proposal(request: ProposalInvoiceRequest):
+    matcher = require_stage("matcher")
+    transcript_parser = require_stage("transcript_parser")
     result = transcript_parser.parse(request.transcript)
     print(f"{result = }")
     renovation_type = result.get('renovation_type', "Tile bathroom walls")
@@ -246,9 +326,12 @@ def get_proposal(request: ProposalInvoiceRequest):
         vat_rate = max(vat_rate, get_vat_rate(tname, city))
         total_hours += hours
     prices = []
-    for material in result["materials"]:
-        query = f"{result.get('vendor')} " + material
-        current_price = get_material_price(query=query, region=result.get("region"))[0]
+    material_queries = [{"query": f"{result.get('vendor')} " + material, "region": result.get("region"), "limit": 1}
+                        for material in result["materials"]]
+    for matches in matcher.search_batch(material_queries, endpoint="/generate-proposal"):
+        if not matches:
+            continue
+        current_price = matches[0]
         final_margin_price += (1 + margin) * (1 + float(current_price.get("vat", vat_rate)))
         prices.append(current_price)
     prices = de_duplicate_products(items=prices)
@@ -264,13 +347,13 @@ def get_proposal(request: ProposalInvoiceRequest):
                 "confidence_score": round(confidence_score, 2)
             }
         ],
-        "total_estimate": math.ceil(sum(map(lambda p: float(p["unit_price"].replace(".", "").replace(",", ".")), prices)) + final_margin_price + labor_cost)
+        "total_estimate": math.ceil(sum(p["unit_price"] or 0 for p in prices) + final_margin_price + labor_cost)
     }
 
 
 @app.post("/feedback", response_model=FeedbackResponse)
-def post_feedback(feedback: FeedbackRequest):
-    feedback_db = FeedbackDB(matcher.db_client)  # reuse DB client
-    result = feedback_db.save_feedback(feedback.dict())
+async def post_feedback(feedback: FeedbackRequest):
+    feedback_db = require_stage("feedback_db")
+    result = await feedback_db.save_feedback_async(feedback.dict())
     return result
 
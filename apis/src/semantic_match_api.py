@@ -7,7 +7,8 @@ Backed by PostgreSQL + pgvector.
 import os
 import yaml
 import numpy as np
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
@@ -21,133 +22,109 @@ sys_path.append(os_path.realpath('./'))
 
 from utils.operation_utils import read_json
 from utils.db_utils import DBUtil
+from utils.startup_utils import StartupManager, StageNotReady, warm_up_encoder
+from utils.embedding_utils import build_embedding_backend
+from semantic_matcher import SemanticMatcher, IndexUnavailable
 
 
 
 # -----------------------------
-# Embedding Generator
+# FastAPI App
 # -----------------------------
-class Embedder:
-    def __init__(self, model):
-        self.model = model
+db_config_path = f"../configs/db_creds.json"
+db_config = read_json(path=db_config_path)
+print(f"(*) Config: {db_config}")
+search_config_path = f"../configs/search_config.json"
+search_config = read_json(path=search_config_path)
 
-    def embed(self, data: str) -> List[float]:
-        if not data: return []
-        vector = self.model.encode(data)
-        # Convert to Python list of floats
-        return vector.tolist()
+startup_config = search_config.get("startup", {})
 
 
-# -----------------------------
-# Semantic Matcher
-# -----------------------------
-class SemanticMatcher:
-    def __init__(self, config: dict, model):
-        self.db_client = DBUtil(db_config=config)
-        self.embedder = Embedder(model=model)
-    
-    def __cosine_similarity(self, vec1, vec2):
-        vec1 = np.array(vec1)
-        vec2 = np.array(vec2)
-        return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
-
-    def search(self, query: str, region: Optional[str] = None,
-               vendor: Optional[str] = None, limit: int = 5) -> List[dict]:
-        vec = self.embedder.embed(query)
-        rows = []
-        try:
-            sql = """
-            SELECT *,
-                1 - (embedding <=> %s::float[]) AS similarity
-            FROM Products
-            WHERE TRUE
-            """
-            params = [vec]
-
-            if region:
-                sql += " AND region = %s"
-                params.append(region)
-            if vendor:
-                sql += " AND vendor = %s"
-                params.append(vendor)
-
-            sql += " ORDER BY similarity DESC LIMIT %s"
-            params.append(limit)
-
-            rows = self.db_client.execute_query(query=sql, params=params)
-            if not rows:
-                raise Exception("Empty rows!")
-            print(rows)
-        except:
-            sql = "SELECT * FROM Products;"
-            db_data = self.db_client.execute_query(query=sql)
-            scored = []
-            rows = []
-            for row in db_data:
-                emb = row[-1]
-                score = self.__cosine_similarity(vec, emb)
-                scored.append((score, row))
-                row = list(row)
-                row.append(score)
-                rows.append(row)
-            scored.sort(reverse=True, key=lambda x: x[0])  # higher = better
-            rows.sort(reverse=True, key=lambda x: x[-1])
-
-        results = []
-        for r in rows[:5]:
-            similarity = float(r[-1])
-            confidence = "high" if similarity > 0.8 else "medium" if similarity > 0.6 else "low"
-            # print(confidence)
-            r = [val if isinstance(val, str) else str(val or "") for val in r]
-            results.append({
-                "product_id": r[0],
-                "material_name": r[1],
-                "description": r[2],
-                "unit_price": r[3],
-                "unit": r[4],
-                "region": r[5],
-                "vendor": r[6],
-                "vat_rate": r[7],
-                "quality_score": r[8],
-                "updated_at": r[9],
-                "source": r[10],
-                "similarity_score": str(round(similarity, 4)),
-                "confidence_tier": confidence
-            })
-
-        return results
+def load_embedding_model():
+    # Heavy imports stay off the module import path: the backend imports torch / onnxruntime here.
+    # lightweight embedding model (all-MiniLM-L6-v2), backend selected in search_config["embedding"]
+    model = build_embedding_backend(**search_config.get("embedding", {}))
+    print(f"(*) Embedding model warm-up: {warm_up_encoder(model, startup_config.get('warmup_queries', [])):.2f}s")
+    return model
 
 
-# -----------------------------
-# FastAPI App
-# -----------------------------
-db_config_path = f"../configs/db_creds.json"
-db_config = read_json(path=db_config_path)
-print(f"(*) Config: {db_config}")
+def load_matcher():
+    return SemanticMatcher(db_config, model=startup.get("embedding_model"), search_config=search_config)
 
-from sentence_transformers import SentenceTransformer
-# lightweight embedding model
-model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
 
-matcher = SemanticMatcher(db_config, model=model)
+startup = StartupManager()
+startup.add_stage("embedding_model", load_embedding_model)
+startup.add_stage("matcher", load_matcher)
 app = FastAPI(title="Donizo Semantic Match API")
 
 
+@app.on_event("startup")
+def start_background_loading():
+    startup.start()
+
+
+@app.exception_handler(IndexUnavailable)
+async def index_unavailable(request, ex: IndexUnavailable):
+    # pgvector failed and the in-memory index cannot serve the query: retryable, not a server bug
+    return JSONResponse(status_code=503, content={"detail": f"Search index unavailable: {ex}"})
+
+
+def require_stage(name: str):
+    """
+    Resource loaded by the startup manager, or 503 while it is still warming up.
+    """
+    try:
+        return startup.require(name)
+    except StageNotReady as ex:
+        raise HTTPException(status_code=503, detail=f"Service warming up: {ex}")
+
+
 class MaterialMatchResponse(BaseModel):
     product_id: str
     material_name: str
     description: str
-    unit_price: str
+    unit_price: Optional[float] = None
     unit: Optional[str] = None
     region: Optional[str] = None
     vendor: Optional[str] = None
-    vat_rate: Optional[str] = None
+    vat_rate: Optional[float] = None
+    quality_score: Optional[float] = None
     updated_at: Optional[str] = None
     source: Optional[str] = None
     similarity_score: float
     confidence_tier: str
 
 
+class MaterialQuery(BaseModel):
+    query: str
+    region: Optional[str] = None
+    vendor: Optional[str] = None
+    limit: int = 5
+
+
+class MaterialBatchRequest(BaseModel):
+    items: List[MaterialQuery]
+
+
+class MaterialBatchResult(BaseModel):
+    query: str
+    matches: List[MaterialMatchResponse]
+
+
+class MaterialBatchResponse(BaseModel):
+    results: List[MaterialBatchResult]
+
+
+@app.get("/health")
+def get_health():
+    """
+    Readiness probe: 200 once every required model/index is loaded, 503 while warming up
+    (per-stage status and load timings in the body).
+    """
+    status = startup.status()
+    return JSONResponse(status_code=200 if status["status"] == "ready" else 503, content=status)
+
+
 @app.get("/material-price", response_model=List[MaterialMatchResponse])
 def get_material_price(query: str = Query(..., description="Contractor query"),
                        region: Optional[str] = None,
@@ -157,5 +134,55 @@ def get_material_price(query: str = Query(..., description="Contractor query"),
     Semantic material match endpoint.
     Example: /material-price?query=carrelage beige 60x60&region=Île-de-France
     """
-    return matcher.search(query, region=region, vendor=vendor, limit=limit)
+    matcher = require_stage("matcher")
+    return matcher.search(query, region=region, vendor=vendor, limit=limit, endpoint="/material-price")
+
+
+@app.post("/material-price/batch", response_model=MaterialBatchResponse)
+def get_material_price_batch(request: MaterialBatchRequest):
+    """
+    Batched semantic material match: one encode and one matrix product for all items.
+    Results are returned in the same order as `items`.
+    """
+    matcher = require_stage("matcher")
+    items = [item.dict() for item in request.items]
+    matches = matcher.search_batch(items, endpoint="/material-price/batch")
+    return {"results": [{"query": item["query"], "matches": found} for item, found in zip(items, matches)]}
+
+
+@app.get("/cache-stats")
+def get_cache_stats():
+    """
+    Hit/miss counters of the query-embedding cache and per-endpoint search-result cache.
+    """
+    matcher = require_stage("matcher")
+    cache = matcher.embedder.cache
+    return {
+        "embedding_cache": cache.stats() if cache is not None else None,
+        "search_results": matcher.result_cache.stats() if matcher.result_cache is not None else None,
+    }
+
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Runtime metrics: embedding scheduler queue depth / batch sizes, index size and DB pool usage.
+    """
+    matcher = require_stage("matcher")
+    batcher = matcher.embedder.batcher
+    return {
+        "embedding_batcher": batcher.stats() if batcher is not None else None,
+        "indexed_rows": len(matcher.index),
+        "index_memory": matcher.index.memory_usage(),
+        "db_pool": matcher.db_client.pool_stats(),
+    }
+
+
+@app.post("/refresh-index")
+def refresh_index():
+    """
+    Reload the in-memory vector index after a catalog ingest.
+    """
+    matcher = require_stage("matcher")
+    return {"status": "success", "indexed_rows": matcher.refresh_index()}
 
@@ -0,0 +1,425 @@
+"""
+semantic_matcher.py
+
+Responsibilities:
+- Query embedding (cache + micro-batching) and semantic search over the catalog, shared by
+  semantic_match_api.py and full_version_api.py.
+- pgvector search through DBUtil (or an AsyncDBUtil pool for async handlers), with the in-memory
+  VectorIndex for batched searches. With `hybrid` configured, text queries still go to pgvector:
+  its `hybrid.pgvector_candidates` nearest rows are re-ranked with BM25 (VectorIndex.fuse_lexical).
+- pgvector failures (`psycopg2.Error`, or the errors DBUtil reports by returning None) fall back to
+  the in-memory index; when that index cannot answer either, `IndexUnavailable` is raised (503).
+- Catalog versioning: the result cache is keyed on the catalog version bumped by db_ingest. A new
+  version is adopted (and the result cache cleared) only once the index has been reloaded, so results
+  of the previous index are never cached under the new version.
+- Expose:
+    - PRODUCT_COLUMNS
+    - IndexUnavailable
+    - Embedder(model, cache=None, batcher=None)
+    - SemanticMatcher(config, model, search_config=None, async_db=None)
+"""
+
+import asyncio
+import json
+import threading
+import time
+from typing import List, Optional
+
+import psycopg2
+from fastapi.concurrency import run_in_threadpool
+
+from utils.db_utils import DBUtil
+from utils.cache_utils import EmbeddingCache, SearchResultCache
+from utils.batching_utils import EmbeddingBatcher
+from utils.vector_utils import VectorIndex, to_pgvector
+from utils.snapshot_utils import latest_snapshot
+
+
+# -----------------------------
+# Embedding Generator
+# -----------------------------
+class Embedder:
+    def __init__(self, model, cache: Optional[EmbeddingCache] = None,
+                 batcher: Optional[EmbeddingBatcher] = None):
+        self.model = model
+        self.cache = cache
+        # Shared micro-batching scheduler: concurrent requests are encoded together
+        self.batcher = batcher
+
+    def _encode(self, data: str):
+        return self.batcher.encode(data) if self.batcher is not None else self.model.encode(data)
+
+    def embed(self, data: str) -> List[float]:
+        if not data: return []
+        if self.cache is not None:
+            vector = self.cache.get_or_compute(data, self._encode)
+        else:
+            vector = self._encode(data)
+        # Convert to Python list of floats
+        return vector.tolist()
+
+    async def embed_async(self, data: str) -> List[float]:
+        """
+        Event-loop friendly `embed`: the model runs on the batcher thread (or the default executor),
+        never on the loop itself.
+        """
+        if not data: return []
+        vector = self.cache.get(data) if self.cache is not None else None
+        if vector is None:
+            if self.batcher is not None:
+                vector = await self.batcher.encode_async(data)
+            else:
+                vector = await asyncio.get_running_loop().run_in_executor(None, self.model.encode, data)
+            if self.cache is not None:
+                vector = self.cache.put(data, vector)
+        return vector.tolist()
+
+    def embed_batch(self, data: List[str]) -> List[List[float]]:
+        """
+        Embed many texts with a single `model.encode` call for the cache misses.
+        """
+        vectors = [None] * len(data)
+        pending = []
+        for i, text in enumerate(data):
+            if not text:
+                vectors[i] = []
+                continue
+            cached = self.cache.get(text) if self.cache is not None else None
+            if cached is not None:
+                vectors[i] = cached.tolist()
+            else:
+                pending.append(i)
+        if pending:
+            texts = [data[i] for i in pending]
+            encoded = self.batcher.encode_many(texts) if self.batcher is not None else self.model.encode(texts)
+            for i, vector in zip(pending, encoded):
+                if self.cache is not None:
+                    self.cache.put(data[i], vector)
+                vectors[i] = vector.tolist()
+        return vectors
+
+
+# -----------------------------
+# Semantic Matcher
+# -----------------------------
+PRODUCT_COLUMNS = ("PRODUCT_ID, MATERIAL_NAME, DESCRIPTION, UNIT_PRICE, UNIT, REGION, VENDOR, "
+                   "VAT_RATE, QUALITY_SCORE, UPDATED_AT, SOURCE")
+
+
+class IndexUnavailable(RuntimeError):
+    """
+    Neither pgvector nor the in-memory index can answer: the index is not loaded or does not match
+    the query embedding (e.g. another model's dimension).
+    """
+
+
+class SemanticMatcher:
+    def __init__(self, config: dict, model, search_config: Optional[dict] = None, async_db=None):
+        search_config = search_config or {}
+        self.db_client = DBUtil(db_config=config, session_settings=search_config.get("pgvector"),
+                                pool=search_config.get("db_pool"))
+        # Optional AsyncDBUtil: pgvector queries of the async handlers go through its asyncpg pool
+        self.async_db = async_db
+        cache_config = search_config.get("embedding_cache")
+        batcher_config = search_config.get("embedding_batcher")
+        self.embedder = Embedder(model=model, cache=EmbeddingCache(**cache_config) if cache_config else None,
+                                 batcher=EmbeddingBatcher(model.encode, **batcher_config) if batcher_config else None)
+        index_config = search_config.get("vector_index", {})
+        self.index = VectorIndex(ann_backend=index_config.get("backend"),
+                                 ann_params=index_config.get("params"),
+                                 ann_path=index_config.get("path"),
+                                 ann_min_rows=index_config.get("min_rows", 50000),
+                                 hybrid=search_config.get("hybrid"),
+                                 quantization=search_config.get("quantization"))
+        self.pgvector_candidates = (search_config.get("hybrid") or {}).get("pgvector_candidates", 40)
+        self.snapshot_dir = search_config.get("snapshot", {}).get("directory")
+        result_cache_config = dict(search_config.get("result_cache") or {})
+        self.version_check_seconds = result_cache_config.pop("version_check_seconds", 5)
+        self.result_cache = SearchResultCache(**result_cache_config) if result_cache_config else None
+        self._version_lock = threading.Lock()
+        self._reloading = False
+        self._catalog_version = self._read_catalog_version()
+        self._version_checked_at = time.time()
+        self.refresh_index()
+
+    def refresh_index(self) -> int:
+        """
+        (Re)load the in-memory vector index: from the latest ingest snapshot (memory-mapped,
+        shared by all workers) when one exists, otherwise from the Products table.
+        """
+        snapshot = latest_snapshot(self.snapshot_dir) if self.snapshot_dir else None
+        if snapshot is not None:
+            return self.index.load_snapshot(snapshot)
+        sql = f"SELECT {PRODUCT_COLUMNS}, EMBEDDING::real[] FROM Products;"
+        db_data = self.db_client.execute_query(query=sql) or []
+        return self.index.build(db_data, quantizer_params=self.load_quantizer_params())
+
+    def load_quantizer_params(self) -> Optional[dict]:
+        """
+        Quantizer parameters fitted and shipped by the ingest job (None -> fitted locally).
+        """
+        mode = self.index.quantization.get("mode")
+        if not mode or mode == "float32":
+            return None
+        sql = "SELECT VALUE FROM CATALOG_METADATA WHERE KEY = %s;"
+        rows = self.db_client.execute_query(query=sql, params=[f"quantization:{mode}"])
+        return json.loads(rows[0][0]) if rows else None
+
+    def _read_catalog_version(self) -> Optional[str]:
+        sql = "SELECT VALUE FROM CATALOG_METADATA WHERE KEY = 'catalog_version';"
+        rows = self.db_client.execute_query(query=sql)
+        return rows[0][0] if rows else None
+
+    def catalog_version(self) -> Optional[str]:
+        """
+        Catalog version bumped by db_ingest on every load, polled at most every `version_check_seconds`.
+        A new version reloads the in-memory index in the background; see `_observe_catalog_version`.
+        """
+        if self._version_check_due():
+            self._observe_catalog_version(self._read_catalog_version())
+        return self._catalog_version
+
+    async def catalog_version_async(self) -> Optional[str]:
+        if self._version_check_due():
+            sql = "SELECT VALUE FROM CATALOG_METADATA WHERE KEY = 'catalog_version';"
+            try:
+                version = await self.async_db.fetchval(sql)
+            except Exception as ex:
+                print(f"(*) Error reading catalog version: {ex}")
+                version = self._catalog_version
+            self._observe_catalog_version(version)
+        return self._catalog_version
+
+    def _version_check_due(self) -> bool:
+        now = time.time()
+        if now - self._version_checked_at < self.version_check_seconds:
+            return False
+        self._version_checked_at = now
+        return True
+
+    def _observe_catalog_version(self, version: Optional[str]) -> None:
+        """
+        Start reloading the index for a new catalog version (one reload at a time). Until the reload
+        has finished, requests keep using -- and caching under -- the previous version.
+        """
+        if version == self._catalog_version:
+            return
+        with self._version_lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        print(f"(*) Catalog version changed: {self._catalog_version} -> {version}, reloading the index")
+        threading.Thread(target=self._switch_catalog_version, args=(version,), daemon=True).start()
+
+    def _switch_catalog_version(self, version: Optional[str]) -> None:
+        try:
+            self.refresh_index()
+            self._catalog_version = version
+            if self.result_cache is not None:
+                self.result_cache.set_version(version)
+        except Exception as ex:
+            # Keep serving the previous version; the next version check retries
+            print(f"(*) Error reloading the index for catalog version {version}: {ex}")
+        finally:
+            with self._version_lock:
+                self._reloading = False
+
+    def _cache_key(self, query: str, region: Optional[str], vendor: Optional[str], limit: int) -> Optional[tuple]:
+        if self.result_cache is None or not query:
+            return None
+        version = self.catalog_version()
+        self.result_cache.set_version(version)
+        return self.result_cache.make_key(query, region, vendor, limit, version)
+
+    async def _cache_key_async(self, query: str, region: Optional[str], vendor: Optional[str],
+                               limit: int) -> Optional[tuple]:
+        if self.result_cache is None or not query:
+            return None
+        version = await self.catalog_version_async()
+        self.result_cache.set_version(version)
+        return self.result_cache.make_key(query, region, vendor, limit, version)
+
+    def search(self, query: str, region: Optional[str] = None,
+               vendor: Optional[str] = None, limit: int = 5, endpoint: str = "search") -> List[dict]:
+        key = self._cache_key(query, region, vendor, limit)
+        cached = self.result_cache.get(key, endpoint=endpoint) if key else None
+        if cached is not None:
+            return cached
+        vec = self.embedder.embed(query)
+        results = self.search_vector(vec, region=region, vendor=vendor, limit=limit, text=query)
+        if key:
+            self.result_cache.put(key, results)
+        return results
+
+    async def search_async(self, query: str, region: Optional[str] = None,
+                           vendor: Optional[str] = None, limit: int = 5, endpoint: str = "search") -> List[dict]:
+        """
+        `search` for async handlers: pgvector queries go through the asyncpg pool and CPU-bound work
+        (encoding, in-memory scoring) runs off the event loop. Without an `async_db` client the
+        blocking `search` is run in the threadpool.
+        """
+        if self.async_db is None:
+            return await run_in_threadpool(self.search, query, region=region, vendor=vendor,
+                                           limit=limit, endpoint=endpoint)
+        key = await self._cache_key_async(query, region, vendor, limit)
+        cached = self.result_cache.get(key, endpoint=endpoint) if key else None
+        if cached is not None:
+            return cached
+        vec = await self.embedder.embed_async(query)
+        results = await self.search_vector_async(vec, region=region, vendor=vendor, limit=limit, text=query)
+        if key:
+            self.result_cache.put(key, results)
+        return results
+
+    async def search_vector_async(self, vec: List[float], region: Optional[str] = None,
+                                  vendor: Optional[str] = None, limit: int = 5,
+                                  text: Optional[str] = None) -> List[dict]:
+        fuse = bool(text) and self.index.is_hybrid
+        try:
+            # The vector is sent as text: asyncpg has no codec for the pgvector type.
+            sql = f"""
+            SELECT {PRODUCT_COLUMNS},
+                1 - (embedding <=> %s::text::vector) AS similarity
+            FROM Products
+            WHERE embedding IS NOT NULL
+            """
+            pg_vec = to_pgvector(vec)
+            params = [pg_vec]
+            if region:
+                sql += " AND region = %s"
+                params.append(region)
+            if vendor:
+                sql += " AND vendor = %s"
+                params.append(vendor)
+            sql += " ORDER BY embedding <=> %s::text::vector LIMIT %s"
+            params.extend([pg_vec, self._pgvector_limit(limit, fuse)])
+
+            rows = [tuple(record) for record in await self.async_db.fetch(sql, params)]
+        except self.async_db.DATABASE_ERRORS as ex:
+            print(f"(*) Falling back to the in-memory index: {ex}")
+            rows = None
+        if not rows:
+            rows = await run_in_threadpool(self._search_index, vec, region, vendor, limit, text)
+        elif fuse:
+            rows = await run_in_threadpool(self.index.fuse_lexical, rows, text, limit)
+        return self.to_results(rows, limit=limit)
+
+    def search_vector(self, vec: List[float], region: Optional[str] = None,
+                      vendor: Optional[str] = None, limit: int = 5, text: Optional[str] = None) -> List[dict]:
+        fuse = bool(text) and self.index.is_hybrid
+        try:
+            sql = f"""
+            SELECT {PRODUCT_COLUMNS},
+                1 - (embedding <=> %s::vector) AS similarity
+            FROM Products
+            WHERE embedding IS NOT NULL
+            """
+            pg_vec = to_pgvector(vec)
+            params = [pg_vec]
+
+            if region:
+                sql += " AND region = %s"
+                params.append(region)
+            if vendor:
+                sql += " AND vendor = %s"
+                params.append(vendor)
+
+            # Order by the raw distance expression so the HNSW/IVFFlat index is used.
+            sql += " ORDER BY embedding <=> %s::vector LIMIT %s"
+            params.extend([pg_vec, self._pgvector_limit(limit, fuse)])
+
+            # DBUtil reports query errors itself and returns None
+            rows = self.db_client.execute_query(query=sql, params=params)
+        except psycopg2.Error as ex:
+            print(f"(*) Falling back to the in-memory index: {ex}")
+            rows = None
+        if not rows:
+            rows = self._search_index(vec, region, vendor, limit, text)
+        elif fuse:
+            rows = self.index.fuse_lexical(rows, text, limit)
+        return self.to_results(rows, limit=limit)
+
+    def _pgvector_limit(self, limit: int, fuse: bool) -> int:
+        """
+        Rows fetched from pgvector: `limit`, or the candidates to re-rank with BM25. Note that an HNSW
+        scan returns at most `hnsw.ef_search` rows.
+        """
+        return max(limit, self.pgvector_candidates) if fuse else limit
+
+    def _search_index(self, vec: List[float], region: Optional[str], vendor: Optional[str], limit: int,
+                      text: Optional[str] = None) -> list:
+        """
+        Search the in-memory index, loading it first if needed; IndexUnavailable when it cannot answer.
+        """
+        if not self.index.is_ready:
+            try:
+                self.refresh_index()
+            except (OSError, ValueError) as ex:
+                print(f"(*) Error loading the in-memory index: {ex}")
+        if not self.index.is_ready:
+            raise IndexUnavailable("the vector index is not loaded")
+        try:
+            return self.index.search(vec, region=region, vendor=vendor, limit=limit, text=text)
+        except ValueError as ex:  # query / index dimension mismatch
+            raise IndexUnavailable(str(ex)) from ex
+
+    def search_batch(self, items: List[dict], endpoint: str = "search_batch") -> List[List[dict]]:
+        """
+        Search many `{query, region, vendor, limit}` items: cached items are answered from the
+        result cache, the rest go through one batched encode and one matrix-matrix product
+        against the in-memory index. Results are in input order.
+        """
+        keys = [self._cache_key(item.get("query"), item.get("region"), item.get("vendor"), item.get("limit") or 5)
+                for item in items]
+        results = [self.result_cache.get(key, endpoint=endpoint) if key else None for key in keys]
+        pending = [i for i, found in enumerate(results) if found is None]
+        if pending:
+            for i, found in zip(pending, self._search_batch_uncached([items[i] for i in pending])):
+                results[i] = found
+                if keys[i]:
+                    self.result_cache.put(keys[i], found)
+        return results
+
+    def _search_batch_uncached(self, items: List[dict]) -> List[List[dict]]:
+        vectors = self.embedder.embed_batch([item.get("query") for item in items])
+        filters = [{"region": item.get("region"), "vendor": item.get("vendor"),
+                    "limit": item.get("limit") or 5, "text": item.get("query")} for item in items]
+        if not self.index.is_ready:
+            self.refresh_index()
+        if not self.index.is_ready:
+            return [self.search_vector(vec, **params) for vec, params in zip(vectors, filters)]
+        try:
+            batch_rows = self.index.search_batch(vectors, filters)
+        except ValueError as ex:  # query / index dimension mismatch
+            raise IndexUnavailable(str(ex)) from ex
+        return [self.to_results(rows, limit=params["limit"]) for rows, params in zip(batch_rows, filters)]
+
+    def to_results(self, rows: list, limit: int = 5) -> List[dict]:
+        """
+        Format (metadata..., similarity) rows into response dicts. Price, VAT and quality are
+        typed at ingest (NUMERIC columns), so they are returned as numbers.
+        """
+        as_text = lambda val: val if isinstance(val, str) else str(val or "")
+        as_number = lambda val: float(val) if val is not None else None
+        results = []
+        for r in rows[:limit]:
+            similarity = float(r[-1])
+            confidence = "high" if similarity > 0.8 else "medium" if similarity > 0.6 else "low"
+            # print(confidence)
+            results.append({
+                "product_id": as_text(r[0]),
+                "material_name": as_text(r[1]),
+                "description": as_text(r[2]),
+                "unit_price": as_number(r[3]),
+                "unit": as_text(r[4]),
+                "region": as_text(r[5]),
+                "vendor": as_text(r[6]),
+                "vat_rate": as_number(r[7]),
+                "quality_score": as_number(r[8]),
+                "updated_at": as_text(r[9]),
+                "source": as_text(r[10]),
+                "similarity_score": str(round(similarity, 4)),
+                "confidence_tier": confidence
+            })
+
+        return results
@@ -0,0 +1,155 @@
+"""
+Memory check for API workers sharing one ingest snapshot.
+
+Writes a synthetic catalog twice -- as a columnar snapshot (metadata columns, BM25 postings and IVF
+index as memory-mapped .npy arrays) and in the legacy layout (rows inlined in metadata.json) -- then
+starts 1 and N worker processes that each load the snapshot into a VectorIndex configured like
+search_config.json and run a few hybrid / filtered searches. Every worker reports its RSS, PSS and
+USS (private memory) from /proc/self/smaps_rollup while all N are alive, so pages shared through the
+page cache show up in PSS but not in USS. Linux only. Exits non-zero when a columnar worker holds as
+much private memory as a legacy one.
+
+    python snapshot_memory_benchmark.py [rows] [workers]
+"""
+
+import json
+import multiprocessing as mp
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from sys import path as sys_path
+from os import path as os_path
+
+import numpy as np
+
+sys_path.append(os_path.realpath('../../'))
+sys_path.append(os_path.realpath('../'))
+sys_path.append(os_path.realpath('./'))
+
+from utils.operation_utils import read_json
+from utils.vector_utils import VectorIndex, normalize_rows
+from utils.quantization_utils import fit_quantizer_params, build_quantizer
+from utils.lexical_utils import BM25Index
+from utils.ann_utils import IVFIndex
+from utils.snapshot_utils import write_snapshot
+
+COLUMNS = ["PRODUCT_ID", "MATERIAL_NAME", "DESCRIPTION", "UNIT_PRICE", "UNIT", "REGION", "VENDOR",
+           "VAT_RATE", "QUALITY_SCORE", "UPDATED_AT", "SOURCE"]
+CATEGORICAL = ["UNIT", "REGION", "VENDOR"]
+DIMENSION = 384
+MATERIALS = ["Carrelage grès cérame", "Colle carrelage", "Peinture acrylique", "Plinthe chêne", "Parquet stratifié",
+             "Enduit de lissage", "Plaque de plâtre", "Mortier colle", "Joint époxy", "Lasure bois"]
+FINISHES = ["blanc mat", "beige 60x60", "gris anthracite", "étanche", "intérieur", "extérieur", "effet bois"]
+REGIONS = ["Île-de-France", "Bretagne", "Occitanie", "Auvergne-Rhône-Alpes", "Grand Est"]
+VENDORS = ["Castorama", "Leroy Merlin", "Brico Dépôt", "ManoMano"]
+QUERIES = [("carrelage beige 60x60", "Île-de-France", None), ("colle carrelage étanche", None, "Castorama"),
+           ("peinture blanche mate", "Bretagne", "Leroy Merlin"), ("plinthe chêne", None, None)]
+
+
+def synthetic_catalog(n: int) -> tuple[list, np.ndarray]:
+    rng = np.random.default_rng(3)
+    matrix = normalize_rows(rng.standard_normal((n, DIMENSION), dtype=np.float32))
+    updated_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    rows = [(f"castorama|{i}", f"{MATERIALS[i % 10]} {FINISHES[i % 7]}",
+             f"{MATERIALS[(i // 10) % 10]} référence {i}, conditionnement {i % 50 + 1} unités",
+             round(float(rng.uniform(1, 500)), 2), ["m2", "kg", "unit", "l"][i % 4], REGIONS[i % 5],
+             VENDORS[(i // 5) % 4], 0.2, round(float(rng.uniform(1, 5)), 1), updated_at,
+             f"https://www.castorama.fr/produit-{i}.prd") for i in range(n)]
+    return rows, matrix
+
+
+def write_snapshots(base: str, rows: list, matrix: np.ndarray, search_config: dict) -> dict:
+    """
+    Columnar snapshot (as db_ingest.publish_catalog writes it) and the same catalog in the legacy layout.
+    """
+    mode = search_config.get("quantization", {}).get("mode")
+    quantizers = fit_quantizer_params(matrix, [mode]) if mode else {}
+    codes = {name: build_quantizer(name, params).encode(matrix) for name, params in quantizers.items()}
+    hybrid, index_config = search_config.get("hybrid") or {}, search_config.get("vector_index", {})
+    lexical = BM25Index(k1=hybrid.get("k1", 1.2), b=hybrid.get("b", 0.75)).build([f"{r[1]} {r[2]}" for r in rows])
+    ann = IVFIndex(**index_config.get("params", {})).build(matrix) \
+        if index_config.get("backend") and len(rows) >= index_config.get("min_rows", 50000) else None
+    columnar = write_snapshot(f"{base}/columnar", matrix, COLUMNS, rows, codes=codes, quantizers=quantizers,
+                              categorical=CATEGORICAL, lexical=lexical, ann=ann)
+    legacy = Path(base) / "legacy"
+    legacy.mkdir()
+    np.save(legacy / "embeddings.npy", matrix)
+    for name, mode_codes in codes.items():
+        np.save(legacy / f"codes_{name}.npy", mode_codes)
+    metadata = {"version": "legacy", "dimension": DIMENSION, "count": len(rows), "columns": COLUMNS,
+                "rows": [[*row[:9], row[9].isoformat(), row[10]] for row in rows], "quantizers": quantizers}
+    with open(legacy / "metadata.json", "w", encoding="utf-8") as fh:
+        json.dump(metadata, fh, ensure_ascii=False, separators=(",", ":"))
+    return {"columnar": str(columnar), "legacy": str(legacy)}
+
+
+def memory_mib() -> dict:
+    fields = {}
+    with open("/proc/self/smaps_rollup", "r", encoding="utf-8") as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {"rss": fields["Rss"], "pss": fields["Pss"],
+            "uss": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def worker(path: str, search_config: dict, results, release) -> None:
+    index_config = search_config.get("vector_index", {})
+    index = VectorIndex(ann_backend=index_config.get("backend"), ann_params=index_config.get("params"),
+                        ann_min_rows=index_config.get("min_rows", 50000), hybrid=search_config.get("hybrid"),
+                        quantization={**search_config.get("quantization", {}), "rerank_path": None})
+    started = time.perf_counter()
+    index.load_snapshot(path)
+    load_seconds = time.perf_counter() - started
+    rng = np.random.default_rng(0)
+    for text, region, vendor in QUERIES * 5:
+        index.search(rng.standard_normal(DIMENSION), region=region, vendor=vendor, limit=10, text=text)
+    results.put({"load_seconds": load_seconds, **memory_mib()})
+    release.wait()
+
+
+def measure(path: str, search_config: dict, n_workers: int) -> list:
+    ctx = mp.get_context("spawn")  # like uvicorn/gunicorn workers: nothing inherited copy-on-write
+    results, release = ctx.Queue(), ctx.Event()
+    processes = [ctx.Process(target=worker, args=(path, search_config, results, release)) for _ in range(n_workers)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]  # all workers alive when each one measured itself
+    release.set()
+    for process in processes:
+        process.join()
+    return reports
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    rows = int(args[0]) if len(args) > 0 else 100_000
+    n_workers = int(args[1]) if len(args) > 1 else 4
+    search_config = read_json(path="../configs/search_config.json")
+    base = tempfile.mkdtemp(prefix="snapshot_memory_")
+    try:
+        catalog, matrix = synthetic_catalog(rows)
+        paths = write_snapshots(base, catalog, matrix, search_config)
+        del catalog, matrix
+        uss = {}
+        for layout, path in paths.items():
+            for workers in sorted({1, n_workers}):
+                reports = measure(path, search_config, workers)
+                mean = {key: float(np.mean([r[key] for r in reports])) for key in reports[0]}
+                print(f"(*) {layout:8s} {workers} worker(s): per worker RSS {mean['rss']:.0f} MiB, "
+                      f"PSS {mean['pss']:.0f} MiB, USS {mean['uss']:.0f} MiB, load {mean['load_seconds']:.2f}s")
+                uss[layout] = mean["uss"]
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+    ok = uss["columnar"] < uss["legacy"]
+    print(f"(*) {'OK' if ok else 'FAILED'} {rows} rows: private memory per worker "
+          f"{uss['columnar']:.0f} MiB (columnar) vs {uss['legacy']:.0f} MiB (legacy) with {n_workers} workers")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
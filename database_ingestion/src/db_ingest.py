@@ -1,5 +1,11 @@
 from datetime import datetime, timezone
+import csv
+import io
 import json
+import time
+from functools import lru_cache
+from typing import Optional
+import numpy as np
 from sys import path as sys_path
 from os import path as os_path
 import psycopg2
@@ -11,25 +17,171 @@ sys_path.append(os_path.realpath('./'))
 
 from utils.operation_utils import read_json
 from utils.db_utils import DBUtil
+from utils.vector_utils import to_pgvector, normalize_rows
+from utils.quantization_utils import fit_quantizer_params, build_quantizer
+from utils.snapshot_utils import write_snapshot, latest_snapshot
+from utils.lexical_utils import BM25Index
+from utils.ann_utils import IVFIndex
+from utils.cache_utils import EmbeddingCache
+from utils.normalization_utils import CANONICAL_UNITS, normalize_product
+from utils.embedding_utils import build_embedding_backend
+from utils.stream_utils import iter_records, batched
+from utils.pipeline_utils import EmbeddingWorkerPool, Checkpoint, run_staged
 
 
 TABLE_NAME = "PRODUCTS"
+INDEX_CONFIG = read_json(path="../configs/vector_index.json")
+INGEST_CONFIG = read_json(path="../configs/ingest_config.json")
+EMBEDDING_DIM: int = int(INDEX_CONFIG.get("dimension", 384))  # all-MiniLM-L6-v2
+UNIT_TYPE_LABELS = ", ".join(f"'{unit}'" for unit in CANONICAL_UNITS)
 CREATE_TABLE_QUERY: str = f"""
+    CREATE EXTENSION IF NOT EXISTS vector;
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'unit_kind') THEN
+            CREATE TYPE UNIT_KIND AS ENUM ({UNIT_TYPE_LABELS});
+        ELSIF EXISTS (
+            SELECT 1 FROM pg_enum e JOIN pg_type t ON t.oid = e.enumtypid
+            WHERE t.typname = 'unit_kind' AND e.enumlabel = 'ml'
+        ) THEN
+            -- Mètre linéaire used to be labelled 'ml' (read as millilitre)
+            ALTER TYPE UNIT_KIND RENAME VALUE 'ml' TO 'lm';
+        END IF;
+    END $$;
     CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
         PRODUCT_ID VARCHAR(255) PRIMARY KEY,
         MATERIAL_NAME VARCHAR(500),
         DESCRIPTION TEXT,
-        UNIT_PRICE VARCHAR(50),
-        UNIT VARCHAR(50),
+        UNIT_PRICE NUMERIC(12, 4),
+        UNIT UNIT_KIND,
         REGION VARCHAR(100),
         VENDOR VARCHAR(100),
-        VAT_RATE VARCHAR(50),
-        QUALITY_SCORE VARCHAR(50),
+        VAT_RATE NUMERIC(5, 4),
+        QUALITY_SCORE NUMERIC(6, 3),
         UPDATED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         SOURCE TEXT,
-        EMBEDDING FLOAT[]
+        EMBEDDING vector({EMBEDDING_DIM}),
+        LISTED_UNIT VARCHAR(50),
+        CONTENT_HASH CHAR(40),
+        PRICE_HASH CHAR(40)
     );
 """
+# Fingerprints of the embedded text and of the price/listing fields: re-ingest skips unchanged rows
+# and only re-embeds rows whose text changed.
+MIGRATE_FINGERPRINT_COLUMNS_QUERY: str = f"""
+    ALTER TABLE {TABLE_NAME}
+        ADD COLUMN IF NOT EXISTS CONTENT_HASH CHAR(40),
+        ADD COLUMN IF NOT EXISTS PRICE_HASH CHAR(40);
+"""
+SELECT_FINGERPRINTS_QUERY: str = f"""
+    SELECT PRODUCT_ID, CONTENT_HASH, PRICE_HASH, EMBEDDING IS NOT NULL
+    FROM {TABLE_NAME} WHERE PRODUCT_ID = ANY(%s);
+"""
+# Legacy VARCHAR price/unit/VAT/quality columns are converted in place by `migrate_typed_columns`,
+# with the same parsing rules as ingest (normalize_product), in one transaction.
+ADD_LISTED_UNIT_COLUMN_QUERY: str = f"ALTER TABLE {TABLE_NAME} ADD COLUMN IF NOT EXISTS LISTED_UNIT VARCHAR(50);"
+LEGACY_TYPED_COLUMNS_QUERY: str = f"""
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = lower('{TABLE_NAME}') AND column_name = 'unit_price' AND data_type = 'character varying';
+"""
+SELECT_LEGACY_ROWS_QUERY: str = f"""
+    SELECT PRODUCT_ID, MATERIAL_NAME, DESCRIPTION, UNIT_PRICE, COALESCE(LISTED_UNIT, UNIT), REGION, VENDOR,
+           VAT_RATE, QUALITY_SCORE, SOURCE
+    FROM {TABLE_NAME};
+"""
+TYPED_VALUES_TABLE_NAME = f"{TABLE_NAME}_TYPED_VALUES"
+TYPED_VALUES_COLUMNS = ["PRODUCT_ID", "UNIT_PRICE", "UNIT", "LISTED_UNIT", "VAT_RATE", "QUALITY_SCORE",
+                        "CONTENT_HASH", "PRICE_HASH"]
+CREATE_TYPED_VALUES_TABLE_QUERY: str = f"""
+    CREATE TEMP TABLE {TYPED_VALUES_TABLE_NAME} (
+        PRODUCT_ID VARCHAR(255) PRIMARY KEY,
+        UNIT_PRICE NUMERIC(12, 4),
+        UNIT UNIT_KIND,
+        LISTED_UNIT VARCHAR(50),
+        VAT_RATE NUMERIC(5, 4),
+        QUALITY_SCORE NUMERIC(6, 3),
+        CONTENT_HASH CHAR(40),
+        PRICE_HASH CHAR(40)
+    ) ON COMMIT DROP;
+"""
+COPY_TYPED_VALUES_QUERY: str = (f"COPY {TYPED_VALUES_TABLE_NAME} ({', '.join(TYPED_VALUES_COLUMNS)}) "
+                                f"FROM STDIN WITH (FORMAT csv)")
+ALTER_TYPED_COLUMNS_QUERY: str = f"""
+    ALTER TABLE {TABLE_NAME}
+        ALTER COLUMN UNIT_PRICE TYPE NUMERIC(12, 4) USING NULL,
+        ALTER COLUMN UNIT TYPE UNIT_KIND USING NULL,
+        ALTER COLUMN VAT_RATE TYPE NUMERIC(5, 4) USING NULL,
+        ALTER COLUMN QUALITY_SCORE TYPE NUMERIC(6, 3) USING NULL;
+"""
+APPLY_TYPED_VALUES_QUERY: str = f"""
+    UPDATE {TABLE_NAME} p SET
+    {", ".join(f"{column} = t.{column}" for column in TYPED_VALUES_COLUMNS[1:])}
+    FROM {TYPED_VALUES_TABLE_NAME} t WHERE p.PRODUCT_ID = t.PRODUCT_ID;
+"""
+# Typed columns can be filtered / sorted in SQL (price ranges per unit, VAT, quality).
+CREATE_TYPED_INDEXES_QUERY: str = f"""
+    CREATE INDEX IF NOT EXISTS {TABLE_NAME}_UNIT_PRICE_IDX ON {TABLE_NAME} (UNIT, UNIT_PRICE);
+    CREATE INDEX IF NOT EXISTS {TABLE_NAME}_VAT_RATE_IDX ON {TABLE_NAME} (VAT_RATE);
+    CREATE INDEX IF NOT EXISTS {TABLE_NAME}_QUALITY_SCORE_IDX ON {TABLE_NAME} (QUALITY_SCORE);
+"""
+# Converts a legacy `EMBEDDING FLOAT[]` column in place to a native pgvector column.
+MIGRATE_EMBEDDING_QUERY: str = f"""
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = lower('{TABLE_NAME}') AND column_name = 'embedding' AND data_type = 'ARRAY'
+        ) THEN
+            UPDATE {TABLE_NAME} SET EMBEDDING = NULL WHERE cardinality(EMBEDDING) IS DISTINCT FROM {EMBEDDING_DIM};
+            ALTER TABLE {TABLE_NAME} ALTER COLUMN EMBEDDING TYPE vector({EMBEDDING_DIM})
+                USING EMBEDDING::real[]::vector({EMBEDDING_DIM});
+        END IF;
+    END $$;
+"""
+# Column order of the on-disk snapshot metadata (matches the APIs' PRODUCT_COLUMNS).
+SNAPSHOT_COLUMNS = ["PRODUCT_ID", "MATERIAL_NAME", "DESCRIPTION", "UNIT_PRICE", "UNIT", "REGION", "VENDOR",
+                    "VAT_RATE", "QUALITY_SCORE", "UPDATED_AT", "SOURCE"]
+# Low-cardinality columns stored as category codes in the snapshot (the APIs filter on region / vendor).
+SNAPSHOT_CATEGORICAL_COLUMNS = ["UNIT", "REGION", "VENDOR"]
+# Key/value store for catalog-level artifacts shipped to the API workers (e.g. quantizer parameters).
+METADATA_TABLE_NAME = "CATALOG_METADATA"
+CREATE_METADATA_TABLE_QUERY: str = f"""
+    CREATE TABLE IF NOT EXISTS {METADATA_TABLE_NAME} (
+        KEY VARCHAR(100) PRIMARY KEY,
+        VALUE TEXT,
+        UPDATED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+UPSERT_METADATA_QUERY: str = f"""
+    INSERT INTO {METADATA_TABLE_NAME} (KEY, VALUE, UPDATED_AT) VALUES (%s, %s, CURRENT_TIMESTAMP)
+    ON CONFLICT (KEY) DO UPDATE SET VALUE = EXCLUDED.VALUE, UPDATED_AT = EXCLUDED.UPDATED_AT;
+"""
+# Bumped after every successful load; the APIs key their result caches on it.
+BUMP_CATALOG_VERSION_QUERY: str = f"""
+    INSERT INTO {METADATA_TABLE_NAME} (KEY, VALUE, UPDATED_AT) VALUES ('catalog_version', '1', CURRENT_TIMESTAMP)
+    ON CONFLICT (KEY) DO UPDATE SET
+    VALUE = (COALESCE(NULLIF({METADATA_TABLE_NAME}.VALUE, ''), '0')::BIGINT + 1)::TEXT,
+    UPDATED_AT = EXCLUDED.UPDATED_AT
+    RETURNING VALUE;
+"""
+# One row per price change (and the first known price of a product), written in the same transaction
+# as the change by the bulk / pipeline ingest and by price_refresh.py.
+PRICE_HISTORY_TABLE_NAME = "PRICE_HISTORY"
+CREATE_PRICE_HISTORY_TABLE_QUERY: str = f"""
+    CREATE TABLE IF NOT EXISTS {PRICE_HISTORY_TABLE_NAME} (
+        ID BIGSERIAL PRIMARY KEY,
+        PRODUCT_ID VARCHAR(255) NOT NULL,
+        UNIT_PRICE NUMERIC(12, 4),
+        UNIT UNIT_KIND,
+        LISTED_UNIT VARCHAR(50),
+        PREVIOUS_UNIT_PRICE NUMERIC(12, 4),
+        PREVIOUS_UNIT UNIT_KIND,
+        PREVIOUS_LISTED_UNIT VARCHAR(50),
+        CHANGED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS {PRICE_HISTORY_TABLE_NAME}_PRODUCT_IDX
+        ON {PRICE_HISTORY_TABLE_NAME} (PRODUCT_ID, CHANGED_AT);
+"""
 INSERT_DATA_QUERY: str = f"""
     INSERT INTO {TABLE_NAME} (
         PRODUCT_ID, MATERIAL_NAME,
@@ -37,8 +189,10 @@ INSERT_DATA_QUERY: str = f"""
         UNIT, REGION,
         VENDOR, VAT_RATE,
         QUALITY_SCORE, UPDATED_AT,
-        SOURCE, EMBEDDING
-    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        SOURCE, EMBEDDING,
+        LISTED_UNIT, CONTENT_HASH,
+        PRICE_HASH
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s::vector, %s, %s, %s)
     ON CONFLICT (PRODUCT_ID) DO UPDATE SET
     MATERIAL_NAME = EXCLUDED.MATERIAL_NAME,
     DESCRIPTION = EXCLUDED.DESCRIPTION,
@@ -50,23 +204,393 @@ INSERT_DATA_QUERY: str = f"""
     QUALITY_SCORE = EXCLUDED.QUALITY_SCORE,
     UPDATED_AT = EXCLUDED.UPDATED_AT,
     SOURCE = EXCLUDED.SOURCE,
-    EMBEDDING = EXCLUDED.EMBEDDING;
+    EMBEDDING = EXCLUDED.EMBEDDING,
+    LISTED_UNIT = EXCLUDED.LISTED_UNIT,
+    CONTENT_HASH = EXCLUDED.CONTENT_HASH,
+    PRICE_HASH = EXCLUDED.PRICE_HASH
+    WHERE {TABLE_NAME}.CONTENT_HASH IS DISTINCT FROM EXCLUDED.CONTENT_HASH
+    OR {TABLE_NAME}.PRICE_HASH IS DISTINCT FROM EXCLUDED.PRICE_HASH
+    OR {TABLE_NAME}.EMBEDDING IS NULL;
+"""
+# Bulk mode: each batch is COPY'd into a session-local staging table, then upserted with one statement.
+INSERT_COLUMNS = [*SNAPSHOT_COLUMNS, "EMBEDDING", "LISTED_UNIT", "CONTENT_HASH", "PRICE_HASH"]
+STAGING_TABLE_NAME = f"{TABLE_NAME}_STAGING"
+CREATE_STAGING_TABLE_QUERY: str = f"""
+    CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE_NAME}
+    (LIKE {TABLE_NAME} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;
+"""
+COPY_STAGING_QUERY: str = f"COPY {STAGING_TABLE_NAME} ({', '.join(INSERT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+# Price-only changes are staged without an embedding: the stored one is kept while CONTENT_HASH matches.
+UPSERT_FROM_STAGING_QUERY: str = f"""
+    INSERT INTO {TABLE_NAME} ({", ".join(INSERT_COLUMNS)})
+    SELECT {", ".join(INSERT_COLUMNS)} FROM {STAGING_TABLE_NAME}
+    ON CONFLICT (PRODUCT_ID) DO UPDATE SET
+    {", ".join(f"{column} = EXCLUDED.{column}" for column in INSERT_COLUMNS if column not in ("PRODUCT_ID", "EMBEDDING"))},
+    EMBEDDING = CASE WHEN {TABLE_NAME}.CONTENT_HASH IS NOT DISTINCT FROM EXCLUDED.CONTENT_HASH
+                     AND EXCLUDED.EMBEDDING IS NULL
+                THEN {TABLE_NAME}.EMBEDDING ELSE EXCLUDED.EMBEDDING END
+    WHERE {TABLE_NAME}.CONTENT_HASH IS DISTINCT FROM EXCLUDED.CONTENT_HASH
+    OR {TABLE_NAME}.PRICE_HASH IS DISTINCT FROM EXCLUDED.PRICE_HASH
+    OR {TABLE_NAME}.EMBEDDING IS NULL;
 """
 
 
-from sentence_transformers import SentenceTransformer
+def build_price_history_query(staging_table_name: str) -> str:
+    """
+    History rows for the staged products whose price, unit or listed unit differ from the stored ones.
+    Run before the staged rows are applied, while PRODUCTS still holds the previous values.
+    """
+    return f"""
+        INSERT INTO {PRICE_HISTORY_TABLE_NAME} (
+            PRODUCT_ID, UNIT_PRICE, UNIT, LISTED_UNIT,
+            PREVIOUS_UNIT_PRICE, PREVIOUS_UNIT, PREVIOUS_LISTED_UNIT, CHANGED_AT
+        )
+        SELECT s.PRODUCT_ID, s.UNIT_PRICE, s.UNIT, s.LISTED_UNIT,
+               p.UNIT_PRICE, p.UNIT, p.LISTED_UNIT, COALESCE(s.UPDATED_AT, CURRENT_TIMESTAMP)
+        FROM {staging_table_name} s LEFT JOIN {TABLE_NAME} p ON p.PRODUCT_ID = s.PRODUCT_ID
+        WHERE (p.UNIT_PRICE, p.UNIT, p.LISTED_UNIT) IS DISTINCT FROM (s.UNIT_PRICE, s.UNIT, s.LISTED_UNIT);
+    """
+
+
+RECORD_PRICE_HISTORY_QUERY: str = build_price_history_query(STAGING_TABLE_NAME)
 
 
-# lightweight embedding model
-model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+def build_ann_index_queries(index_config: dict) -> list[str]:
+    """
+    DDL for the configured ANN index ('hnsw' or 'ivfflat') on EMBEDDING using cosine distance.
+    The index of the other type is dropped so switching the config does not leave both behind.
+    """
+    index_type = index_config.get("index_type", "hnsw").lower()
+    if index_type not in ("hnsw", "ivfflat"):
+        raise ValueError(f"Unsupported vector index type: {index_type}")
+    other = "ivfflat" if index_type == "hnsw" else "hnsw"
+    params = index_config.get(index_type, {})
+    with_clause = ", ".join(f"{key} = {int(value)}" for key, value in params.items())
+    return [
+        f"DROP INDEX IF EXISTS {TABLE_NAME}_EMBEDDING_{other.upper()}_IDX;",
+        f"""
+        CREATE INDEX IF NOT EXISTS {TABLE_NAME}_EMBEDDING_{index_type.upper()}_IDX
+        ON {TABLE_NAME} USING {index_type} (EMBEDDING vector_cosine_ops)
+        {f"WITH ({with_clause})" if with_clause else ""};
+        """,
+        f"ANALYZE {TABLE_NAME};",
+    ]
+
+
+@lru_cache(maxsize=1)
+def get_model():
+    # lightweight embedding model (all-MiniLM-L6-v2); torch / ONNX / int8-ONNX backend per ingest_config.
+    # Loaded on first use: pipeline worker processes re-import this module and load their own copy.
+    return build_embedding_backend(**INGEST_CONFIG.get("embedding", {}))
+
+
+# Shared with the APIs: unchanged product texts are not re-encoded across runs
+embedding_cache = EmbeddingCache(**INGEST_CONFIG["embedding_cache"]) if INGEST_CONFIG.get("embedding_cache") else None
 
 def get_vector(data):
     if not data: return []
     # Generate embedding (as a numpy array)
-    vector = model.encode(data)
+    if embedding_cache is not None:
+        vector = embedding_cache.get_or_compute(data, get_model().encode)
+    else:
+        vector = get_model().encode(data)
     # Convert to Python list of floats
     return vector.tolist()
 
+def get_vectors(texts: list[str]) -> list[list[float]]:
+    """
+    Batched `get_vector`: cache hits are served individually, the misses go through one `model.encode`.
+    """
+    vectors = [None] * len(texts)
+    pending = []
+    for i, text in enumerate(texts):
+        if not text:
+            vectors[i] = []
+            continue
+        cached = embedding_cache.get(text) if embedding_cache is not None else None
+        if cached is not None:
+            vectors[i] = cached.tolist()
+        else:
+            pending.append(i)
+    if pending:
+        encode_batch_size = int(INGEST_CONFIG.get("bulk", {}).get("encode_batch_size", 64))
+        encoded = get_model().encode([texts[i] for i in pending], batch_size=encode_batch_size)
+        for i, vector in zip(pending, encoded):
+            if embedding_cache is not None:
+                embedding_cache.put(texts[i], vector)
+            vectors[i] = vector.tolist()
+    return vectors
+
+
+def embedding_text(row: dict) -> str:
+    return row["material_name"] + ":" + (row["description"] or "")
+
+
+def row_values(row: dict, vector: list, updated_at: str) -> tuple:
+    """
+    Column values of a normalized product in INSERT_COLUMNS order.
+    """
+    return (
+        row["product_id"],
+        row["material_name"],
+        row["description"],
+        row["unit_price"],
+        row["unit"],
+        row["region"],
+        row["vendor"],
+        row["vat_rate"],
+        row["quality_score"],
+        updated_at,
+        row["source"],
+        to_pgvector(vector) if vector else None,
+        row["listed_unit"],
+        row["content_hash"],
+        row["price_hash"]
+    )
+
+
+def copy_upsert(db_loader: DBUtil, values: list[tuple]) -> int:
+    """
+    Write one batch in a single transaction: COPY into the staging table, record price changes in
+    PRICE_HISTORY, then one set-based upsert.
+    Rows repeating a PRODUCT_ID within the batch keep the last occurrence (ON CONFLICT cannot touch
+    the same row twice in one statement).
+    """
+    values = list({value[0]: value for value in values}.values())
+    buffer = io.StringIO()
+    # In CSV COPY an unquoted empty field is NULL
+    csv.writer(buffer).writerows([["" if v is None else v for v in value] for value in values])
+    buffer.seek(0)
+    with db_loader.transaction() as cursor:
+        cursor.execute(CREATE_STAGING_TABLE_QUERY)
+        cursor.copy_expert(COPY_STAGING_QUERY, buffer)
+        cursor.execute(RECORD_PRICE_HISTORY_QUERY)
+        cursor.execute(UPSERT_FROM_STAGING_QUERY)
+        return cursor.rowcount
+
+
+def migrate_typed_columns(db_loader: DBUtil) -> int:
+    """
+    Convert legacy VARCHAR UNIT_PRICE / UNIT / VAT_RATE / QUALITY_SCORE columns to their typed form:
+    every row goes through `normalize_product` ("1.234,95" -> 1234.95, a price per gram -> per kg), the
+    original unit label is kept in LISTED_UNIT and the fingerprints are filled in. No-op once migrated.
+    Returns the number of rows converted.
+    """
+    db_loader.execute_query(ADD_LISTED_UNIT_COLUMN_QUERY)
+    if not db_loader.execute_query(LEGACY_TYPED_COLUMNS_QUERY):
+        return 0
+    fields = ("product_id", "material_name", "description", "unit_price", "unit", "region", "vendor",
+              "vat_rate", "quality_score", "source")
+    with db_loader.transaction() as cursor:
+        cursor.execute(SELECT_LEGACY_ROWS_QUERY)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        migrated = 0
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            for row in rows:
+                product = normalize_product(dict(zip(fields, row)))
+                values = [product[column.lower()] for column in TYPED_VALUES_COLUMNS]
+                # In CSV COPY an unquoted empty field is NULL
+                writer.writerow(["" if value is None else value for value in values])
+            migrated += len(rows)
+        buffer.seek(0)
+        cursor.execute(CREATE_TYPED_VALUES_TABLE_QUERY)
+        cursor.copy_expert(COPY_TYPED_VALUES_QUERY, buffer)
+        cursor.execute(ALTER_TYPED_COLUMNS_QUERY)
+        cursor.execute(APPLY_TYPED_VALUES_QUERY)
+    print(f"(*) Migrated {migrated} rows to typed price / unit / VAT / quality columns")
+    return migrated
+
+
+def classify_changes(db_loader: DBUtil, batch: list[dict]) -> tuple[list[dict], list[dict], int]:
+    """
+    Split a normalized batch against the stored fingerprints into
+    (rows needing an embedding: new / text changed, price-only changes, unchanged count).
+    """
+    stored = {row[0]: row[1:] for row in db_loader.execute_query(
+        SELECT_FINGERPRINTS_QUERY, params=([row["product_id"] for row in batch],)) or []}
+    to_embed, price_only, unchanged = [], [], 0
+    for row in batch:
+        previous = stored.get(row["product_id"])
+        if previous is None or previous[0] != row["content_hash"] or not previous[2]:
+            to_embed.append(row)
+        elif previous[1] != row["price_hash"]:
+            price_only.append(row)
+        else:
+            unchanged += 1
+    return to_embed, price_only, unchanged
+
+
+def bulk_ingest(db_loader: DBUtil, data: list, updated_at: str, batch_size: int = 512,
+                incremental: bool = True) -> int:
+    """
+    Encode and write `data` in batches of `batch_size`, printing progress and throughput.
+    `incremental`: only rows whose text changed are re-embedded and unchanged rows are not written.
+    """
+    started = time.perf_counter()
+    written = 0
+    counts = {"embedded": 0, "price_only": 0, "unchanged": 0}
+    for start in range(0, len(data), batch_size):
+        batch = [normalize_product(row) for row in data[start:start + batch_size]]
+        to_embed, price_only, unchanged = classify_changes(db_loader, batch) if incremental else (batch, [], 0)
+        vectors = get_vectors([embedding_text(row) for row in to_embed])
+        values = [row_values(row, vector, updated_at) for row, vector in zip(to_embed, vectors)]
+        values += [row_values(row, None, updated_at) for row in price_only]
+        if values:
+            written += copy_upsert(db_loader, values)
+        counts["embedded"] += len(to_embed)
+        counts["price_only"] += len(price_only)
+        counts["unchanged"] += unchanged
+        done = min(start + batch_size, len(data))
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed else 0.0
+        eta = (len(data) - done) / rate if rate else 0.0
+        print(f"(*) Bulk ingest: {done}/{len(data)} rows ({100 * done / len(data):.1f}%) "
+              f"-- {rate:.0f} rows/s, ETA {eta:.0f}s")
+    print(f"(*) Bulk ingest: {written} rows upserted in {time.perf_counter() - started:.1f}s -- {counts}")
+    return written
+
+
+def pipeline_ingest(db_config: dict, db_loader: DBUtil, data_path: str, updated_at: str,
+                    config: dict, incremental: bool = True) -> int:
+    """
+    Streaming, multi-process ingest for large feeds:
+        reader (streamed JSON/JSONL) -> dispatch: normalize, fingerprint check, cache lookup, submit misses
+        to the embedding process pool -> [bounded queue] -> single writer: COPY + upsert, checkpoint.
+    Progress is checkpointed after each committed batch; a re-run on the same source resumes there.
+    """
+    batch_size = int(config.get("batch_size", 256))
+    checkpoint = Checkpoint(config.get("checkpoint_path"))
+    state = checkpoint.load()
+    resume = state if state.get("source") == data_path and not state.get("completed") else {}
+    progress = {"records": int(resume.get("records_done", 0)), "written": int(resume.get("written", 0)),
+                "embedded": 0, "price_only": 0, "unchanged": 0}
+    skipped = progress["records"]
+    if skipped:
+        print(f"(*) Resuming {data_path} after {skipped} records")
+    # Fingerprint lookups run on the dispatch thread, so they get their own connection.
+    fingerprint_reader = DBUtil(db_config=db_config, table_name=TABLE_NAME)
+    workers = EmbeddingWorkerPool(INGEST_CONFIG.get("embedding", {}), processes=config.get("workers"),
+                                  encode_batch_size=int(config.get("encode_batch_size", 64)))
+    started = time.perf_counter()
+
+    def dispatch(batch: list) -> dict:
+        rows = [normalize_product(row) for row in batch]
+        to_embed, price_only, unchanged = classify_changes(fingerprint_reader, rows) if incremental else (rows, [], 0)
+        texts = [embedding_text(row) for row in to_embed]
+        vectors = [embedding_cache.get(text) if embedding_cache is not None else None for text in texts]
+        misses = [i for i, vector in enumerate(vectors) if vector is None]
+        return {"size": len(batch), "to_embed": to_embed, "price_only": price_only, "unchanged": unchanged,
+                "texts": texts, "vectors": vectors, "misses": misses,
+                "future": workers.submit([texts[i] for i in misses])}
+
+    def write(item: dict) -> None:
+        vectors = item["vectors"]
+        for i, vector in zip(item["misses"], item["future"].result()):
+            vectors[i] = embedding_cache.put(item["texts"][i], vector) if embedding_cache is not None else vector
+        values = [row_values(row, vector.tolist(), updated_at) for row, vector in zip(item["to_embed"], vectors)]
+        values += [row_values(row, None, updated_at) for row in item["price_only"]]
+        if values:
+            progress["written"] += copy_upsert(db_loader, values)
+        progress["records"] += item["size"]
+        progress["embedded"] += len(item["to_embed"])
+        progress["price_only"] += len(item["price_only"])
+        progress["unchanged"] += item["unchanged"]
+        checkpoint.save(source=data_path, records_done=progress["records"], written=progress["written"],
+                        completed=False)
+        elapsed = time.perf_counter() - started
+        print(f"(*) Pipeline ingest: {progress['records']} records "
+              f"-- {(progress['records'] - skipped) / elapsed if elapsed else 0.0:.0f} records/s, "
+              f"{workers.processes} embedding workers")
+
+    try:
+        run_staged(batched(iter_records(data_path, skip=skipped), batch_size), dispatch, write,
+                   queue_size=int(config.get("queue_size", 8)))
+    finally:
+        workers.close()
+        fingerprint_reader.close()
+    checkpoint.save(source=data_path, records_done=progress["records"], written=progress["written"], completed=True)
+    print(f"(*) Pipeline ingest: {progress['written']} rows upserted in {time.perf_counter() - started:.1f}s "
+          f"-- {progress}")
+    return progress["written"]
+
+
+def export_catalog(db_loader: DBUtil) -> tuple[list, np.ndarray]:
+    """
+    Read the whole embedded catalog back (not only this run's rows) as metadata rows in
+    SNAPSHOT_COLUMNS order plus an L2-normalized float32 matrix.
+    """
+    query = f"""
+        SELECT {", ".join(SNAPSHOT_COLUMNS)}, EMBEDDING::real[] FROM {TABLE_NAME}
+        WHERE EMBEDDING IS NOT NULL ORDER BY PRODUCT_ID;
+    """
+    db_rows = db_loader.execute_query(query) or []
+    matrix = np.asarray([row[-1] for row in db_rows], dtype=np.float32).reshape(len(db_rows), EMBEDDING_DIM)
+    return [row[:-1] for row in db_rows], normalize_rows(matrix)
+
+
+def ship_quantizer_params(db_loader: DBUtil, matrix: np.ndarray) -> dict:
+    """
+    Fit the configured quantizers on the (normalized) catalog embeddings and store their
+    parameters in CATALOG_METADATA under 'quantization:<mode>' for the API workers.
+    """
+    quantization = INGEST_CONFIG.get("quantization", {})
+    if not quantization.get("modes") or not len(matrix):
+        return {}
+    fitted = fit_quantizer_params(matrix, quantization["modes"], options=quantization)
+    for mode, params in fitted.items():
+        db_loader.execute_query(UPSERT_METADATA_QUERY, params=(f"quantization:{mode}", json.dumps(params)))
+    print(f"(*) Shipped quantizer parameters for: {list(fitted)}")
+    return fitted
+
+
+def build_snapshot_lexical(rows: list, snapshot_config: dict) -> Optional[BM25Index]:
+    """
+    BM25 postings over name + description, shipped in the snapshot so API workers map them instead of
+    tokenizing the catalog at startup (used when their hybrid k1 / b match).
+    """
+    lexical_config = snapshot_config.get("lexical")
+    if not lexical_config:
+        return None
+    name_col, description_col = SNAPSHOT_COLUMNS.index("MATERIAL_NAME"), SNAPSHOT_COLUMNS.index("DESCRIPTION")
+    documents = [f"{row[name_col] or ''} {row[description_col] or ''}" for row in rows]
+    return BM25Index(k1=lexical_config.get("k1", 1.2), b=lexical_config.get("b", 0.75)).build(documents)
+
+
+def build_snapshot_ann(matrix: np.ndarray, snapshot_config: dict) -> Optional[IVFIndex]:
+    """
+    IVF index shipped in the snapshot for large catalogs (used when the APIs' parameters match).
+    """
+    ivf_config = snapshot_config.get("ivf")
+    if not ivf_config or len(matrix) < ivf_config.get("min_rows", 50000):
+        return None
+    return IVFIndex(**ivf_config.get("params", {})).build(matrix)
+
+
+def publish_catalog(db_loader: DBUtil, snapshot_dir: Optional[str]) -> None:
+    """
+    Make a load visible to the APIs: ANN index, quantizer parameters, snapshot (embeddings + metadata)
+    and a catalog version bump, which invalidates their result caches and reloads their indexes.
+    """
+    # IVFFlat picks its list centroids from existing rows, so the ANN index is created after the load.
+    for query in build_ann_index_queries(INDEX_CONFIG):
+        db_loader.execute_query(query)
+    rows, matrix = export_catalog(db_loader)
+    quantizers = ship_quantizer_params(db_loader, matrix)
+    if snapshot_dir and len(rows):
+        snapshot_config = INGEST_CONFIG["snapshot"]
+        codes = {mode: build_quantizer(mode, params).encode(matrix) for mode, params in quantizers.items()}
+        write_snapshot(snapshot_dir, matrix, SNAPSHOT_COLUMNS, rows,
+                       codes=codes, quantizers=quantizers, keep=snapshot_config.get("keep", 3),
+                       categorical=SNAPSHOT_CATEGORICAL_COLUMNS, lexical=build_snapshot_lexical(rows, snapshot_config),
+                       ann=build_snapshot_ann(matrix, snapshot_config))
+    catalog_version = db_loader.execute_query(BUMP_CATALOG_VERSION_QUERY)
+    print(f"(*) Catalog version -> {catalog_version[0][0] if catalog_version else '?'}")
+
+
 def main() -> None:
     tz = timezone.utc
     datetime_format = "%Y-%m-%d %H:%M:%S.%fZ"
@@ -74,32 +598,52 @@ def main() -> None:
     db_config = read_json(path=db_config_path)
     print(f"(*) Config: {db_config}")
 
-    data_path = "../../product_details_ingestion/data/castorama_materials.json"
-    data = read_json(path=data_path)
-    print(f"(*) Total {len(data)} data points found.")
+    # A directory of JSONL segments written by the scraper (or a legacy .json array file)
+    data_path = INGEST_CONFIG.get("source", "../../product_details_ingestion/data/castorama_materials")
 
     db_loader = DBUtil(db_config=db_config, table_name=TABLE_NAME)
     db_loader.init_queries(CREATE_TABLE_QUERY=CREATE_TABLE_QUERY, INSERT_DATA_QUERY=INSERT_DATA_QUERY)
-    for row in data:
-        vector = get_vector(row["material_name"] + ":" + (row["description"] or ""))
-        values = (
-            row["product_id"],
-            row["material_name"],
-            row["description"],
-            row["unit_price"],
-            row["unit"],
-            row["region"],
-            row["vendor"],
-            row["vat_rate"],
-            row["quality_score"],
-            datetime.now(timezone.utc).strftime(datetime_format),
-            row["source"],
-            vector
-        )
-        db_loader.execute_query(query=db_loader.INSERT_DATA_QUERY, params=values)
+    db_loader.execute_query(MIGRATE_EMBEDDING_QUERY)
+    db_loader.execute_query(MIGRATE_FINGERPRINT_COLUMNS_QUERY)
+    migrate_typed_columns(db_loader)
+    db_loader.execute_query(CREATE_TYPED_INDEXES_QUERY)
+    db_loader.execute_query(CREATE_METADATA_TABLE_QUERY)
+    db_loader.execute_query(CREATE_PRICE_HISTORY_TABLE_QUERY)
+    bulk_config = INGEST_CONFIG.get("bulk", {})
+    snapshot_dir = INGEST_CONFIG.get("snapshot", {}).get("directory")
+    pipeline_config = INGEST_CONFIG.get("pipeline", {})
+    written = None
+    if pipeline_config.get("enabled"):
+        # Streams the source instead of loading it
+        written = pipeline_ingest(db_config, db_loader, data_path,
+                                  updated_at=datetime.now(tz).strftime(datetime_format), config=pipeline_config,
+                                  incremental=bool(bulk_config.get("incremental", True)))
+    elif bulk_config.get("enabled"):
+        data = list(iter_records(data_path))
+        print(f"(*) Total {len(data)} data points found.")
+        written = bulk_ingest(db_loader, data, updated_at=datetime.now(tz).strftime(datetime_format),
+                              batch_size=int(bulk_config.get("batch_size", 512)),
+                              incremental=bool(bulk_config.get("incremental", True)))
+    else:
+        data = list(iter_records(data_path))
+        print(f"(*) Total {len(data)} data points found.")
+        for row in map(normalize_product, data):
+            vector = get_vector(embedding_text(row))
+            values = row_values(row, vector, datetime.now(timezone.utc).strftime(datetime_format))
+            db_loader.execute_query(query=db_loader.INSERT_DATA_QUERY, params=values)
+    if written == 0 and (not snapshot_dir or latest_snapshot(snapshot_dir) is not None):
+        # Nothing changed: index, snapshot and catalog version (API caches) stay as they are.
+        print("(*) Catalog unchanged -- skipping index, snapshot and version bump")
+        db_loader.close()
+        return
+    publish_catalog(db_loader, snapshot_dir)
     print(f"✅ Database ingestion completed successfully into {db_config['dbname']}.{db_loader.TABLE_NAME}")
+    if embedding_cache is not None:
+        print(f"(*) Embedding cache: {embedding_cache.stats()}")
     # db_loader.preview_data(n=2)
     # db_loader.drop_table(mock=False)
     db_loader.close()
 
-main()
+
+if __name__ == "__main__":
+    main()
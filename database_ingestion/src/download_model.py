@@ -0,0 +1,32 @@
+"""
+Download the sentence-transformers model once into ingest_config["embedding"]["model_path"], the
+local directory the torch backend and export_onnx_model.py load from. The APIs read the same
+directory (search_config["embedding"]["model_path"]); nothing is fetched from the hub at startup.
+
+    python download_model.py [model_name]
+"""
+
+import sys
+from sys import path as sys_path
+from os import path as os_path
+
+sys_path.append(os_path.realpath('../../'))
+sys_path.append(os_path.realpath('../'))
+sys_path.append(os_path.realpath('./'))
+
+from utils.operation_utils import read_json
+from utils.embedding_utils import DEFAULT_MODEL, DEFAULT_MODEL_PATH
+
+
+def main() -> None:
+    from sentence_transformers import SentenceTransformer
+
+    model_name = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MODEL
+    model_path = read_json(path="../configs/ingest_config.json").get("embedding", {}).get("model_path",
+                                                                                         DEFAULT_MODEL_PATH)
+    print(f"(*) Downloading {model_name} -> {model_path}")
+    SentenceTransformer(model_name, device="cpu").save(model_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Parity check for the CPU embedding backends.
+
+Re-encodes a sample of catalog texts with every backend in ingest_config["parity"]["backends"] and
+compares them with the embeddings already stored in the latest snapshot (the vectors the APIs search
+against). Without a snapshot, the "torch" backend is used as the reference. Reports cosine
+similarity (min / p1 / mean), top-10 neighbour overlap and throughput; exits non-zero when a
+backend is outside tolerance.
+"""
+
+import sys
+import time
+from itertools import islice
+import numpy as np
+from sys import path as sys_path
+from os import path as os_path
+
+sys_path.append(os_path.realpath('../../'))
+sys_path.append(os_path.realpath('../'))
+sys_path.append(os_path.realpath('./'))
+
+from utils.operation_utils import read_json
+from utils.stream_utils import iter_records
+from utils.embedding_utils import build_embedding_backend
+from utils.snapshot_utils import latest_snapshot, load_snapshot
+from utils.vector_utils import normalize_rows
+
+
+def load_reference(config: dict, sample_size: int) -> tuple[list, np.ndarray]:
+    """
+    Sampled (texts, L2-normalized reference embeddings). Texts are built exactly like db_ingest does.
+    """
+    snapshot_dir = config.get("snapshot", {}).get("directory")
+    snapshot = latest_snapshot(snapshot_dir) if snapshot_dir else None
+    if snapshot is None:
+        source = config.get("source", "../../product_details_ingestion/data/castorama_materials")
+        data = list(islice(iter_records(source), sample_size))
+        texts = [row["material_name"] + ":" + (row["description"] or "") for row in data]
+        print(f"(*) No snapshot found: using the torch backend as reference on {len(texts)} texts")
+        reference = build_embedding_backend(**{**config.get("embedding", {}), "backend": "torch"})
+        return texts, normalize_rows(np.asarray(reference.encode(texts), dtype=np.float32))
+    snapshot = load_snapshot(snapshot)
+    name_col = snapshot["columns"].index("MATERIAL_NAME")
+    description_col = snapshot["columns"].index("DESCRIPTION")
+    rng = np.random.default_rng(42)
+    sample = np.sort(rng.choice(len(snapshot["rows"]), size=min(sample_size, len(snapshot["rows"])), replace=False))
+    texts = [snapshot["rows"][i][name_col] + ":" + (snapshot["rows"][i][description_col] or "") for i in sample]
+    print(f"(*) Reference: snapshot {snapshot['version']} ({len(texts)} sampled rows)")
+    return texts, np.asarray(snapshot["matrix"][sample], dtype=np.float32)
+
+
+def compare(backend_name: str, texts: list, reference: np.ndarray, embedding_config: dict) -> dict:
+    backend = build_embedding_backend(**{**embedding_config, "backend": backend_name})
+    backend.encode(texts[:8])  # warm-up
+    started = time.perf_counter()
+    vectors = normalize_rows(np.asarray(backend.encode(texts), dtype=np.float32))
+    seconds = time.perf_counter() - started
+    cosine = (vectors * reference).sum(axis=1)
+    k = min(10, len(texts))
+    expected = np.argsort(-(reference @ reference.T), axis=1)[:, :k]
+    found = np.argsort(-(vectors @ reference.T), axis=1)[:, :k]
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(expected, found)])
+    return {
+        "min_cosine": float(cosine.min()),
+        "p1_cosine": float(np.percentile(cosine, 1)),
+        "mean_cosine": float(cosine.mean()),
+        f"top{k}_overlap": round(float(overlap), 4),
+        "texts_per_second": round(len(texts) / seconds, 1),
+    }
+
+
+def main() -> int:
+    config = read_json(path="../configs/ingest_config.json")
+    parity = config.get("parity", {})
+    texts, reference = load_reference(config, int(parity.get("sample_size", 500)))
+    failed = []
+    for backend_name in parity.get("backends", ["onnx", "onnx-int8"]):
+        report = compare(backend_name, texts, reference, config.get("embedding", {}))
+        ok = report["min_cosine"] >= parity.get("min_cosine", 0.99) and \
+            report["mean_cosine"] >= parity.get("mean_cosine", 0.995)
+        print(f"(*) {backend_name}: {'OK' if ok else 'OUT OF TOLERANCE'} {report}")
+        if not ok:
+            failed.append(backend_name)
+    if failed:
+        print(f"(*) Parity check failed for: {failed}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+"""
+Export the embedding model to ONNX (+ a dynamically int8-quantized copy) for the CPU backends.
+Writes to ingest_config["embedding"]["onnx_path"]; run `embedding_parity.py` afterwards.
+"""
+
+from sys import path as sys_path
+from os import path as os_path
+
+sys_path.append(os_path.realpath('../../'))
+sys_path.append(os_path.realpath('../'))
+sys_path.append(os_path.realpath('./'))
+
+from utils.operation_utils import read_json
+from utils.embedding_utils import DEFAULT_MODEL_PATH, export_onnx, local_model_dir
+
+
+def main() -> None:
+    embedding_config = read_json(path="../configs/ingest_config.json").get("embedding", {})
+    model_path = local_model_dir(embedding_config.get("model_path", DEFAULT_MODEL_PATH))
+    onnx_path = embedding_config.get("onnx_path", "../../models/all-MiniLM-L6-v2-onnx")
+    print(f"(*) Exporting {model_path} -> {onnx_path}")
+    files = export_onnx(str(model_path), onnx_path, quantize=True)
+    for backend, file in files.items():
+        print(f"(*) {backend}: {file} ({os_path.getsize(file) / 2 ** 20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Price-only refresh of the products already in the catalog.
+
+Reads the known product URLs (SOURCE) from PRODUCTS, fetches each page through the supplier's
+Scrapper (same per-host rate limits, pooled sessions and conditional-GET cache as a crawl, one shared
+request budget across suppliers) and extracts only the price and unit. Changed prices are COPY'd
+into a staging table and applied in batches with one set-based UPDATE, in a worker thread so the
+fetches keep running: names, descriptions and embeddings are not touched, nothing is re-encoded.
+Every change is recorded in PRICE_HISTORY in the same transaction. When anything changed, the catalog is re-published (snapshot from the stored
+embeddings + catalog version bump) so the APIs serve the new prices.
+
+    python price_refresh.py [supplier ...]
+"""
+
+import asyncio
+import csv
+import io
+import sys
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+from sys import path as sys_path
+from os import path as os_path
+
+sys_path.append(os_path.realpath('../../'))
+sys_path.append(os_path.realpath('../'))
+sys_path.append(os_path.realpath('./'))
+sys_path.append(os_path.realpath('../../product_details_ingestion/src'))
+
+from utils.operation_utils import load_yaml_config, read_json
+from utils.db_utils import DBUtil
+from utils.crawl_utils import CrawlBudget, drain
+from utils.normalization_utils import normalize_product
+from db_ingest import (INGEST_CONFIG, TABLE_NAME, CREATE_PRICE_HISTORY_TABLE_QUERY, build_price_history_query,
+                       publish_catalog)
+from scrapper import Scrapper, load_supplier_config
+
+# Relative paths in the supplier YAMLs (HTTP cache) are relative to the scraper's working directory
+SCRAPER_DIR = Path("../../product_details_ingestion/src")
+SUPPLIER_CONFIG_DIR = Path("../../product_details_ingestion/configs")
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%fZ"
+PRICE_PRECISION = Decimal("0.0001")
+SELECT_KNOWN_PRODUCTS_QUERY: str = f"""
+    SELECT PRODUCT_ID, SOURCE, UNIT_PRICE, UNIT, LISTED_UNIT, REGION, VENDOR, VAT_RATE, QUALITY_SCORE
+    FROM {TABLE_NAME} WHERE SOURCE IS NOT NULL ORDER BY PRODUCT_ID;
+"""
+PRICE_STAGING_TABLE_NAME = "PRICE_REFRESH_STAGING"
+PRICE_STAGING_COLUMNS = ["PRODUCT_ID", "UNIT_PRICE", "UNIT", "LISTED_UNIT", "PRICE_HASH", "UPDATED_AT"]
+CREATE_PRICE_STAGING_TABLE_QUERY: str = f"""
+    CREATE TEMP TABLE IF NOT EXISTS {PRICE_STAGING_TABLE_NAME} (
+        PRODUCT_ID VARCHAR(255) PRIMARY KEY,
+        UNIT_PRICE NUMERIC(12, 4),
+        UNIT UNIT_KIND,
+        LISTED_UNIT VARCHAR(50),
+        PRICE_HASH CHAR(40),
+        UPDATED_AT TIMESTAMP
+    ) ON COMMIT DELETE ROWS;
+"""
+COPY_PRICE_STAGING_QUERY: str = (f"COPY {PRICE_STAGING_TABLE_NAME} ({', '.join(PRICE_STAGING_COLUMNS)}) "
+                                 f"FROM STDIN WITH (FORMAT csv)")
+UPDATE_PRICES_FROM_STAGING_QUERY: str = f"""
+    UPDATE {TABLE_NAME} p SET
+        UNIT_PRICE = s.UNIT_PRICE,
+        UNIT = s.UNIT,
+        LISTED_UNIT = s.LISTED_UNIT,
+        PRICE_HASH = s.PRICE_HASH,
+        UPDATED_AT = s.UPDATED_AT
+    FROM {PRICE_STAGING_TABLE_NAME} s
+    WHERE p.PRODUCT_ID = s.PRODUCT_ID
+    AND (p.UNIT_PRICE, p.UNIT, p.LISTED_UNIT) IS DISTINCT FROM (s.UNIT_PRICE, s.UNIT, s.LISTED_UNIT);
+"""
+RECORD_PRICE_REFRESH_HISTORY_QUERY: str = build_price_history_query(PRICE_STAGING_TABLE_NAME)
+
+
+def load_supplier_configs(only: list = None) -> dict:
+    """
+    Supplier configs by supplier name, for price fetching only: no crawl state, HTTP cache shared with the scraper.
+    """
+    configs = {}
+    for path in sorted(SUPPLIER_CONFIG_DIR.glob("*.yaml")):
+        if "supplier" not in load_yaml_config(path=str(path)):
+            continue
+        config = load_supplier_config(str(path))
+        if only and config["supplier"] not in only:
+            continue
+        http_cache = dict(config.get("http_cache") or {})
+        if http_cache.get("path") and not Path(http_cache["path"]).is_absolute():
+            http_cache["path"] = str(SCRAPER_DIR / http_cache["path"])
+        config["http_cache"] = http_cache
+        config["crawl_state"] = {"enabled": False}
+        configs[config["supplier"]] = config
+    return configs
+
+
+def load_known_products(db_loader: DBUtil, suppliers: list) -> dict:
+    """
+    Stored price fields of every product with a source URL, grouped by supplier (PRODUCT_ID prefix).
+    """
+    columns = ["product_id", "source", "unit_price", "unit", "listed_unit", "region", "vendor", "vat_rate",
+               "quality_score"]
+    products = {supplier: [] for supplier in suppliers}
+    for row in db_loader.execute_query(SELECT_KNOWN_PRODUCTS_QUERY) or []:
+        product = dict(zip(columns, row))
+        supplier = product["product_id"].split("|", 1)[0]
+        if supplier in products:
+            products[supplier].append(product)
+    return products
+
+
+def normalize_price(product: dict, price: tuple) -> dict:
+    """
+    Stored product with a fetched (price, unit label): canonical UNIT_PRICE / UNIT, LISTED_UNIT and a
+    PRICE_HASH computed like normalize_product does at ingest.
+    """
+    listed_price, listed_unit = price
+    return normalize_product({**product, "unit_price": listed_price, "unit": listed_unit})
+
+
+def classify_price(product: dict, row: dict) -> str:
+    """
+    'unavailable' when no price could be parsed from the page, 'changed' when the product has no
+    stored price yet or it differs (at the column's precision: NUMERIC(12, 4)), else 'unchanged'.
+    """
+    if row["unit_price"] is None:
+        return "unavailable"
+    if product["unit_price"] is None:
+        return "changed"
+    fetched = (Decimal(row["unit_price"]).quantize(PRICE_PRECISION), row["unit"], row["listed_unit"])
+    stored = (Decimal(product["unit_price"]).quantize(PRICE_PRECISION), product["unit"], product["listed_unit"])
+    return "unchanged" if fetched == stored else "changed"
+
+
+def write_price_changes(db_loader: DBUtil, rows: list, updated_at: str) -> int:
+    """
+    One transaction per batch: COPY into the staging table, record the changes in PRICE_HISTORY, then one UPDATE.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([
+        [row["product_id"], row["unit_price"], "" if row["unit"] is None else row["unit"],
+         "" if row["listed_unit"] is None else row["listed_unit"], row["price_hash"], updated_at]
+        for row in {row["product_id"]: row for row in rows}.values()
+    ])
+    buffer.seek(0)
+    with db_loader.transaction() as cursor:
+        cursor.execute(CREATE_PRICE_STAGING_TABLE_QUERY)
+        cursor.copy_expert(COPY_PRICE_STAGING_QUERY, buffer)
+        cursor.execute(RECORD_PRICE_REFRESH_HISTORY_QUERY)
+        cursor.execute(UPDATE_PRICES_FROM_STAGING_QUERY)
+        return cursor.rowcount
+
+
+class PriceChangeWriter:
+    """
+    Collects changed rows from the fetch tasks and writes them `batch_size` at a time. The blocking
+    psycopg2 write runs in a worker thread (the event loop keeps fetching), one batch at a time so
+    the DB connection is never used by two threads at once. A failed batch is kept for `flush`.
+    """
+
+    def __init__(self, db_loader: DBUtil, updated_at: str, batch_size: int = 500) -> None:
+        self.db_loader = db_loader
+        self.updated_at = updated_at
+        self.batch_size = batch_size
+        self.pending = []
+        self.written = 0
+        self._lock = asyncio.Lock()
+
+    async def add(self, row: dict) -> None:
+        self.pending.append(row)
+        if len(self.pending) < self.batch_size:
+            return
+        async with self._lock:
+            if len(self.pending) < self.batch_size:  # written by another task while waiting
+                return
+            batch, self.pending = self.pending, []
+            try:
+                self.written += await asyncio.to_thread(write_price_changes, self.db_loader, batch, self.updated_at)
+            except Exception:
+                self.pending[:0] = batch
+                raise
+        print(f"(*) Price refresh: {self.written} prices updated")
+
+    def flush(self) -> int:
+        """
+        Write whatever is left, once the fetches are done (no event loop running).
+        """
+        if self.pending:
+            self.written += write_price_changes(self.db_loader, self.pending, self.updated_at)
+            self.pending = []
+        return self.written
+
+
+async def refresh_supplier(scrapper: Scrapper, products: list, on_change, stats: dict) -> None:
+    """
+    Fetch the price of every known product of one supplier, `concurrency` pages at a time;
+    `await on_change(row)` receives the normalized rows whose price changed.
+    """
+    async def refresh(product: dict) -> None:
+        price = await scrapper.get_price_async(product["source"])
+        if price is None:
+            stats["unavailable"] += 1
+            return
+        row = normalize_price(product, price)
+        outcome = classify_price(product, row)
+        stats[outcome] += 1
+        if outcome == "changed":
+            await on_change(row)
+
+    await drain(products, refresh, workers=scrapper.concurrency)
+
+
+async def run(scrappers: dict, products: dict, on_change, stats: dict) -> list:
+    return await asyncio.gather(*(refresh_supplier(scrapper, products[supplier], on_change, stats[supplier])
+                                  for supplier, scrapper in scrappers.items()), return_exceptions=True)
+
+
+def main() -> int:
+    settings = INGEST_CONFIG.get("price_refresh", {})
+    configs = load_supplier_configs(sys.argv[1:] or settings.get("suppliers"))
+    if not configs:
+        print("(*) No supplier config found")
+        return 1
+    db_config = read_json(path="../configs/db_creds.json")
+    db_loader = DBUtil(db_config=db_config, table_name=TABLE_NAME)
+    db_loader.execute_query(CREATE_PRICE_HISTORY_TABLE_QUERY)
+    products = load_known_products(db_loader, list(configs))
+    print(f"(*) Known products: { {supplier: len(rows) for supplier, rows in products.items()} }")
+
+    budget = CrawlBudget(int(settings.get("global_concurrency", 16)))
+    scrappers = {supplier: Scrapper(config=config, budget=budget) for supplier, config in configs.items()}
+    stats = {supplier: {"changed": 0, "unchanged": 0, "unavailable": 0} for supplier in configs}
+    updated_at = datetime.now(timezone.utc).strftime(DATETIME_FORMAT)
+    writer = PriceChangeWriter(db_loader, updated_at, batch_size=int(settings.get("batch_size", 500)))
+    started = time.perf_counter()
+
+    try:
+        results = asyncio.run(run(scrappers, products, writer.add, stats))
+        written = writer.flush()
+    finally:
+        for scrapper in scrappers.values():
+            scrapper.close()
+    for supplier, result in zip(scrappers, results):
+        print(f"(*) {supplier}: {stats[supplier]}" + (f" -- failed: {result!r}" if isinstance(result, BaseException) else ""))
+    print(f"(*) Price refresh: {written} prices updated in {time.perf_counter() - started:.1f}s")
+    if written:
+        publish_catalog(db_loader, INGEST_CONFIG.get("snapshot", {}).get("directory"))
+    db_loader.close()
+    return 1 if any(isinstance(result, BaseException) for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+One-off conversion of legacy `<supplier>_materials.json` arrays into append-only JSONL segments
+(`<supplier>_materials/<supplier>-000001.jsonl`), the format written by the scraper and read by db_ingest.
+The JSON files are streamed, not loaded, and left in place. Pass `--gzip` for compressed segments.
+"""
+
+import sys
+from pathlib import Path
+from sys import path as sys_path
+from os import path as os_path
+
+sys_path.append(os_path.realpath('../../'))
+sys_path.append(os_path.realpath('../'))
+sys_path.append(os_path.realpath('./'))
+
+from utils.jsonl_utils import JsonlSink, list_segments
+from utils.stream_utils import iter_json_array
+
+
+def convert(json_path: Path, compress: bool = False) -> int:
+    supplier = json_path.name[:-len("_materials.json")]
+    directory = json_path.with_name(f"{supplier}_materials")
+    if list_segments(directory, prefix=supplier):
+        print(f"(*) {directory} already has segments -- skipping {json_path.name}")
+        return 0
+    with JsonlSink(directory, prefix=supplier, compress=compress) as sink:
+        count = sink.write_many(iter_json_array(json_path))
+    print(f"✅ {json_path.name}: {count} records -> {directory}")
+    return count
+
+
+def main() -> None:
+    compress = "--gzip" in sys.argv[1:]
+    for json_path in sorted(Path("../data").glob("*_materials.json")):
+        convert(json_path, compress=compress)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Crawl check against a local stand-in supplier site.
+
+Serves a generated sitemap and product pages from a threaded HTTP server on 127.0.0.1 (with a
+simulated response latency), crawls it with the Scrapper sequentially (concurrency 1) and then with
+the configured concurrency, and reports pages/second plus the request rate seen by the server. Exits
+non-zero when a crawl collected too few products or the server saw more requests in a window than the
+rate limit allows (politeness violated). Single gaps are not checked: a request whose send is delayed
+by a few ms (thread scheduling) arrives close to the next one without exceeding the rate.
+
+    python crawl_benchmark.py [products] [concurrency] [latency_seconds]
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sys import path as sys_path
+from os import path as os_path
+
+sys_path.append(os_path.realpath('../../'))
+sys_path.append(os_path.realpath('../'))
+sys_path.append(os_path.realpath('./'))
+
+from scrapper import Scrapper
+
+RATE_LIMIT_SECONDS = [0.02, 0.04]
+# Politeness: in any window of WINDOW_TOKENS x the minimum interval, the bucket grants at most
+# WINDOW_TOKENS + 1 tokens (burst 1); one more request of slack absorbs send-time jitter.
+WINDOW_TOKENS = 10
+MAX_PEAK_REQUESTS = WINDOW_TOKENS + 2
+PRODUCT_PAGE = """<html><head><title>Produit {i}</title></head><body>
+<h1>Carrelage sol test {i}</h1><span class="price">{price},90 €/M²</span>
+<button>Ajouter au panier</button></body></html>"""
+
+
+class StandInSite:
+    def __init__(self, products: int, latency: float) -> None:
+        self.products = products
+        self.latency = latency
+        self.hits = []
+        self._lock = threading.Lock()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                with site._lock:
+                    site.hits.append(time.monotonic())
+                time.sleep(site.latency)
+                body, content_type = site.render(self.path)
+                self.send_response(200 if body else 404)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def render(self, path: str) -> tuple[bytes, str]:
+        if path == "/sitemap-prd.xml":
+            locs = "".join(f"<url><loc>{self.url}/produit/{i}.prd</loc></url>" for i in range(self.products))
+            xml = f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</urlset>'
+            return xml.encode("utf-8"), "application/xml"
+        if path.startswith("/produit/"):
+            i = int(path.rsplit("/", 1)[-1].split(".")[0])
+            return PRODUCT_PAGE.format(i=i, price=10 + i % 50).encode("utf-8"), "text/html; charset=utf-8"
+        return b"", "text/plain"
+
+    def peak_requests(self, window: float) -> int:
+        hits = sorted(self.hits)
+        peak, first = 0, 0
+        for last, hit in enumerate(hits):
+            while hit - hits[first] >= window:
+                first += 1
+            peak = max(peak, last - first + 1)
+        return peak
+
+    def close(self) -> None:
+        self.server.shutdown()
+
+
+def crawl(products: int, concurrency: int, latency: float) -> dict:
+    site = StandInSite(products, latency)
+    config = {
+        "supplier": "standin",
+        "url": site.url,
+        "sitemap_urls": [f"{site.url}/sitemap-prd.xml"],
+        "output": {"directory": "data/", "min_products": products},
+        "rate_limit_seconds": RATE_LIMIT_SECONDS,
+        "concurrency": concurrency,
+        "retry_count": 1,
+    }
+    scrapper = Scrapper(config=config)
+    start = time.perf_counter()
+    try:
+        collected = asyncio.run(scrapper.get_product_data_async(config["sitemap_urls"][0]))
+    finally:
+        scrapper.close()
+        site.close()
+    seconds = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "products": len(collected),
+        "requests": len(site.hits),
+        "seconds": round(seconds, 2),
+        "products_per_second": round(len(collected) / seconds, 1),
+        "peak_requests": site.peak_requests(WINDOW_TOKENS * RATE_LIMIT_SECONDS[0]),
+    }
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    products = int(args[0]) if len(args) > 0 else 100
+    concurrency = int(args[1]) if len(args) > 1 else 8
+    latency = float(args[2]) if len(args) > 2 else 0.2
+    failed = False
+    reports = []
+    for level in (1, concurrency):
+        report = crawl(products, level, latency)
+        ok = report["products"] >= products and report["peak_requests"] <= MAX_PEAK_REQUESTS
+        print(f"(*) {'OK' if ok else 'FAILED'} {report}")
+        failed |= not ok
+        reports.append(report)
+    print(f"(*) Speed-up with concurrency {concurrency}: "
+          f"{reports[0]['seconds'] / max(reports[1]['seconds'], 1e-9):.1f}x")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Crawls every supplier concurrently.
+
+Loads each supplier config in ../configs (YAML files with a `supplier` key, optionally restricted by
+`suppliers` in orchestrator.yaml) and runs one Scrapper per supplier on a single event loop. Every
+supplier keeps its own per-host rate limit, concurrency, HTTP cache, crawl state and output
+(data/<supplier>_materials/); a shared CrawlBudget caps the requests in flight across all of them.
+A full refresh therefore takes about as long as the slowest supplier. Per-supplier throughput,
+error rate and ETA are reported every `report_every_seconds` and at the end; a failing supplier does
+not stop the others.
+
+    python crawl_orchestrator.py [supplier ...]
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from sys import path as sys_path
+from os import path as os_path
+
+sys_path.append(os_path.realpath('../../'))
+sys_path.append(os_path.realpath('../'))
+sys_path.append(os_path.realpath('./'))
+
+from utils.crawl_utils import CrawlBudget
+from utils.operation_utils import load_yaml_config
+from scrapper import Scrapper, load_supplier_config
+
+CONFIG_DIR = Path("../configs")
+
+
+def load_supplier_configs(only: list = None) -> list[dict]:
+    configs = []
+    for path in sorted(CONFIG_DIR.glob("*.yaml")):
+        if "supplier" not in load_yaml_config(path=str(path)):
+            continue  # orchestrator.yaml and other non-supplier files
+        config = load_supplier_config(str(path))
+        if not only or config["supplier"] in only:
+            configs.append(config)
+    return configs
+
+
+def format_progress(progress: dict) -> str:
+    eta = progress["eta_seconds"]
+    eta_text = "done" if progress["done"] else ("unknown" if eta is None else f"{eta // 60}m{eta % 60:02d}s")
+    return (f"{progress['supplier']:<14} {progress['products']:>6}/{progress['target']:<6} products | "
+            f"{progress['pages']:>6} pages | {progress['products_per_minute']:>7} products/min | "
+            f"errors {progress['error_rate']:.1%} ({progress['failures']} failed URLs) | ETA {eta_text}")
+
+
+def report(scrappers: list, budget: CrawlBudget) -> None:
+    print(f"(*) Crawl progress ({budget.in_flight}/{budget.limit} requests in flight):")
+    for scrapper in scrappers:
+        print(f"    {format_progress(scrapper.progress())}")
+
+
+async def run(scrappers: list, budget: CrawlBudget, report_every: float) -> list:
+    async def reporter() -> None:
+        while True:
+            await asyncio.sleep(report_every)
+            report(scrappers, budget)
+
+    reporting = asyncio.create_task(reporter())
+    try:
+        return await asyncio.gather(*(scrapper.scrap_data_async() for scrapper in scrappers), return_exceptions=True)
+    finally:
+        reporting.cancel()
+
+
+def main() -> int:
+    settings = load_yaml_config(path=str(CONFIG_DIR / "orchestrator.yaml"))
+    only = sys.argv[1:] or settings.get("suppliers")
+    configs = load_supplier_configs(only)
+    if not configs:
+        print(f"(*) No supplier config found for {only}")
+        return 1
+    budget = CrawlBudget(int(settings.get("global_concurrency", 16)))
+    scrappers = [Scrapper(config=config, budget=budget) for config in configs]
+    print(f"(*) Crawling {[config['supplier'] for config in configs]} with a budget of {budget.limit} requests in flight")
+    try:
+        results = asyncio.run(run(scrappers, budget, float(settings.get("report_every_seconds", 30))))
+    finally:
+        for scrapper in scrappers:
+            scrapper.close()
+    report(scrappers, budget)
+    failed = [(scrapper.config["supplier"], result) for scrapper, result in zip(scrappers, results)
+              if isinstance(result, BaseException)]
+    for supplier, error in failed:
+        print(f"(*) {supplier} crawl failed: {error!r}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Per-page parse timing over saved fixture pages (`../data/fixtures/*.html`, URL taken from the
+canonical link).
+
+Compares the former flow (two "html.parser" trees per product: one for the product check, one for the
+extraction after a second download) with the single-pass `Scrapper.parse_product_html` on the
+fastest installed parser (lxml.html + compiled XPath when available), and checks that both return the
+same product. Exits non-zero on a mismatch.
+
+    python parse_benchmark.py [repeats]
+"""
+
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from sys import path as sys_path
+from os import path as os_path
+
+sys_path.append(os_path.realpath('../../'))
+sys_path.append(os_path.realpath('../'))
+sys_path.append(os_path.realpath('./'))
+
+from bs4 import BeautifulSoup
+from scrapper import Scrapper
+from utils.html_utils import HTML_PARSER
+
+CANONICAL_PATTERN = re.compile(rb'<link rel="canonical" href="([^"]+)"')
+
+
+def legacy_parse(scrapper: Scrapper, html: bytes, url: str):
+    if not scrapper.is_product_page(BeautifulSoup(html, "html.parser"), url):
+        return None
+    return scrapper.extract_product(BeautifulSoup(html, "html.parser"), url)
+
+
+def time_ms(func, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> int:
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    config = {"supplier": "fixture", "url": "https://www.example.fr", "output": {}, "rate_limit_seconds": [0, 0]}
+    scrapper = Scrapper(config=config)
+    scrapper.close()
+    print(f"(*) Parser: {HTML_PARSER}, median of {repeats} runs per page")
+    mismatches = []
+    totals = {"legacy": 0.0, "single_pass": 0.0}
+    for path in sorted(Path("../data/fixtures").glob("*.html")):
+        html = path.read_bytes()
+        url = CANONICAL_PATTERN.search(html).group(1).decode("utf-8")
+        legacy = legacy_parse(scrapper, html, url)
+        single = scrapper.parse_product_html(html, url)
+        if legacy != single:
+            mismatches.append(path.name)
+        legacy_ms = time_ms(lambda: legacy_parse(scrapper, html, url), repeats)
+        single_ms = time_ms(lambda: scrapper.parse_product_html(html, url), repeats)
+        totals["legacy"] += legacy_ms
+        totals["single_pass"] += single_ms
+        kind = "product" if single else ("incomplete" if single == {} else "not a product")
+        print(f"(*) {path.name} ({len(html) // 1024} KiB, {kind}): legacy {legacy_ms:.2f} ms -> "
+              f"single pass {single_ms:.2f} ms ({legacy_ms / max(single_ms, 1e-9):.1f}x)")
+    print(f"(*) Total: legacy {totals['legacy']:.2f} ms -> single pass {totals['single_pass']:.2f} ms")
+    if mismatches:
+        print(f"(*) Extraction differs from the html.parser result for: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,17 @@
-import time
+import asyncio
 import random
+import time
 from urllib.parse import urlparse, urljoin
+import sys
 from sys import path as sys_path
 from os import path as os_path, listdir
 from xml.etree import ElementTree as ET
-from bs4 import BeautifulSoup
 import re
 import hashlib
 from datetime import datetime
 import json
 from pathlib import Path
+from typing import Optional
 
 sys_path.append(os_path.realpath('../../'))
 sys_path.append(os_path.realpath('../'))
@@ -17,70 +19,121 @@ sys_path.append(os_path.realpath('./'))
 
 from utils.operation_utils import load_yaml_config, write_json_data, write_data
 from utils.request_utils import RequestUtils
+from utils.crawl_utils import AsyncCrawler, CrawlBudget, CrawlState, drain
+from utils.sitemap_utils import SitemapEntry, iter_sitemap
+from utils.jsonl_utils import JsonlSink
+from utils.html_utils import Selector, charset_from_content_type, contains_text, page_text, parse_html, text_of
 from contants import *
 
+# Compiled once; for name and price the selectors are tried in order and the first match wins
+PRODUCT_URL_PATTERN = re.compile(r"\.prd(?:$|[^a-zA-Z0-9])|/p/|/prd|/produit|/product", re.IGNORECASE)
+ADD_TO_CART_PATTERN = re.compile(r"Ajouter au panier", re.IGNORECASE)
+PRICE_PATTERN = re.compile(r"(\d+[.,]?\d*)\s*€(?:\s*/\s*([A-Za-z0-9²]+))?")
+UNIT_NOISE_PATTERN = re.compile(r"soit|Ajouter")
+H1_SELECTOR = Selector("h1")
+PRICE_CHECK_SELECTOR = Selector("span.price, .product-price, .lm-product-price, [data-testid='price']")
+NAME_SELECTORS = [Selector(selector) for selector in [
+    "h1",
+    "[data-testid='product-title']",
+    ".product-title",
+    ".product-name",
+    "div[data-product-name]",
+    "title",  # fallback to page title if all else fails
+]]
+PRICE_SELECTORS = [Selector(selector) for selector in [
+    "span.price",
+    ".product-price",
+    ".lm-product-price",
+    "[data-testid='price']",
+    ".price__value",
+    ".price",
+    "div[data-price]",
+    "meta[itemprop='price']",
+]]
+
+
+def _price_unit(unit: str) -> str:
+    if not unit:
+        return ""
+    return "/" + UNIT_NOISE_PATTERN.sub("", unit).replace("2", "\u00b2").replace("3", "\u00b3")
+
 
 class Scrapper:
-    def __init__(self, config: dict) -> None:
+    def __init__(self, config: dict, budget: Optional[CrawlBudget] = None) -> None:
         self.config = config
-        self.request = RequestUtils()
         self.retry_count = int(config.get("retry_count", "3"))
         self.min_products = int(config.get("output", {}).get("min_products", "100"))
+        # Requests in flight at once; each host is still limited to one request per `rate_limit_seconds`
+        self.concurrency = int(config.get("concurrency", "8"))
+        # Pooled keep-alive session per host; with `http_cache.path`, unchanged pages are revalidated (304)
+        # instead of downloaded again
+        http_cache = config.get("http_cache", {})
+        self.request = RequestUtils(cache_path=http_cache.get("path") if http_cache.get("enabled", True) else None,
+                                    pool_size=self.concurrency)
+        self.crawler = AsyncCrawler(self.request, rate_limit_seconds=config["rate_limit_seconds"],
+                                    concurrency=self.concurrency, retries=self.retry_count,
+                                    burst=int(config.get("rate_limit_burst", "1")), budget=budget)
+        self.region = self.get_region_from_url(config[next(filter(lambda x: "url" in x.lower(), config))])
+        self.vendor = config["supplier"].title()
+        # Incremental crawls: only URLs that are new or whose <lastmod> changed since the last run are fetched
+        crawl_state = config.get("crawl_state", {})
+        self.state = CrawlState(crawl_state["path"], config["supplier"], revisit_days=crawl_state.get("revisit_days")) \
+            if crawl_state.get("enabled") and crawl_state.get("path") else None
+        self.checkpoint_every = int(crawl_state.get("checkpoint_every", 100))
+        self.__sink = None
+        self.products_collected = 0
+        self.started_at = None
+        self.finished_at = None
     
     def __get_delay(self) -> float:
         return random.uniform(self.config["rate_limit_seconds"][0], self.config["rate_limit_seconds"][1])
-    
-    def __delay(self) -> None:
-        time.sleep(self.__get_delay())
-
-    def __get_urls_from_sitemap(self, sitemap_url: str) -> list[str]:
-        self.__delay()
-        response = self.request.get_data(
-            url=sitemap_url,
-            timeout=10,
-            retries=self.retry_count,
-            delay=self.__get_delay()
-        )
-        urls = []
-        if response and response.status_code == 200:
-            try:
-                root = ET.fromstring(response.content)
-                sitemap_index = root.findall(".//{http://www.sitemaps.org/schemas/sitemap/0.9}sitemap")
-                if sitemap_index:
-                    for sitemap in sitemap_index:
-                        loc = sitemap.find("{http://www.sitemaps.org/schemas/sitemap/0.9}loc")
-                        if loc:
-                            child_urls = self.__get_urls_from_sitemap(loc.text) or []
-                            urls.extend(child_urls)
+
+    async def __fetch(self, url: str, timeout: int = 20):
+        try:
+            return await self.crawler.fetch(url, timeout=timeout)
+        except Exception as ex:
+            print(f"(*) Fetch failed for {url}: {ex}")
+            return None
+
+    async def __iter_sitemap(self, sitemap_url: str, lastmod: Optional[str] = None, visited: Optional[list] = None):
+        """
+        <url> entries of a sitemap, streamed as it is parsed; sitemap indexes are followed. A child
+        sitemap whose <lastmod> is unchanged since its last complete crawl is not fetched at all.
+        Sitemaps read to the end are appended to `visited` as (url, lastmod).
+        """
+        if self.state is not None and self.state.sitemap_unchanged(sitemap_url, lastmod):
+            print(f"(*) Sitemap unchanged since last crawl: {sitemap_url}")
+            return
+        response = await self.__fetch(sitemap_url, timeout=10)
+        if response is None or response.status_code != 200:
+            return
+        try:
+            for entry in iter_sitemap(response.content):
+                if entry.sitemap:
+                    async for child in self.__iter_sitemap(entry.loc, entry.lastmod, visited):
+                        yield child
                 else:
-                    url_locs = root.findall(".//{http://www.sitemaps.org/schemas/sitemap/0.9}loc")
-                    urls.extend([elem.text for elem in url_locs if elem is not None])
-            except ET.ParseError as ex:
-                print(f"(*) Failed to parse sitemap {sitemap_url}: {ex}")
-        return urls
+                    yield entry
+        except ET.ParseError as ex:
+            print(f"(*) Failed to parse sitemap {sitemap_url}: {ex}")
+            return
+        if visited is not None:
+            visited.append((sitemap_url, lastmod))
         
-    def __locate_product_sitemaps(self) -> list[str]:
+    async def __locate_product_sitemaps(self) -> list[str]:
         robots_url = urljoin(self.config["url"], "/robots.txt")
         print(f"(*) Robots.txt URL: {robots_url}")
-        robots_url_response = self.request.get_data(url=robots_url, timeout=20, retries=self.retry_count, delay=self.__get_delay())
-        # print(robots_url_response)
-        self.__delay()
+        robots_url_response = await self.__fetch(robots_url, timeout=20)
 
         sitemaps = []
-        if robots_url_response.status_code == 200:
+        if robots_url_response is not None and robots_url_response.status_code == 200:
             for line in robots_url_response.text.splitlines():
                 if line.lower().startswith("sitemap:"):
                     sitemap_url = line.split(":", 1)[1].strip()
                     sitemaps.append(sitemap_url)
         print(f"(*) Discovered sitemap URLs: {sitemaps}")
-        self.__delay()
-
-        all_urls = []
-        for sitemap_url in sitemaps:
-            all_urls.extend(self.__get_urls_from_sitemap(sitemap_url))
-        all_prod_urls = list(set(all_urls))
-        print(f"(*) Few of the product URLs :{all_prod_urls[:5]}")
-        return all_prod_urls
+        # Sitemap indexes among them are expanded while crawling
+        return list(dict.fromkeys(sitemaps))
     
     def get_region_from_url(self, base_url: str) -> str:
         netloc = urlparse(base_url).netloc.lower()
@@ -94,32 +147,29 @@ class Scrapper:
         # extend with more mappings as needed
         return "Unknown"
         
-    def is_product_page(self, soup, url) -> bool:
+    def is_product_page(self, page, url) -> bool:
         """
         Heuristics:
         - URL contains '.prd' or '/p/' or '/produit' or '/product'
         - OR page has a main <h1> and a price element
         - OR contains typical 'Ajouter au panier' or 'Ajouter au panier' button text
         """
-        if url and re.search(r"\.prd(?:$|[^a-zA-Z0-9])|/p/|/prd|/produit|/product", url, re.IGNORECASE):
+        if url and PRODUCT_URL_PATTERN.search(url):
             return True
 
-        has_h1 = bool(soup.select_one("h1"))
-        has_price = bool(soup.select_one("span.price, .product-price, .lm-product-price, [data-testid='price']"))
+        has_h1 = H1_SELECTOR.select_one(page) is not None
+        has_price = PRICE_CHECK_SELECTOR.select_one(page) is not None
         if has_h1 and has_price:
             return True
 
         # check for add-to-cart button or typical CTA text
-        if soup.find(string=re.compile(r"Ajouter au panier|Ajouter au panier", re.IGNORECASE)):
+        if contains_text(page, ADD_TO_CART_PATTERN):
             return True
 
         return False
     
     def get_prices(self, data):
-        pattern = re.compile(r"(\d+[.,]?\d*)\s*€(?:\s*/\s*([A-Za-z0-9²]+))?")
-        matches = pattern.findall(data)
-        get_unit = lambda x: "/" + x.replace("soit", "").replace("Ajouter", "").replace("2", "\u00b2").replace("3", "\u00b3") if x else ""
-        return list(map(lambda x: x[0].strip(",").strip(".") + " €" + get_unit(x=x[1]), matches))
+        return [match[0].strip(",").strip(".") + " €" + _price_unit(match[1]) for match in PRICE_PATTERN.findall(data)]
 
     def parse_product_page(self, url, guess_category=None) -> dict:
         """
@@ -128,51 +178,77 @@ class Scrapper:
         try:
             print(f'Exploring url: {url}')
             resp = self.request.get_data(url=url, delay=self.__get_delay())
-            soup = BeautifulSoup(resp.text, "html.parser")
+            page = parse_html(resp.content, charset_from_content_type(resp.headers.get("Content-Type")))
+        except Exception as e:
+            print(f"(*) Error in parse_product_page({url}) → {e}")
+            return {}
+        return self.extract_product(page, url)
+
+    def parse_product_html(self, html, url: str, encoding: Optional[str] = None) -> Optional[dict]:
+        """
+        Single pass over an already-fetched page: one parse serves both the product-page check and
+        the field extraction. None when the page is not a product page, {} when it is but fields
+        are missing, the product dict otherwise.
+        """
+        try:
+            page = parse_html(html, encoding)
+        except Exception as e:
+            print(f"(*) Failed parsing HTML for {url}: {e}")
+            return None
+        if not self.is_product_page(page, url):
+            return None
+        return self.extract_product(page, url)
 
-            # Product name extraction (broader selectors)
+    def extract_price(self, page) -> Optional[tuple[str, str]]:
+        """
+        (price, unit label) of a parsed product page, e.g. ("12,95", "€/M²"), or None when no price is found.
+        """
+        # Broader selectors first, then a regex search over all the text
+        raw_price = None
+        for selector in PRICE_SELECTORS:
+            el = selector.select_one(page)
+            if el is not None:
+                # Selector text such as "12,95 €/M²" goes through the same normalization as the fallback
+                raw_price = self.get_prices(data=text_of(el, " "))
+                break
+        if not raw_price:
+            raw_price = self.get_prices(data=page_text(page))
+        if not raw_price:
+            return None
+        price, price_unit = raw_price[0].split(" ")
+        return price, price_unit
+
+    def parse_price_html(self, html, url: str, encoding: Optional[str] = None) -> Optional[tuple[str, str]]:
+        """
+        Price-only pass for known product URLs (price refresh): no product-page check and no name
+        extraction. (price, unit label) or None.
+        """
+        try:
+            return self.extract_price(parse_html(html, encoding))
+        except Exception as e:
+            print(f"(*) Failed parsing price for {url}: {e}")
+            return None
+
+    def extract_product(self, page, url: str) -> dict:
+        """
+        Structured dict per spec from the parsed HTML of a product page, or {} when fields are missing.
+        """
+        try:
+            # Product name extraction (broader selectors; the page title is the last resort)
             product_name = None
-            for selector in [
-                "h1",
-                "[data-testid='product-title']",
-                ".product-title",
-                ".product-name",
-                "div[data-product-name]",
-                "title"  # fallback to page title if all else fails
-            ]:
-                el = soup.select_one(selector)
-                if el:
-                    product_name = el.get_text(strip=True)
-                    break
-            if not product_name:
-                # Try meta title as last resort
-                title_tag = soup.select_one("title")
-                if title_tag:
-                    product_name = title_tag.get_text(strip=True)
-
-            # Price extraction (broader selectors and regex fallback)
-            raw_price = None
-            for selector in [
-                "span.price",
-                ".product-price",
-                ".lm-product-price",
-                "[data-testid='price']",
-                ".price__value",
-                ".price",
-                "div[data-price]",
-                "meta[itemprop='price']",
-            ]:
-                el = soup.select_one(selector)
-                if el:
-                    raw_price = el.get_text(strip=True)
+            for selector in NAME_SELECTORS:
+                el = selector.select_one(page)
+                if el is not None:
+                    product_name = text_of(el)
                     break
-            # Fallback: Try regex search in all text if still missing
-            if not raw_price:
-                price_matches = self.get_prices(data=soup.get_text())
-                if price_matches:
-                    raw_price = price_matches
-            
-            price, price_unit = raw_price[0].split(" ")
+
+            price = self.extract_price(page)
+
+            # Basic validation: required fields
+            if not product_name or not price or not url:
+                # Not a complete product: return empty dict to let caller skip
+                return {}
+            price, price_unit = price
 
             # build stable product_id from URL
             pid_hash = hashlib.md5(url.encode("utf-8")).hexdigest()
@@ -180,99 +256,207 @@ class Scrapper:
 
             # final object - required fields
             description = None
-            region = self.get_region_from_url(self.config[next(filter(lambda x: "url" in x.lower(), self.config))])
             vat_rate = None
             quality_score = None
-            VALUES = [product_id, product_name, description, price, price_unit, region, self.config["supplier"].title(),
+            VALUES = [product_id, product_name, description, price, price_unit, self.region, self.vendor,
                       vat_rate, quality_score, url]
-            product = dict(zip(PRODUCT_DATA_INGESTION_SCHEMA, VALUES))
-
-            # Basic validation: required fields
-            if not product_name or not raw_price or not url:
-                # Not a complete product: return empty dict to let caller skip
-                return {}
-            return product
+            return dict(zip(PRODUCT_DATA_INGESTION_SCHEMA, VALUES))
         except Exception as e:
             print(f"(*) Error in parse_product_page({url}) → {e}")
             return {}
     
-    def get_product_data(self, prod_url: str) -> list[dict]:
-        seen_urls = set()
-        products = []
+    def __mark(self, entry: SitemapEntry, status: str) -> None:
+        if self.state is None:
+            return
+        self.state.mark(entry.loc, entry.lastmod, status)
+        if self.__sink is not None and self.state.pending() >= self.checkpoint_every:
+            self.__checkpoint()
 
-        print(f"(*) Exploring sitemap: {prod_url}")
-        locs = self.__get_urls_from_sitemap(sitemap_url=prod_url)
-        print(f"(*) Sitemap {prod_url} contains {len(locs)} loc entries")
+    def __checkpoint(self) -> None:
+        """
+        Products first, crawl state second: a URL is only recorded as crawled once its product is on disk.
+        """
+        if self.__sink is not None:
+            self.__sink.flush()
+        if self.state is not None:
+            self.state.checkpoint()
 
-        # iterate each loc sequentially (for loop as you requested)
-        for loc in locs:
-            if loc in seen_urls:
-                continue
-            seen_urls.add(loc)
-            self.__delay()
-
-            # fetch the page
-            try:
-                resp = self.request.get_data(url=loc, delay = self.__get_delay())
-            except Exception as e:
-                print(f"(*) Skipping {loc}: fetch failed ({e})")
-                continue
+    async def __collect_product(self, entry: SitemapEntry, collect) -> None:
+        loc = entry.loc
+        # fetch the page
+        resp = await self.__fetch(loc)
+        if resp is None:
+            print(f"(*) Skipping {loc}: fetch failed")
+            self.__mark(entry, "failed")
+            return
 
-            # parse HTML and decide if product page
-            try:
-                soup = BeautifulSoup(resp.text, "html.parser")
-            except Exception as e:
-                print(f"(*) Failed parsing HTML for {loc}: {e}")
-                continue
+        # Product check + detail extraction on the same download and parse (off the event loop:
+        # parsing is CPU-bound). Decoded from the raw bytes: header charset, else the page's <meta charset>.
+        prod = await self.crawler.run_blocking(self.parse_product_html, resp.content, loc,
+                                               charset_from_content_type(resp.headers.get("Content-Type")))
+        if prod is None:
+            # Not a product detail page — skip to next loc (this respects "return to sitemap and continue")
+            self.__mark(entry, "not_product")
+            return
+        if prod:
+            collect(prod)
+            self.__mark(entry, "product")
+        else:
+            print(f"(*) Page looks like product but parsing incomplete for {loc}")
+            self.__mark(entry, "incomplete")
+
+    async def get_price_async(self, url: str) -> Optional[tuple[str, str]]:
+        """
+        (price, unit label) of a known product URL, fetched under the same rate limits as a crawl.
+        None when the page could not be fetched or shows no price.
+        """
+        resp = await self.__fetch(url)
+        if resp is None:
+            return None
+        return await self.crawler.run_blocking(self.parse_price_html, resp.content, url,
+                                               charset_from_content_type(resp.headers.get("Content-Type")))
 
-            if not self.is_product_page(soup, loc):
-                # Not a product detail page — skip to next loc (this respects "return to sitemap and continue")
+    async def __entries_to_fetch(self, sitemap_url: str, visited: list):
+        seen = set()
+        async for entry in self.__iter_sitemap(sitemap_url, visited=visited):
+            if entry.loc in seen:
                 continue
+            seen.add(entry.loc)
+            if self.state is None or self.state.should_fetch(entry.loc, entry.lastmod):
+                yield entry
 
-            # Parse product detail
-            prod = self.parse_product_page(loc, guess_category=None)
-            if prod:
-                products.append(prod)
-                print(f"(*) Collected product: {prod['material_name'][:60]} -> {prod['source']}")
-            else:
-                print(f"(*) Page looks like product but parsing incomplete for {loc}")
+    async def get_product_data_async(self, prod_url: str, emit=None, limit: Optional[int] = None) -> list[dict]:
+        """
+        Products of one sitemap (and its children), fetched `concurrency` pages at a time while the
+        sitemap is still being parsed. `emit(product)` is called as soon as each product is collected.
+        """
+        print(f"(*) Exploring sitemap: {prod_url}")
+        limit = self.min_products if limit is None else limit
+        products = {}
 
-            # stop if we reached required number of products
-            if len(products) >= self.min_products:
-                break
+        def collect(prod: dict) -> None:
+            if prod["product_id"] in products:  # dedupe by product_id
+                return
+            products[prod["product_id"]] = prod
+            self.products_collected += 1
+            print(f"(*) Collected product: {prod['material_name'][:60]} -> {prod['source']}")
+            if emit is not None:
+                emit(prod)
 
-        # dedupe by product_id
-        unique = {}
-        for p in products:
-            unique[p["product_id"]] = p
-        return list(unique.values())
+        visited = []
+        # `concurrency` workers share the entry stream (first occurrence of each URL only) and
+        # stop picking new entries once the required number of products is reached
+        handled = await drain(self.__entries_to_fetch(prod_url, visited), lambda entry: self.__collect_product(entry, collect),
+                              workers=self.concurrency, stop=lambda: len(products) >= limit)
+        print(f"(*) Sitemap {prod_url}: {handled} pages fetched, {len(products)} products")
+        if self.state is not None and len(products) < limit:
+            # Read to the end: unchanged child sitemaps can be skipped next time
+            for url, lastmod in visited:
+                self.state.sitemap_done(url, lastmod)
+        return list(products.values())
 
-    def scrap_data(self) -> None:
-        prod_sitemaps = self.config["sitemap_urls"] if "sitemap_urls" in self.config else self.__locate_product_sitemaps()
+    def get_product_data(self, prod_url: str) -> list[dict]:
+        return asyncio.run(self.get_product_data_async(prod_url))
+
+    def __open_sink(self):
+        """
+        Append-only JSONL segments (output.format: jsonl) or None for the legacy JSON array file.
+        """
+        output = self.config["output"]
+        if output.get("format", "json") != "jsonl":
+            return None
+        return JsonlSink(f"../{output['directory']}{self.config['supplier']}_materials", prefix=self.config["supplier"],
+                         compress=bool(output.get("compress", False)),
+                         max_records=int(output.get("segment_max_records", 50000)))
+
+    async def scrap_data_async(self) -> None:
+        prod_sitemaps = self.config["sitemap_urls"] if "sitemap_urls" in self.config else await self.__locate_product_sitemaps()
         print(f"(*) Total {len(prod_sitemaps)} sitemaps to explore.")
+        self.started_at, self.finished_at = time.monotonic(), None
+        self.products_collected = 0
+        sink = self.__sink = self.__open_sink()
         final_list = []
-        for prod_sitemap in prod_sitemaps:
-            final_list.extend(self.get_product_data(prod_url=prod_sitemap))
-            if len(final_list) >= self.min_products:
-                print(f"(*) Product limit {self.min_products} reached... Stopping fetching process...")
-                break
-        file_name = f"../{self.config['output']['directory']}{self.config['supplier']}_materials.json"
-        output_path = write_json_data(data=final_list, path=file_name, mode='a')
-        print(f"✅ Ingested data for {len(final_list)} products -> {output_path}")
+        collected = 0
+        try:
+            for prod_sitemap in prod_sitemaps:
+                # Appended as each product is collected: nothing already written is re-read or rewritten
+                products = await self.get_product_data_async(prod_url=prod_sitemap, limit=self.min_products - collected,
+                                                             emit=sink.write if sink is not None else final_list.append)
+                collected += len(products)
+                if collected >= self.min_products:
+                    print(f"(*) Product limit {self.min_products} reached... Stopping fetching process...")
+                    break
+            if sink is None:
+                file_name = f"../{self.config['output']['directory']}{self.config['supplier']}_materials.json"
+                output_path = write_json_data(data=final_list, path=file_name, mode='a')
+                self.__checkpoint()
+            else:
+                output_path = sink.directory
+        finally:
+            if sink is not None:
+                # Also on interruption: what was collected is published and the state checkpointed
+                self.__checkpoint()
+                sink.close()
+            self.__sink = None
+            self.finished_at = time.monotonic()
+        print(f"✅ Ingested data for {collected} products -> {output_path}")
+        print(f"(*) {self.config['supplier']} crawl stats: {self.crawler.stats()} | HTTP: {self.request.stats()}"
+              + (f" | State: {self.state.stats()}" if self.state is not None else ""))
 
+    def progress(self) -> dict:
+        """
+        Throughput, error rate and ETA (to `min_products`) of the current / last `scrap_data` run.
+        """
+        crawl = self.crawler.stats()
+        end = self.finished_at or time.monotonic()
+        elapsed = end - self.started_at if self.started_at is not None else 0.0
+        rate = self.products_collected / elapsed if elapsed > 0 else 0.0
+        remaining = max(0, self.min_products - self.products_collected)
+        return {
+            "supplier": self.config["supplier"],
+            "products": self.products_collected,
+            "target": self.min_products,
+            "pages": crawl["requests"],
+            "error_rate": round(crawl["errors"] / crawl["requests"], 4) if crawl["requests"] else 0.0,
+            "failures": crawl["failures"],
+            "products_per_minute": round(rate * 60, 1),
+            "elapsed_seconds": round(elapsed, 1),
+            "eta_seconds": 0 if self.finished_at is not None or not remaining else (
+                round(remaining / rate) if rate > 0 else None),
+            "done": self.finished_at is not None,
+        }
 
-def main() -> None:
-    ### castorama, leroy_merlin, manomano
-    supplier_name = "castorama"
-    config_path = f"../configs/{supplier_name}.yaml"
+    def close(self) -> None:
+        self.crawler.close()
+        self.request.close()
+        if self.state is not None:
+            self.state.close()
+
+    def scrap_data(self) -> None:
+        try:
+            asyncio.run(self.scrap_data_async())
+        finally:
+            self.close()
+
+
+def load_supplier_config(config_path: str) -> dict:
     config = load_yaml_config(path=config_path)
     parsed = urlparse(config["url"])
     config["url"] = f"{parsed.scheme or 'https'}://{parsed.netloc}"
+    return config
+
+
+def main() -> None:
+    ### castorama, leroy_merlin, manomano (all of them concurrently: crawl_orchestrator.py)
+    supplier_name = sys.argv[1] if len(sys.argv) > 1 else "castorama"
+    config_path = f"../configs/{supplier_name}.yaml"
+    config = load_supplier_config(config_path)
     print(f"(*) Config: {config}")
 
     scrapper = Scrapper(config=config)
     scrapper.scrap_data()
 
 
-main()
+if __name__ == "__main__":
+    main()
 
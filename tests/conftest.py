@@ -0,0 +1,81 @@
+"""
+Shared fixtures.
+
+The scripts under */src resolve their configs relative to the working directory (they are run from
+their own folder), so they are imported from there with `import_script`.
+
+PostgreSQL-backed tests run against the server named by TEST_DATABASE_DSN (a libpq DSN, e.g.
+"host=localhost port=5432 user=postgres"; the pgvector extension must be available). Each test gets
+a fresh database that is dropped afterwards. Without TEST_DATABASE_DSN they are skipped.
+"""
+
+import importlib
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def import_script(directory: str, module_name: str):
+    """
+    Import `<ROOT>/<directory>/<module_name>.py` with the working directory set like when it is run.
+    """
+    path = str(ROOT / directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        return importlib.import_module(module_name)
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture(scope="session")
+def db_ingest():
+    pytest.importorskip("psycopg2")
+    return import_script("database_ingestion/src", "db_ingest")
+
+
+@pytest.fixture
+def pg_config():
+    """
+    Connection kwargs (DBUtil `db_config`) of a fresh, empty database.
+    """
+    psycopg2 = pytest.importorskip("psycopg2")
+    dsn = os.environ.get("TEST_DATABASE_DSN")
+    if not dsn:
+        pytest.skip("TEST_DATABASE_DSN is not set")
+    name = f"donizo_test_{uuid.uuid4().hex[:12]}"
+    admin = psycopg2.connect(dsn)
+    admin.autocommit = True
+    with admin.cursor() as cursor:
+        cursor.execute(f"CREATE DATABASE {name} ENCODING 'UTF8' LC_COLLATE 'C' LC_CTYPE 'C' TEMPLATE template0")
+    try:
+        yield {"dsn": dsn, "dbname": name}
+    finally:
+        with admin.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
+        admin.close()
+
+
+@pytest.fixture
+def products_db(db_ingest, pg_config):
+    """
+    DBUtil on a fresh database holding an empty PRODUCTS table (plus metadata and price history tables).
+    """
+    from utils.db_utils import DBUtil
+
+    db = DBUtil(db_config=pg_config, table_name=db_ingest.TABLE_NAME)
+    db.init_queries(CREATE_TABLE_QUERY=db_ingest.CREATE_TABLE_QUERY, INSERT_DATA_QUERY=db_ingest.INSERT_DATA_QUERY)
+    db.execute_query(db_ingest.CREATE_METADATA_TABLE_QUERY)
+    db.execute_query(db_ingest.CREATE_PRICE_HISTORY_TABLE_QUERY)
+    try:
+        yield db
+    finally:
+        db.close()
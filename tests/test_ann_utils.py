@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from utils.ann_utils import IVFIndex
+from utils.vector_utils import normalize_rows
+
+PARAMS = {"n_lists": 8, "n_probe": 2, "train_size": 256, "n_iter": 3}
+
+
+def catalog(seed: int = 0, n: int = 400, dimension: int = 16) -> np.ndarray:
+    return normalize_rows(np.random.default_rng(seed).normal(size=(n, dimension)).astype(np.float32))
+
+
+@pytest.fixture
+def saved(tmp_path):
+    matrix = catalog()
+    index = IVFIndex(**PARAMS).build(matrix)
+    index.save(str(tmp_path / "ivf"))
+    return matrix, index, tmp_path / "ivf"
+
+
+def test_saved_index_is_reused_memory_mapped(saved):
+    matrix, index, path = saved
+    loaded = IVFIndex.load(str(path), matrix=matrix, **PARAMS)
+    assert loaded is not None and loaded.digest == index.digest
+    assert isinstance(loaded.list_ids, np.memmap) and not loaded.list_ids.flags.writeable
+    query = matrix[3]
+    assert np.array_equal(loaded.candidates(query), index.candidates(query))
+
+
+@pytest.mark.parametrize("change", [{"n_lists": 16}, {"train_size": 128}, {"n_iter": 5}, {"seed": 1}])
+def test_changed_build_params_force_a_rebuild(saved, change, capsys):
+    matrix, _, path = saved
+    assert IVFIndex.load(str(path), matrix=matrix, **{**PARAMS, **change}) is None
+    key = next(iter(change))
+    assert f"{key}: saved" in capsys.readouterr().out
+
+
+def test_n_probe_is_a_query_time_knob(saved):
+    matrix, _, path = saved
+    loaded = IVFIndex.load(str(path), matrix=matrix, **{**PARAMS, "n_probe": 8})
+    assert loaded is not None and loaded.n_probe == 8
+    assert len(loaded.candidates(matrix[0])) == len(matrix)
+    assert IVFIndex.load(str(path), matrix=matrix, **{**PARAMS, "n_probe": None}).n_probe == PARAMS["n_probe"]
+
+
+def test_index_over_other_vectors_is_stale(saved, capsys):
+    _, _, path = saved
+    assert IVFIndex.load(str(path), matrix=catalog(seed=1), **PARAMS) is None
+    assert "stale" in capsys.readouterr().out
+
+
+def test_default_n_lists_follows_the_catalog_size(tmp_path):
+    matrix = catalog()
+    params = {**PARAMS, "n_lists": None}
+    IVFIndex(**params).build(matrix).save(str(tmp_path / "ivf"))
+    assert IVFIndex.load(str(tmp_path / "ivf"), matrix=matrix, **params) is not None
+    assert IVFIndex.load(str(tmp_path / "ivf"), matrix=catalog(n=900), **params) is None
+
+
+def test_legacy_npz_path_is_rebuilt(tmp_path, capsys):
+    legacy = tmp_path / "ivf_index.npz"
+    np.savez(legacy, centroids=np.zeros((2, 2)))
+    assert IVFIndex.load(str(legacy), matrix=catalog(), **PARAMS) is None
+    assert "not a saved IVF index" in capsys.readouterr().out
+    assert IVFIndex.load(str(tmp_path / "missing"), **PARAMS) is None
@@ -0,0 +1,36 @@
+import threading
+import time
+
+from utils.batching_utils import EmbeddingBatcher
+
+
+def test_lone_request_does_not_wait_for_max_wait():
+    batcher = EmbeddingBatcher(lambda texts: [len(text) for text in texts], max_wait_ms=2000)
+    try:
+        started = time.perf_counter()
+        assert batcher.encode("colle", timeout=5) == 5
+        assert time.perf_counter() - started < 1.0
+    finally:
+        batcher.close(timeout=5)
+
+
+def test_requests_queued_during_an_encode_form_the_next_batch():
+    encoding, release, sizes = threading.Event(), threading.Event(), []
+
+    def encode(texts):
+        sizes.append(len(texts))
+        encoding.set()
+        assert release.wait(5)
+        return [len(text) for text in texts]
+
+    batcher = EmbeddingBatcher(encode, max_batch_size=8, max_wait_ms=2000)
+    try:
+        first = batcher.submit("colle")
+        assert encoding.wait(5)
+        pending = [batcher.submit(text) for text in ("carrelage", "plinthe", "joint")]
+        release.set()
+        assert first.result(timeout=5) == 5
+        assert [future.result(timeout=5) for future in pending] == [9, 7, 5]
+        assert sizes == [1, 3]
+    finally:
+        batcher.close(timeout=5)
@@ -0,0 +1,67 @@
+from utils.cache_utils import SearchResultCache
+
+RESULTS = [{"product_id": "castorama|1", "similarity_score": "0.91"}]
+
+
+def test_hit_under_the_same_catalog_version():
+    cache = SearchResultCache(max_size=10, ttl_seconds=None)
+    cache.set_version("7")
+    key = cache.make_key("  Carrelage BEIGE ", "France", None, 5, "7")
+    cache.put(key, RESULTS)
+    assert cache.get(cache.make_key("carrelage beige", "France", None, 5, "7")) == RESULTS
+    assert cache.get(cache.make_key("carrelage beige", "Belgium", None, 5, "7")) is None
+
+
+def test_cached_results_are_copies():
+    cache = SearchResultCache(ttl_seconds=None)
+    cache.set_version("1")
+    key = cache.make_key("colle", None, None, 5, "1")
+    cache.put(key, RESULTS)
+    cache.get(key)[0]["similarity_score"] = "0"
+    assert cache.get(key) == RESULTS
+
+
+def test_new_version_drops_every_entry():
+    cache = SearchResultCache(ttl_seconds=None)
+    assert cache.set_version("1") is True
+    old_key = cache.make_key("colle", None, None, 5, "1")
+    cache.put(old_key, RESULTS)
+    assert cache.set_version("1") is False
+    assert cache.set_version("2") is True
+    assert cache.get(old_key) is None
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_results_keyed_on_a_stale_version_are_not_stored():
+    cache = SearchResultCache(ttl_seconds=None)
+    cache.set_version("2")
+    cache.put(cache.make_key("colle", None, None, 5, "1"), RESULTS)
+    assert cache.stats()["size"] == 0
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("utils.cache_utils.time.time", lambda: now[0])
+    cache = SearchResultCache(ttl_seconds=60)
+    cache.set_version("1")
+    key = cache.make_key("colle", None, None, 5, "1")
+    cache.put(key, RESULTS)
+    now[0] += 59
+    assert cache.get(key) == RESULTS
+    now[0] += 2
+    assert cache.get(key) is None
+
+
+def test_lru_eviction_and_per_endpoint_stats():
+    cache = SearchResultCache(max_size=2, ttl_seconds=None)
+    cache.set_version("1")
+    keys = [cache.make_key(query, None, None, 5, "1") for query in ("a", "b", "c")]
+    for key in keys:
+        cache.put(key, RESULTS)
+    assert cache.get(keys[0], endpoint="/material-price") is None
+    assert cache.get(keys[2], endpoint="/material-price") == RESULTS
+    assert cache.get(keys[1], endpoint="/material-price/batch") == RESULTS
+    endpoints = cache.stats()["endpoints"]
+    assert endpoints["/material-price"] == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+    assert endpoints["/material-price/batch"] == {"hits": 1, "misses": 0, "hit_ratio": 1.0}
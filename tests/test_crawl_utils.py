@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+from utils.crawl_utils import CrawlBudget, HostRateLimiter, TokenBucket, drain
+
+
+async def acquisition_times(bucket: TokenBucket, count: int) -> list[float]:
+    times = []
+    for _ in range(count):
+        await bucket.acquire()
+        times.append(time.monotonic())
+    return times
+
+
+def test_token_bucket_spaces_acquisitions():
+    times = asyncio.run(acquisition_times(TokenBucket(0.05), 5))
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert min(gaps) >= 0.045
+
+
+def test_token_bucket_banks_at_most_burst_tokens():
+    async def scenario():
+        bucket = TokenBucket(0.1, burst=3)
+        await asyncio.sleep(0.35)  # would earn 3.5 tokens without the cap
+        return await acquisition_times(bucket, 4)
+
+    times = asyncio.run(scenario())
+    assert times[2] - times[0] < 0.05
+    assert times[3] - times[2] >= 0.09
+
+
+def test_token_bucket_is_fair_under_concurrency():
+    async def scenario():
+        bucket = TokenBucket(0.02)
+        times = []
+
+        async def worker():
+            await bucket.acquire()
+            times.append(time.monotonic())
+
+        await asyncio.gather(*(worker() for _ in range(6)))
+        return sorted(times)
+
+    times = asyncio.run(scenario())
+    assert times[-1] - times[0] >= 5 * 0.02 * 0.9
+
+
+def test_host_rate_limiter_keeps_one_bucket_per_host():
+    async def scenario():
+        limiter = HostRateLimiter(0.2)
+        started = time.monotonic()
+        await limiter.acquire("https://www.castorama.fr/a")
+        await limiter.acquire("https://www.manomano.fr/b")
+        await limiter.acquire("https://WWW.CASTORAMA.FR/c")
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.18
+
+
+def run_under_budget(budget: CrawlBudget, tasks: int) -> int:
+    async def scenario():
+        peak = 0
+
+        async def request():
+            nonlocal peak
+            async with budget:
+                peak = max(peak, budget.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(request() for _ in range(tasks)))
+        return peak
+
+    return asyncio.run(scenario())
+
+
+def test_crawl_budget_caps_requests_in_flight():
+    budget = CrawlBudget(3)
+    assert run_under_budget(budget, 10) == 3
+    assert budget.in_flight == 0
+
+
+def test_crawl_budget_can_be_reused_across_event_loops():
+    budget = CrawlBudget(2)
+    assert run_under_budget(budget, 5) == 2
+    assert run_under_budget(budget, 5) == 2
+
+
+def test_drain_handles_every_item_and_survives_handler_errors():
+    handled = []
+
+    async def handler(item):
+        await asyncio.sleep(0)
+        if item == 3:
+            raise ValueError("boom")
+        handled.append(item)
+
+    async def items():
+        for item in range(10):
+            yield item
+
+    assert asyncio.run(drain(items(), handler, workers=4)) == 10
+    assert sorted(handled) == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+
+
+def test_drain_stops_pulling_items():
+    handled = []
+
+    async def handler(item):
+        handled.append(item)
+
+    asyncio.run(drain(range(100), handler, workers=1, stop=lambda: len(handled) >= 5))
+    assert handled == [0, 1, 2, 3, 4]
@@ -0,0 +1,130 @@
+"""
+COPY + upsert path of database_ingestion/src/db_ingest.py against a real PostgreSQL (see conftest.py).
+"""
+
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from utils.normalization_utils import normalize_product
+
+UPDATED_AT = "2026-01-01 00:00:00"
+
+
+def scraped(product_id: str, **overrides) -> dict:
+    row = {"product_id": product_id, "material_name": f"Carrelage {product_id}", "description": "Grès cérame",
+           "unit_price": "1.234,95", "unit": "€/M²", "region": "France", "vendor": "Castorama",
+           "vat_rate": "20%", "quality_score": "4,5", "source": f"https://www.castorama.fr/{product_id}.prd"}
+    return normalize_product({**row, **overrides})
+
+
+def vector(seed: int, dimension: int) -> list:
+    return np.random.default_rng(seed).normal(size=dimension).astype(np.float32).tolist()
+
+
+def stored(db, product_id: str) -> tuple:
+    return db.execute_query(
+        "SELECT UNIT_PRICE, UNIT::TEXT, LISTED_UNIT, VAT_RATE, QUALITY_SCORE, EMBEDDING IS NOT NULL, "
+        "EMBEDDING::TEXT FROM PRODUCTS WHERE PRODUCT_ID = %s", params=(product_id,))[0]
+
+
+@pytest.fixture
+def ingest(db_ingest, products_db):
+    def write(rows: list, vectors: list) -> int:
+        values = [db_ingest.row_values(row, vec, UPDATED_AT) for row, vec in zip(rows, vectors)]
+        return db_ingest.copy_upsert(products_db, values)
+    return write
+
+
+def test_copy_upsert_inserts_typed_rows(db_ingest, products_db, ingest):
+    rows = [scraped("a"), scraped("b", unit_price="12.95", unit="€/g")]
+    assert ingest(rows, [vector(1, db_ingest.EMBEDDING_DIM), vector(2, db_ingest.EMBEDDING_DIM)]) == 2
+    assert stored(products_db, "a")[:6] == (Decimal("1234.95"), "m2", "€/M²", Decimal("0.2"), Decimal("4.5"), True)
+    assert stored(products_db, "b")[:3] == (Decimal("12950"), "kg", "€/g")
+
+
+def test_unchanged_rows_are_not_rewritten(db_ingest, products_db, ingest):
+    rows = [scraped("a"), scraped("b")]
+    vectors = [vector(1, db_ingest.EMBEDDING_DIM), vector(2, db_ingest.EMBEDDING_DIM)]
+    ingest(rows, vectors)
+    assert ingest(rows, vectors) == 0
+    assert db_ingest.classify_changes(products_db, rows) == ([], [], 2)
+
+
+def test_price_only_change_keeps_the_stored_embedding(db_ingest, products_db, ingest):
+    ingest([scraped("a")], [vector(1, db_ingest.EMBEDDING_DIM)])
+    embedding = stored(products_db, "a")[6]
+
+    repriced = scraped("a", unit_price="1.299,00")
+    renamed = scraped("a", material_name="Carrelage mural")
+    assert db_ingest.classify_changes(products_db, [repriced]) == ([], [repriced], 0)
+    assert db_ingest.classify_changes(products_db, [renamed]) == ([renamed], [], 0)
+
+    assert ingest([repriced], [None]) == 1
+    assert stored(products_db, "a")[0] == Decimal("1299")
+    assert stored(products_db, "a")[6] == embedding
+
+
+def test_repeated_product_in_a_batch_keeps_the_last_row(db_ingest, products_db, ingest):
+    rows = [scraped("a", unit_price="10"), scraped("a", unit_price="11")]
+    assert ingest(rows, [vector(1, db_ingest.EMBEDDING_DIM)] * 2) == 1
+    assert stored(products_db, "a")[0] == Decimal("11")
+
+
+# PRODUCTS as created before prices were typed (VARCHAR price / unit / VAT / quality, FLOAT[] embedding)
+LEGACY_TABLE_QUERY = """
+    CREATE TABLE PRODUCTS (
+        PRODUCT_ID VARCHAR(255) PRIMARY KEY, MATERIAL_NAME VARCHAR(500), DESCRIPTION TEXT,
+        UNIT_PRICE VARCHAR(50), UNIT VARCHAR(50), REGION VARCHAR(100), VENDOR VARCHAR(100),
+        VAT_RATE VARCHAR(50), QUALITY_SCORE VARCHAR(50), UPDATED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        SOURCE TEXT, EMBEDDING FLOAT[]
+    );
+"""
+
+
+def test_legacy_varchar_columns_are_migrated_with_ingest_rules(db_ingest, pg_config):
+    from utils.db_utils import DBUtil
+
+    db = DBUtil(db_config=pg_config, table_name=db_ingest.TABLE_NAME)
+    try:
+        db.execute_query(LEGACY_TABLE_QUERY)
+        legacy = [
+            ("a", "1.234,95", "€/M²", "20%", "4,5", vector(1, db_ingest.EMBEDDING_DIM)),
+            ("b", "12.95", "€/g", "5,5 %", None, vector(2, db_ingest.EMBEDDING_DIM)),
+            ("c", "sur devis", "€/Carton", "", "", None),
+        ]
+        for product_id, price, unit, vat, quality, embedding in legacy:
+            row = scraped(product_id)
+            db.execute_query(
+                "INSERT INTO PRODUCTS VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                params=(product_id, row["material_name"], row["description"], price, unit, row["region"],
+                        row["vendor"], vat, quality, UPDATED_AT, row["source"], embedding))
+
+        db.init_queries(CREATE_TABLE_QUERY=db_ingest.CREATE_TABLE_QUERY, INSERT_DATA_QUERY=db_ingest.INSERT_DATA_QUERY)
+        db.execute_query(db_ingest.MIGRATE_EMBEDDING_QUERY)
+        db.execute_query(db_ingest.MIGRATE_FINGERPRINT_COLUMNS_QUERY)
+        assert db_ingest.migrate_typed_columns(db) == 3
+        assert db_ingest.migrate_typed_columns(db) == 0
+
+        assert stored(db, "a")[:6] == (Decimal("1234.95"), "m2", "€/M²", Decimal("0.2"), Decimal("4.5"), True)
+        assert stored(db, "b")[:6] == (Decimal("12950"), "kg", "€/g", Decimal("0.055"), None, True)
+        assert stored(db, "c")[:6] == (None, "unit", "€/Carton", None, None, False)
+        # Fingerprints match what ingest computes: re-ingesting the same product is a no-op
+        same = scraped("a")
+        assert db_ingest.classify_changes(db, [same]) == ([], [], 1)
+    finally:
+        db.close()
+
+
+def test_legacy_linear_metre_enum_value_is_renamed(db_ingest, pg_config):
+    from utils.db_utils import DBUtil
+
+    db = DBUtil(db_config=pg_config, table_name=db_ingest.TABLE_NAME)
+    try:
+        db.execute_query("CREATE TYPE UNIT_KIND AS ENUM ('m2', 'unit', 'litre', 'kg', 'ml')")
+        db.init_queries(CREATE_TABLE_QUERY=db_ingest.CREATE_TABLE_QUERY, INSERT_DATA_QUERY=db_ingest.INSERT_DATA_QUERY)
+        labels = db.execute_query("SELECT unnest(enum_range(NULL::UNIT_KIND))::TEXT")
+        assert [label for (label,) in labels] == ["m2", "unit", "litre", "kg", "lm"]
+    finally:
+        db.close()
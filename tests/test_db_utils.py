@@ -0,0 +1,116 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from utils.db_utils import DBUtil
+
+
+class FakePool:
+    """
+    Hands out the given connections in order; an exception in the list is raised by getconn.
+    """
+
+    def __init__(self, *connections):
+        self.connections = list(connections)
+        self.returned = []
+        self.minconn, self.maxconn = 1, 2
+
+    def getconn(self):
+        conn = self.connections.pop(0)
+        if isinstance(conn, Exception):
+            raise conn
+        return conn
+
+    def putconn(self, conn, close=False):
+        if any(returned is conn for returned, _ in self.returned):
+            raise psycopg2.pool.PoolError("trying to put unkeyed connection")
+        self.returned.append((conn, close))
+
+
+class FakeCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        pass
+
+
+def fake_connection(closed: bool = False):
+    # The health check may probe with SELECT 1, depending on how long the host has been up
+    return SimpleNamespace(closed=closed, autocommit=False, cursor=FakeCursor,
+                           info=SimpleNamespace(transaction_status=TRANSACTION_STATUS_IDLE))
+
+
+def pooled_db(pool) -> DBUtil:
+    db = DBUtil(db_config={}, pool={"max_size": 2, "health_check_seconds": 3600})
+    db.pool = pool
+    db._slots = threading.BoundedSemaphore(2)
+    return db
+
+
+def test_reconnect_failure_after_discarding_a_broken_connection_surfaces():
+    broken = fake_connection(closed=True)
+    pool = FakePool(broken, psycopg2.OperationalError("could not connect to server"))
+    db = pooled_db(pool)
+    with pytest.raises(psycopg2.OperationalError, match="could not connect"):
+        with db.checkout():
+            pass
+    assert pool.returned == [(broken, True)]
+    assert db.pool_metrics["discarded"] == 1
+    assert db._slots.acquire(blocking=False) and db._slots.acquire(blocking=False)  # slot released
+
+
+def test_broken_connections_are_replaced():
+    broken, healthy = fake_connection(closed=True), fake_connection()
+    pool = FakePool(broken, healthy)
+    db = pooled_db(pool)
+    with db.checkout() as conn:
+        assert conn is healthy
+        assert db.pool_stats()["in_use"] == 1
+    assert pool.returned == [(broken, True), (healthy, False)]
+    stats = db.pool_stats()
+    assert stats["in_use"] == 0 and stats["checkouts"] == 1 and stats["discarded"] == 1
+    assert (stats["min_size"], stats["max_size"]) == (1, 2)
+
+
+def test_pool_stats_before_the_pool_exists():
+    stats = DBUtil(db_config={}, pool={"max_size": 4}).pool_stats()
+    assert stats["pooled"] is True and stats["max_size"] is None and stats["in_use"] == 0
+
+
+def test_pooled_queries_and_transactions(pg_config):
+    db = DBUtil(db_config=pg_config, pool={"min_size": 1, "max_size": 2, "health_check_seconds": 0})
+    try:
+        db.execute_query("CREATE TABLE t (id INT PRIMARY KEY)")
+        with db.transaction() as cursor:
+            cursor.execute("INSERT INTO t VALUES (1), (2)")
+        with pytest.raises(psycopg2.errors.UniqueViolation):
+            with db.transaction() as cursor:
+                cursor.execute("INSERT INTO t VALUES (3)")
+                cursor.execute("INSERT INTO t VALUES (1)")
+        assert db.execute_query("SELECT id FROM t ORDER BY id") == [(1,), (2,)]
+        assert db.pool_stats()["in_use"] == 0
+    finally:
+        db.close()
+
+
+def test_connection_killed_server_side_is_discarded(pg_config):
+    db = DBUtil(db_config=pg_config, pool={"min_size": 1, "max_size": 1, "health_check_seconds": 0})
+    try:
+        pid = db.execute_query("SELECT pg_backend_pid()")[0][0]
+        admin = psycopg2.connect(**pg_config)
+        admin.autocommit = True
+        with admin.cursor() as cursor:
+            cursor.execute("SELECT pg_terminate_backend(%s)", (pid,))
+        admin.close()
+        assert db.execute_query("SELECT pg_backend_pid()")[0][0] != pid
+        assert db.pool_stats()["discarded"] == 1
+    finally:
+        db.close()
@@ -0,0 +1,13 @@
+import pytest
+
+from utils.embedding_utils import build_embedding_backend, local_model_dir
+
+
+def test_missing_local_model_fails_clearly(tmp_path):
+    with pytest.raises(FileNotFoundError, match="download_model.py"):
+        build_embedding_backend("torch", model_path=str(tmp_path / "all-MiniLM-L6-v2"))
+
+
+def test_local_model_dir(tmp_path):
+    (tmp_path / "config.json").write_text("{}", encoding="utf-8")
+    assert local_model_dir(str(tmp_path)) == tmp_path
@@ -0,0 +1,69 @@
+import gzip
+import json
+
+import pytest
+
+from utils.jsonl_utils import JsonlSink, list_segments
+from utils.stream_utils import iter_records
+
+
+def records(start: int, count: int) -> list[dict]:
+    return [{"product_id": f"castorama|{i}", "unit_price": f"{i},95"} for i in range(start, start + count)]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_segments_rotate_and_read_back_in_order(tmp_path, compress):
+    with JsonlSink(str(tmp_path), prefix="castorama", compress=compress, max_records=4) as sink:
+        sink.write_many(records(0, 10))
+    segments = list_segments(str(tmp_path), prefix="castorama")
+    assert [path.name for path in segments] == [
+        f"castorama-00000{i}.jsonl{'.gz' if compress else ''}" for i in (1, 2, 3)]
+    assert list(iter_records(str(tmp_path))) == records(0, 10)
+    assert not list(tmp_path.glob(".*.part"))
+
+
+def test_open_part_is_not_visible_to_readers(tmp_path):
+    sink = JsonlSink(str(tmp_path), prefix="castorama")
+    sink.write_many(records(0, 3))
+    sink.flush()
+    assert list_segments(str(tmp_path)) == []
+    sink.close()
+    assert list(iter_records(str(tmp_path))) == records(0, 3)
+
+
+def test_crashed_part_is_recovered_without_its_torn_line(tmp_path):
+    JsonlSink(str(tmp_path), prefix="castorama").close()  # nothing written: no segment
+    with JsonlSink(str(tmp_path), prefix="castorama") as sink:
+        sink.write_many(records(0, 2))
+    # A crash while writing segment 2: complete lines plus a torn one
+    part = tmp_path / ".castorama-000002.jsonl.part"
+    lines = [json.dumps(record) + "\n" for record in records(2, 3)]
+    part.write_text("".join(lines) + '{"product_id": "castorama|torn', encoding="utf-8")
+
+    with JsonlSink(str(tmp_path), prefix="castorama") as sink:
+        sink.write_many(records(5, 2))
+
+    assert [path.name for path in list_segments(str(tmp_path))] == [
+        "castorama-000001.jsonl", "castorama-000002.jsonl", "castorama-000003.jsonl"]
+    assert list(iter_records(str(tmp_path))) == records(0, 7)
+    assert not part.exists()
+
+
+def test_truncated_compressed_part_keeps_decoded_lines(tmp_path):
+    part = tmp_path / ".castorama-000001.jsonl.gz.part"
+    payload = gzip.compress("".join(json.dumps(record) + "\n" for record in records(0, 50)).encode("utf-8"))
+    part.write_bytes(payload[:-20])  # lost the gzip trailer and the end of the stream
+
+    JsonlSink(str(tmp_path), prefix="castorama", compress=True).close()
+
+    recovered = list(iter_records(str(tmp_path)))
+    assert recovered == records(0, len(recovered))
+    assert [path.name for path in list_segments(str(tmp_path))] == ["castorama-000001.jsonl.gz"]
+
+
+def test_empty_crashed_part_is_dropped(tmp_path):
+    (tmp_path / ".castorama-000001.jsonl.part").write_text('{"torn', encoding="utf-8")
+    with JsonlSink(str(tmp_path), prefix="castorama") as sink:
+        sink.write(records(0, 1)[0])
+    assert [path.name for path in list_segments(str(tmp_path))] == ["castorama-000002.jsonl"]
+    assert list(iter_records(str(tmp_path))) == records(0, 1)
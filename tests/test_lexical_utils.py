@@ -0,0 +1,15 @@
+import numpy as np
+
+from utils.lexical_utils import BM25Index
+
+DOCUMENTS = ["Colle carrelage intérieur", "Carrelage grès cérame beige 60x60", "Peinture acrylique blanche",
+             "Colle époxy pour carreaux de carrelage extérieur"]
+
+
+def test_score_documents_matches_the_index(tmp_path):
+    index = BM25Index().build(DOCUMENTS)
+    expected = index.score_all("colle carrelage 60 x 60")
+    assert np.allclose(index.score_documents("colle carrelage 60 x 60", DOCUMENTS), expected)
+    loaded = BM25Index.load(index.save(tmp_path / "bm25"), k1=1.2, b=0.75)
+    assert np.allclose(loaded.score_documents("colle carrelage 60 x 60", DOCUMENTS), expected)
+    assert not loaded.score_documents("parquet", DOCUMENTS).any()
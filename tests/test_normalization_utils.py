@@ -0,0 +1,112 @@
+from decimal import Decimal
+
+import pytest
+
+from utils.normalization_utils import fingerprint, normalize_product, parse_decimal, parse_unit, parse_vat_rate
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("12,95", Decimal("12.95")),
+    ("12.95", Decimal("12.95")),
+    ("1 234,95 €", Decimal("1234.95")),
+    ("1.234,95", Decimal("1234.95")),
+    ("1,234.95", Decimal("1234.95")),
+    ("1.234.567", Decimal("1234567")),
+    ("1.234", Decimal("1.234")),
+    ("0.125", Decimal("0.125")),
+    ("0.055", Decimal("0.055")),
+    ("12.950", Decimal("12.95")),
+    ("0.125.000", None),
+    (12, Decimal("12")),
+    (Decimal("3.5"), Decimal("3.5")),
+    ("", None),
+    ("n/a", None),
+    (None, None),
+    (True, None),
+])
+def test_parse_decimal(value, expected):
+    assert parse_decimal(value) == expected
+
+
+@pytest.mark.parametrize("label, expected", [
+    ("€/M²", ("m2", Decimal(1))),
+    ("€/m2", ("m2", Decimal(1))),
+    ("€/cm²", ("m2", Decimal(10000))),
+    ("€/ml", ("lm", Decimal(1))),
+    ("€/ML", ("lm", Decimal(1))),
+    ("€/m", ("lm", Decimal(1))),
+    ("€/mètre linéaire", ("lm", Decimal(1))),
+    ("€/mL", ("litre", Decimal(1000))),
+    ("€/millilitre", ("litre", Decimal(1000))),
+    ("€/L", ("litre", Decimal(1))),
+    ("€/cl", ("litre", Decimal(100))),
+    ("€/kg", ("kg", Decimal(1))),
+    ("€/g", ("kg", Decimal(1000))),
+    ("€/Carton", ("unit", Decimal(1))),
+    ("€ par pièce", ("unit", Decimal(1))),
+    ("€/le lot", ("unit", Decimal(1))),
+    ("€/l'unité", ("unit", Decimal(1))),
+    ("€/la pièce", ("unit", Decimal(1))),
+    ("€/furlong", (None, Decimal(1))),
+    ("", (None, Decimal(1))),
+    (None, (None, Decimal(1))),
+])
+def test_parse_unit(label, expected):
+    assert parse_unit(label) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("20%", Decimal("0.2")),
+    ("5,5 %", Decimal("0.055")),
+    (20, Decimal("0.2")),
+    (0.2, Decimal("0.2")),
+    ("0.055", Decimal("0.055")),
+    ("5.5", Decimal("0.055")),
+    ("1%", Decimal("0.01")),
+    ("0,5 %", Decimal("0.005")),
+    (1, Decimal("0.01")),
+    (None, None),
+])
+def test_parse_vat_rate(value, expected):
+    assert parse_vat_rate(value) == expected
+
+
+def scraped(**overrides) -> dict:
+    row = {"product_id": "castorama|abc", "material_name": "Colle carrelage", "description": None,
+           "unit_price": "0,45", "unit": "€/g", "region": "France", "vendor": "Castorama",
+           "vat_rate": "20%", "quality_score": "4,5", "source": "https://www.castorama.fr/colle.prd"}
+    return {**row, **overrides}
+
+
+def test_normalize_product_converts_to_canonical_unit():
+    product = normalize_product(scraped())
+    assert product["unit_price"] == Decimal("450")  # per gram -> per kg
+    assert product["unit"] == "kg"
+    assert product["listed_unit"] == "€/g"
+    assert product["vat_rate"] == Decimal("0.2")
+    assert product["quality_score"] == Decimal("4.5")
+    assert product["material_name"] == "Colle carrelage"
+
+
+def test_normalize_product_keeps_unparsable_price_as_none():
+    product = normalize_product(scraped(unit_price="sur devis", unit="€/furlong"))
+    assert product["unit_price"] is None
+    assert product["unit"] is None
+    assert product["listed_unit"] == "€/furlong"
+
+
+def test_fingerprints_separate_text_from_price_changes():
+    base = normalize_product(scraped())
+    repriced = normalize_product(scraped(unit_price="0,49"))
+    renamed = normalize_product(scraped(material_name="Colle carrelage flex"))
+    assert len(base["content_hash"]) == len(base["price_hash"]) == 40
+    assert repriced["content_hash"] == base["content_hash"]
+    assert repriced["price_hash"] != base["price_hash"]
+    assert renamed["content_hash"] != base["content_hash"]
+    assert renamed["price_hash"] == base["price_hash"]
+    assert normalize_product(scraped()) == base
+
+
+def test_fingerprint_treats_none_and_empty_alike():
+    assert fingerprint("a", None) == fingerprint("a", "")
+    assert fingerprint("a", "b") != fingerprint("ab", "")
@@ -0,0 +1,99 @@
+"""
+Price classification, the off-loop batch writer and PRICE_HISTORY of database_ingestion/src/price_refresh.py.
+"""
+
+import asyncio
+import threading
+from decimal import Decimal
+
+import pytest
+
+from conftest import import_script
+from test_db_ingest import UPDATED_AT, scraped, vector
+
+pytest.importorskip("psycopg2")
+price_refresh = import_script("database_ingestion/src", "price_refresh")
+
+STORED = {"product_id": "castorama|a", "unit_price": Decimal("1234.9500"), "unit": "m2", "listed_unit": "€/M²"}
+
+
+@pytest.mark.parametrize("stored, fetched, outcome", [
+    (STORED, {"unit_price": Decimal("1234.95"), "unit": "m2", "listed_unit": "€/M²"}, "unchanged"),
+    (STORED, {"unit_price": Decimal("1234.950049"), "unit": "m2", "listed_unit": "€/M²"}, "unchanged"),
+    (STORED, {"unit_price": Decimal("1299"), "unit": "m2", "listed_unit": "€/M²"}, "changed"),
+    (STORED, {"unit_price": Decimal("1234.95"), "unit": "unit", "listed_unit": "€/Carton"}, "changed"),
+    (STORED, {"unit_price": None, "unit": "m2", "listed_unit": "€/M²"}, "unavailable"),
+    ({**STORED, "unit_price": None}, {"unit_price": Decimal("12.95"), "unit": "m2", "listed_unit": "€/M²"}, "changed"),
+    ({**STORED, "unit_price": None}, {"unit_price": None, "unit": "m2", "listed_unit": "€/M²"}, "unavailable"),
+])
+def test_classify_price(stored, fetched, outcome):
+    assert price_refresh.classify_price(stored, fetched) == outcome
+
+
+def test_batches_are_written_off_the_event_loop(monkeypatch):
+    writes = []
+
+    def write(db_loader, rows, updated_at):
+        writes.append((threading.current_thread() is threading.main_thread(), [row["product_id"] for row in rows]))
+        return len(rows)
+
+    monkeypatch.setattr(price_refresh, "write_price_changes", write)
+    writer = price_refresh.PriceChangeWriter(db_loader=None, updated_at=UPDATED_AT, batch_size=2)
+
+    async def produce():
+        await asyncio.gather(*(writer.add({"product_id": str(i)}) for i in range(5)))
+
+    asyncio.run(produce())
+    assert [on_loop for on_loop, _ in writes] == [False, False]
+    assert writer.flush() == 5
+    assert sorted(i for _, ids in writes for i in ids) == ["0", "1", "2", "3", "4"]
+
+
+def test_failed_batch_is_kept_for_the_final_flush(monkeypatch):
+    calls = []
+
+    def write(db_loader, rows, updated_at):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise OSError("connection reset")
+        return len(rows)
+
+    monkeypatch.setattr(price_refresh, "write_price_changes", write)
+    writer = price_refresh.PriceChangeWriter(db_loader=None, updated_at=UPDATED_AT, batch_size=2)
+
+    async def produce():
+        await writer.add({"product_id": "a"})
+        with pytest.raises(OSError):
+            await writer.add({"product_id": "b"})
+
+    asyncio.run(produce())
+    assert [row["product_id"] for row in writer.pending] == ["a", "b"]
+    assert writer.flush() == 2 and calls == [2, 2]
+
+
+def history(db) -> list:
+    return db.execute_query("SELECT PRODUCT_ID, UNIT_PRICE, PREVIOUS_UNIT_PRICE, UNIT::TEXT, PREVIOUS_UNIT::TEXT "
+                            "FROM PRICE_HISTORY ORDER BY ID")
+
+
+def test_ingest_and_refresh_record_price_history(db_ingest, products_db):
+    def ingest(row):
+        return db_ingest.copy_upsert(products_db, [db_ingest.row_values(row, vector(1, db_ingest.EMBEDDING_DIM),
+                                                                        UPDATED_AT)])
+
+    ingest(scraped("castorama|a"))
+    ingest(scraped("castorama|a", unit_price="1.299,00"))
+    ingest(scraped("castorama|a", material_name="Carrelage mural", unit_price="1.299,00"))  # no price change
+    assert history(products_db) == [("castorama|a", Decimal("1234.95"), None, "m2", None),
+                                     ("castorama|a", Decimal("1299"), Decimal("1234.95"), "m2", "m2")]
+
+    [product] = price_refresh.load_known_products(products_db, ["castorama"])["castorama"]
+    assert price_refresh.classify_price(product, price_refresh.normalize_price(product, ("1.299,00", "€/M²"))) \
+        == "unchanged"
+    repriced = price_refresh.normalize_price(product, ("12,95", "€/g"))
+    assert price_refresh.classify_price(product, repriced) == "changed"
+    assert price_refresh.write_price_changes(products_db, [repriced], UPDATED_AT) == 1
+    assert price_refresh.write_price_changes(products_db, [repriced], UPDATED_AT) == 0
+    assert history(products_db)[2:] == [("castorama|a", Decimal("12950"), Decimal("1299"), "kg", "m2")]
+    assert products_db.execute_query("SELECT UNIT_PRICE, UNIT::TEXT, LISTED_UNIT, MATERIAL_NAME FROM PRODUCTS") \
+        == [(Decimal("12950"), "kg", "€/g", "Carrelage mural")]
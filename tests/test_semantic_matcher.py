@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from conftest import import_script
+
+pytest.importorskip("fastapi")
+semantic_matcher = import_script("apis/src", "semantic_matcher")
+
+RESULTS = [{"product_id": "castorama|1", "similarity_score": "0.91"}]
+
+
+class ReloadingMatcher(semantic_matcher.SemanticMatcher):
+    """
+    Matcher whose catalog version and index reload are driven by the test instead of the database.
+    """
+
+    def __init__(self):
+        self.db_version = "1"
+        self.reloads = 0
+        self.reload_started = threading.Event()
+        self.release_reload = threading.Event()
+        self.release_reload.set()
+        self.fail_reload = False
+        super().__init__({}, model=None, search_config={
+            "result_cache": {"max_size": 100, "ttl_seconds": None, "version_check_seconds": 0}})
+
+    def _read_catalog_version(self):
+        return self.db_version
+
+    def refresh_index(self) -> int:
+        self.reloads += 1
+        self.reload_started.set()
+        assert self.release_reload.wait(5)
+        if self.fail_reload:
+            raise RuntimeError("snapshot unreadable")
+        return 0
+
+
+def wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_version_switches_only_after_the_index_is_reloaded():
+    matcher = ReloadingMatcher()
+    key = matcher._cache_key("colle", None, None, 5)
+    matcher.result_cache.put(key, RESULTS)
+
+    matcher.db_version = "2"
+    matcher.release_reload.clear()
+    assert matcher._cache_key("colle", None, None, 5) == key  # reload in progress: still version 1
+    assert matcher.reload_started.wait(5)
+    assert matcher.result_cache.get(key) == RESULTS
+    # Results computed from the previous index while reloading stay under the previous version
+    stale_key = matcher._cache_key("carrelage", None, None, 5)
+    assert stale_key[-1] == "1"
+    matcher.result_cache.put(stale_key, RESULTS)
+
+    matcher.release_reload.set()
+    wait_until(lambda: matcher.catalog_version() == "2")
+    assert matcher.result_cache.get(key) is None
+    assert matcher.result_cache.get(stale_key) is None
+    assert matcher._cache_key("colle", None, None, 5)[-1] == "2"
+    assert matcher.result_cache.stats()["invalidations"] == 1
+
+
+def test_one_reload_at_a_time():
+    matcher = ReloadingMatcher()
+    matcher.db_version = "2"
+    matcher.release_reload.clear()
+    for _ in range(5):
+        matcher.catalog_version()
+    assert matcher.reload_started.wait(5)
+    matcher.release_reload.set()
+    wait_until(lambda: matcher.catalog_version() == "2")
+    assert matcher.reloads == 2  # initial load + one reload
+
+
+def test_failed_reload_keeps_the_previous_version_and_retries():
+    matcher = ReloadingMatcher()
+    matcher.fail_reload = True
+    matcher.db_version = "2"
+    matcher.catalog_version()
+    wait_until(lambda: matcher.reloads == 2 and not matcher._reloading)
+    assert matcher._catalog_version == "1"
+
+    matcher.fail_reload = False
+    wait_until(lambda: matcher.catalog_version() == "2")
+
+
+class FallbackMatcher(semantic_matcher.SemanticMatcher):
+    """
+    Matcher whose pgvector query returns `pgvector` (None: DBUtil reported an error; an exception is
+    raised) and whose in-memory index is built from `catalog` on demand.
+    """
+
+    catalog = ()
+
+    def __init__(self, pgvector=None, catalog=(), search_config=None):
+        super().__init__({}, model=None, search_config=search_config or {})  # loads the empty default catalog
+        self.pgvector = pgvector
+        self.catalog = list(catalog)
+        self.queries = []
+        self.db_client.execute_query = self.query_pgvector
+
+    def _read_catalog_version(self):
+        return "1"
+
+    def refresh_index(self) -> int:
+        return self.index.build(self.catalog)
+
+    def query_pgvector(self, query, params=None):
+        self.queries.append(params)
+        if isinstance(self.pgvector, Exception):
+            raise self.pgvector
+        return self.pgvector
+
+
+def product(product_id: str, embedding: list, name: str = "Colle") -> tuple:
+    return (product_id, name, "", 12.5, "kg", "France", "Castorama", 0.2, 4.5, "2026-01-01", "https://x",
+            embedding)
+
+
+def test_pgvector_results_are_returned_as_is():
+    matcher = FallbackMatcher(pgvector=[product("a", None)[:-1] + (0.9,)])
+    assert [r["product_id"] for r in matcher.search_vector([1.0, 0.0])] == ["a"]
+    assert not matcher.index.is_ready
+
+
+def test_hybrid_text_queries_rerank_pgvector_candidates():
+    catalog = [product("a", [1.0, 0.0], "Peinture blanche"), product("b", [0.8, 0.6], "Colle carrelage"),
+               product("c", [0.0, 1.0], "Plinthe chêne")]
+    candidates = [row[:-1] + (similarity,) for row, similarity in zip(catalog[:2], (0.95, 0.8))]
+    matcher = FallbackMatcher(pgvector=candidates, catalog=catalog,
+                              search_config={"hybrid": {"alpha": 0.5, "pgvector_candidates": 20}})
+    matcher.refresh_index()
+    assert matcher.index.is_hybrid
+    results = matcher.search_vector([1.0, 0.0], limit=1, text="colle carrelage")
+    assert [r["product_id"] for r in results] == ["b"]
+    assert matcher.queries[-1][-1] == 20  # pgvector answered, with the candidates to re-rank
+    assert [r["product_id"] for r in matcher.search_vector([1.0, 0.0], limit=1)] == ["a"]
+    assert matcher.queries[-1][-1] == 1
+
+    matcher.pgvector = None  # pgvector down: in-memory hybrid search
+    assert [r["product_id"] for r in matcher.search_vector([1.0, 0.0], limit=1, text="colle carrelage")] == ["b"]
+
+
+@pytest.mark.parametrize("pgvector", [None, [], pytest.param("raise", id="psycopg2.Error")])
+def test_pgvector_failure_falls_back_to_the_in_memory_index(pgvector):
+    import psycopg2
+
+    if pgvector == "raise":
+        pgvector = psycopg2.OperationalError("server closed the connection unexpectedly")
+    matcher = FallbackMatcher(pgvector=pgvector, catalog=[product("a", [1.0, 0.0]), product("b", [0.0, 1.0])])
+    results = matcher.search_vector([0.1, 1.0], limit=1)
+    assert [r["product_id"] for r in results] == ["b"]
+
+
+def test_unloadable_index_is_unavailable():
+    matcher = FallbackMatcher(pgvector=None, catalog=[])
+    with pytest.raises(semantic_matcher.IndexUnavailable):
+        matcher.search_vector([1.0, 0.0])
+
+
+def test_dimension_mismatch_is_unavailable():
+    matcher = FallbackMatcher(pgvector=None, catalog=[product("a", [1.0, 0.0, 0.0])])
+    with pytest.raises(semantic_matcher.IndexUnavailable):
+        matcher.search_vector([1.0, 0.0])
+    matcher.embedder.embed_batch = lambda texts: [[1.0, 0.0] for _ in texts]
+    with pytest.raises(semantic_matcher.IndexUnavailable):
+        matcher.search_batch([{"query": "colle"}])
+
+
+def test_other_errors_are_not_swallowed():
+    matcher = FallbackMatcher(pgvector=TypeError("bug"), catalog=[product("a", [1.0, 0.0])])
+    with pytest.raises(TypeError):
+        matcher.search_vector([1.0, 0.0])
+
+
+def test_unavailable_index_is_answered_with_503():
+    api = import_script("apis/src", "semantic_match_api")
+    response = asyncio.run(api.index_unavailable(None, semantic_matcher.IndexUnavailable("not loaded")))
+    assert response.status_code == 503
@@ -0,0 +1,116 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from utils.ann_utils import IVFIndex
+from utils.lexical_utils import BM25Index
+from utils.snapshot_utils import ColumnarRows, latest_snapshot, load_snapshot, write_snapshot
+from utils.vector_utils import VectorIndex, normalize_rows
+
+COLUMNS = ["PRODUCT_ID", "MATERIAL_NAME", "DESCRIPTION", "UNIT_PRICE", "UNIT", "REGION", "VENDOR",
+           "VAT_RATE", "QUALITY_SCORE", "UPDATED_AT", "SOURCE"]
+CATEGORICAL = ["UNIT", "REGION", "VENDOR"]
+HYBRID = {"alpha": 0.7, "prefilter_k": 50, "k1": 1.2, "b": 0.75}
+NAMES = ["Carrelage grès cérame 60x60", "Colle carrelage étanche", "Peinture blanche mate", "Plinthe chêne"]
+
+
+def catalog(n: int = 40, dimension: int = 8) -> tuple[list, np.ndarray]:
+    rows = [(f"castorama|{i}", NAMES[i % len(NAMES)], None if i % 5 == 0 else f"Référence {i}",
+             Decimal(f"{i}.95") if i % 7 else None, "m2" if i % 2 else "unit", ["Île-de-France", "Bretagne"][i % 2],
+             ["Castorama", "Leroy Merlin", None][i % 3], Decimal("0.2"), 4.5, datetime(2026, 1, 1, i % 24),
+             f"https://www.castorama.fr/{i}.prd") for i in range(n)]
+    matrix = normalize_rows(np.random.default_rng(0).normal(size=(n, dimension)).astype(np.float32))
+    return rows, matrix
+
+
+def expected(row: tuple) -> tuple:
+    return tuple(float(v) if isinstance(v, Decimal) else v.isoformat() if isinstance(v, datetime) else v
+                 for v in row)
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    rows, matrix = catalog()
+    path = write_snapshot(str(tmp_path), matrix, COLUMNS, rows, categorical=CATEGORICAL,
+                          lexical=BM25Index(k1=1.2, b=0.75).build([f"{r[1]} {r[2] or ''}" for r in rows]))
+    return rows, matrix, path
+
+
+def test_columns_round_trip_memory_mapped(snapshot):
+    rows, matrix, path = snapshot
+    loaded = load_snapshot(latest_snapshot(str(path.parent)))
+    assert isinstance(loaded["rows"], ColumnarRows) and len(loaded["rows"]) == len(rows)
+    assert [loaded["rows"][i] for i in range(len(rows))] == [expected(row) for row in rows]
+    assert loaded["rows"][-1] == expected(rows[-1])
+    kinds = {spec["name"]: spec["kind"] for spec in loaded["column_specs"]}
+    assert (kinds["UNIT_PRICE"], kinds["REGION"], kinds["DESCRIPTION"]) == ("number", "category", "text")
+    for name in ("col_REGION.npy", "col_DESCRIPTION.data.npy", "col_UNIT_PRICE.npy"):
+        array = np.load(path / name, mmap_mode="r")
+        assert isinstance(array, np.memmap) and not array.flags.writeable
+    assert np.array_equal(loaded["matrix"], matrix)
+
+
+def test_equals_mask_matches_the_decoded_values(snapshot):
+    rows, _, path = snapshot
+    columnar = load_snapshot(path)["rows"]
+    for col, value in [(5, "Île-de-France"), (6, "Leroy Merlin"), (6, "Brico Dépôt"), (1, NAMES[1]), (3, 5.95)]:
+        mask = columnar.equals_mask(col, value)
+        assert np.array_equal(mask, np.array([expected(row)[col] == value for row in rows]))
+
+
+def test_legacy_json_rows_still_load(tmp_path):
+    rows, matrix = catalog(n=3)
+    (tmp_path / "v1").mkdir()
+    np.save(tmp_path / "v1" / "embeddings.npy", matrix)
+    (tmp_path / "v1" / "metadata.json").write_text(json.dumps(
+        {"version": "v1", "dimension": 8, "count": 3, "columns": COLUMNS, "quantizers": {},
+         "rows": [list(expected(row)) for row in rows]}), encoding="utf-8")
+    loaded = load_snapshot(tmp_path / "v1")
+    assert loaded["rows"] == [expected(row) for row in rows]
+    assert loaded["lexical_path"] is None and loaded["ann_path"] is None
+    index = VectorIndex(hybrid=HYBRID)
+    assert index.load_snapshot(tmp_path / "v1") == 3
+    assert index.search(matrix[1], region="Bretagne", limit=1)[0][0] == "castorama|1"
+
+
+def test_snapshot_search_matches_an_index_built_from_rows(snapshot, capsys):
+    rows, matrix, path = snapshot
+    built, mapped = VectorIndex(hybrid=HYBRID), VectorIndex(hybrid=HYBRID)
+    built.build([(*expected(row), list(vector)) for row, vector in zip(rows, matrix)])
+    mapped.load_snapshot(path)
+    assert "Loaded BM25 index" in capsys.readouterr().out
+    assert isinstance(mapped._state["lexical"].doc_ids, np.memmap)
+    for query in (matrix[3], matrix[10] + matrix[11]):
+        for filters in ({}, {"region": "Bretagne"}, {"vendor": "Castorama"}, {"region": "Bretagne", "vendor": "Nope"},
+                        {"text": "colle étanche"}, {"text": "carrelage 60 x 60", "vendor": "Leroy Merlin"}):
+            got, want = mapped.search(query, limit=5, **filters), built.search(query, limit=5, **filters)
+            assert [r[:-1] for r in got] == [r[:-1] for r in want]
+            assert [r[-1] for r in got] == pytest.approx([r[-1] for r in want], abs=1e-6)
+
+
+def test_lexical_index_with_other_params_is_rebuilt(snapshot, capsys):
+    _, matrix, path = snapshot
+    index = VectorIndex(hybrid={**HYBRID, "k1": 1.5})
+    index.load_snapshot(path)
+    assert "rebuilding" in capsys.readouterr().out
+    assert not isinstance(index._state["lexical"].doc_ids, np.memmap)
+    assert index.search(matrix[0], text="peinture", limit=1)
+
+
+def test_ivf_index_shipped_in_the_snapshot_is_used(tmp_path, capsys):
+    rows, matrix = catalog(n=200)
+    params = {"n_lists": 4, "train_size": 200, "n_iter": 3}
+    path = write_snapshot(str(tmp_path), matrix, COLUMNS, rows, categorical=CATEGORICAL,
+                          ann=IVFIndex(**params).build(matrix))
+    index = VectorIndex(ann_backend="ivf", ann_params={**params, "n_probe": 4}, ann_min_rows=100)
+    index.load_snapshot(path)
+    assert f"Loaded IVF index from {path / 'ivf'}" in capsys.readouterr().out
+    assert index.search(matrix[7], limit=1)[0][0] == "castorama|7"
+
+    other = VectorIndex(ann_backend="ivf", ann_params={**params, "n_lists": 8}, ann_min_rows=100)
+    other.load_snapshot(path)
+    assert "built with other parameters" in capsys.readouterr().out
+    assert other._state["ann"].n_lists == 8
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from utils.vector_utils import VectorIndex, normalize_rows, to_pgvector
+
+
+def catalog(n: int = 300, dimension: int = 16, seed: int = 0) -> tuple[list, np.ndarray]:
+    matrix = normalize_rows(np.random.default_rng(seed).normal(size=(n, dimension)).astype(np.float32))
+    rows = [(f"castorama|{i}", f"Produit {i}", "", 1.0, "unit", ["Bretagne", "Occitanie"][i % 2],
+             ["Castorama", "Leroy Merlin"][i % 3 % 2], 0.2, 4.0, "2026-01-01", "https://x", list(vector))
+            for i, vector in enumerate(matrix)]
+    return rows, matrix
+
+
+def test_to_pgvector():
+    assert to_pgvector([1, 0.5]) == "[1.0,0.5]"
+
+
+@pytest.mark.parametrize("rerank_path", [None, "rerank.npy"])
+def test_quantized_index_keeps_only_the_codes_resident(tmp_path, rerank_path):
+    rows, matrix = catalog()
+    quantization = {"mode": "int8", "rerank_k": 64,
+                    "rerank_path": str(tmp_path / rerank_path) if rerank_path else None}
+    index = VectorIndex(quantization=quantization)
+    index.build(rows)
+    usage = index.memory_usage()
+    assert usage["matrix_memory_mapped"] is True
+    assert usage["resident_bytes"] == usage["scan_bytes"] == matrix.shape[0] * matrix.shape[1]
+    assert list(tmp_path.iterdir()) == ([tmp_path / rerank_path] if rerank_path else [])
+    assert index.search(matrix[42], limit=1)[0][0] == "castorama|42"
+
+
+def test_float32_index_is_resident():
+    rows, matrix = catalog()
+    index = VectorIndex()
+    index.build(rows)
+    usage = index.memory_usage()
+    assert usage["matrix_memory_mapped"] is False and usage["resident_bytes"] == matrix.nbytes
+
+
+@pytest.mark.parametrize("mode", ["int8", "float16", "pq"])
+def test_score_batch_matches_score(mode):
+    from utils.quantization_utils import build_quantizer, fit_quantizer_params
+    _, matrix = catalog()
+    quantizer = build_quantizer(mode, fit_quantizer_params(matrix, [mode], {"pq": {"m": 4, "n_centroids": 16}})[mode])
+    codes = quantizer.encode(matrix)
+    quantizer.chunk_size = 64
+    queries = matrix[:5]
+    expected = np.stack([quantizer.score(codes, query) for query in queries])
+    assert np.allclose(quantizer.score_batch(codes, queries), expected, atol=1e-4)
+
+
+@pytest.mark.parametrize("options", [
+    {"quantization": {"mode": "int8", "rerank_k": 16}},
+    {"quantization": {"mode": "float16", "rerank_k": 16}},
+    {"ann_backend": "ivf", "ann_params": {"n_lists": 8, "n_probe": 2}, "ann_min_rows": 0},
+    {"ann_backend": "ivf", "ann_params": {"n_lists": 8, "n_probe": 1}, "ann_min_rows": 0,
+     "quantization": {"mode": "int8", "rerank_k": 16}},
+])
+def test_search_batch_matches_search(options):
+    rows, matrix = catalog()
+    index = VectorIndex(**options)
+    index.build(rows)
+    queries = matrix[:40] + 0.1
+    filters = [{"limit": 5, "region": "Bretagne" if i % 3 == 0 else None} for i in range(len(queries))]
+    expected = [index.search(query, region=params["region"], limit=5) for query, params in zip(queries, filters)]
+    assert index.search_batch(queries, filters, chunk_size=16) == expected
@@ -0,0 +1,231 @@
+"""
+utils/ann_utils.py
+
+Responsibilities:
+- Approximate nearest-neighbour candidate generation for the in-memory VectorIndex.
+- IVF: a spherical k-means coarse quantizer; each vector lives in the inverted list of its
+  closest centroid and a query only visits the `n_probe` closest lists.
+- Backends only produce a shortlist of row positions; VectorIndex re-ranks it exactly.
+- A saved IVF index is a directory of .npy arrays (memory-mapped read-only on load) plus `index.json`
+  with its build parameters and digest. The digest covers the vectors and the structural parameters
+  (n_lists, train_size, n_iter, seed), so an index built over other vectors or with other parameters
+  is reported and rebuilt instead of reused. n_probe is a query-time knob and never forces a rebuild.
+- Expose:
+    - build_ann_backend(name, **params) -> ANNBackend | None
+    - IVFIndex.build(matrix) / IVFIndex.candidates(query, n_probe=None) -> np.ndarray
+    - IVFIndex.candidates_batch(queries, n_probe=None) -> list[np.ndarray]
+    - IVFIndex.save(path) / IVFIndex.load(path, matrix=None, **params) -> IVFIndex | None
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+
+def matrix_digest(matrix: np.ndarray) -> str:
+    """
+    Cheap fingerprint of a matrix (shape + strided sample of rows) used to detect stale saved indexes.
+    """
+    step = max(1, matrix.shape[0] // 1024)
+    sample = np.ascontiguousarray(matrix[::step], dtype=np.float32)
+    digest = hashlib.md5(str(matrix.shape).encode("utf-8"))
+    digest.update(sample.tobytes())
+    return digest.hexdigest()
+
+
+class ANNBackend:
+    """
+    Interface for candidate generators plugged into VectorIndex.
+    """
+    name = "base"
+
+    def build(self, matrix: np.ndarray) -> "ANNBackend":
+        raise NotImplementedError
+
+    def candidates(self, query: np.ndarray, n_probe: Optional[int] = None) -> np.ndarray:
+        raise NotImplementedError
+
+    def candidates_batch(self, queries: np.ndarray, n_probe: Optional[int] = None) -> list[np.ndarray]:
+        return [self.candidates(query, n_probe=n_probe) for query in queries]
+
+    def save(self, path: str) -> Path:
+        raise NotImplementedError
+
+
+class IVFIndex(ANNBackend):
+    """
+    Inverted-file index over L2-normalized vectors.
+
+    Knobs:
+        n_lists    -- number of k-means centroids (default ~ 4 * sqrt(n)).
+        n_probe    -- lists visited per query; higher = better recall, slower.
+        train_size -- vectors sampled to train the centroids.
+        n_iter     -- k-means iterations.
+    """
+    name = "ivf"
+
+    def __init__(self, n_lists: Optional[int] = None, n_probe: int = 8, train_size: int = 65536,
+                 n_iter: int = 10, seed: int = 42, chunk_size: int = 16384) -> None:
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_size = train_size
+        self.n_iter = n_iter
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.centroids = None
+        self.list_offsets = None
+        self.list_ids = None
+        self.digest = None
+
+    def structural_params(self, n: int) -> dict:
+        """
+        Parameters that shape an index over `n` vectors, with n_lists resolved (None -> ~ 4 * sqrt(n)).
+        """
+        n_lists = self.n_lists or int(4 * np.sqrt(n))
+        return {"n_lists": max(1, min(n_lists, n)), "train_size": int(self.train_size),
+                "n_iter": int(self.n_iter), "seed": int(self.seed)}
+
+    @staticmethod
+    def build_digest(matrix: np.ndarray, params: dict) -> str:
+        digest = hashlib.md5(matrix_digest(matrix).encode("utf-8"))
+        digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _assign(self, matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """
+        Closest centroid (max inner product) for every row, in chunks to bound memory.
+        """
+        labels = np.empty(matrix.shape[0], dtype=np.int32)
+        for start in range(0, matrix.shape[0], self.chunk_size):
+            block = matrix[start:start + self.chunk_size]
+            labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        return labels
+
+    def _train(self, matrix: np.ndarray, n_lists: int) -> np.ndarray:
+        rng = np.random.default_rng(self.seed)
+        n = matrix.shape[0]
+        sample = matrix[rng.choice(n, size=min(n, self.train_size), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            labels = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=n_lists)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty lists with random sample points.
+                sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()), replace=False)]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+        return centroids
+
+    def build(self, matrix: np.ndarray) -> "IVFIndex":
+        started = time.perf_counter()
+        n = matrix.shape[0]
+        params = self.structural_params(n)
+        n_lists = params["n_lists"]
+        self.centroids = self._train(matrix, n_lists)
+        labels = self._assign(matrix, self.centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=n_lists)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.list_ids = order.astype(np.int64)
+        self.n_lists = n_lists
+        self.digest = self.build_digest(matrix, params)
+        print(f"(*) IVF index built: {n} vectors, {n_lists} lists in {time.perf_counter() - started:.2f}s")
+        return self
+
+    def candidates(self, query: np.ndarray, n_probe: Optional[int] = None) -> np.ndarray:
+        return self.candidates_batch(np.asarray(query)[None, :], n_probe=n_probe)[0]
+
+    def candidates_batch(self, queries: np.ndarray, n_probe: Optional[int] = None) -> list[np.ndarray]:
+        """
+        Shortlist of every query; the centroids are scored for all queries with one matrix product.
+        """
+        n_probe = max(1, min(n_probe or self.n_probe, self.n_lists))
+        centroid_scores = queries @ self.centroids.T
+        if n_probe < self.n_lists:
+            probes = np.argpartition(-centroid_scores, n_probe - 1, axis=1)[:, :n_probe]
+        else:
+            probes = np.broadcast_to(np.arange(self.n_lists), (len(queries), self.n_lists))
+        shortlists = []
+        for query_probes in probes:
+            starts, ends = self.list_offsets[query_probes], self.list_offsets[query_probes + 1]
+            shortlists.append(np.concatenate([self.list_ids[s:e] for s, e in zip(starts, ends)]))
+        return shortlists
+
+    def save(self, path: str) -> Path:
+        """
+        Write the index to the directory `path`, replacing any previous one.
+        """
+        out_dir = Path(path)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for name in ("centroids", "list_offsets", "list_ids"):
+            np.save(out_dir / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        meta = {"params": {"n_lists": int(self.n_lists), "train_size": int(self.train_size),
+                           "n_iter": int(self.n_iter), "seed": int(self.seed)},
+                "n_probe": int(self.n_probe), "digest": self.digest}
+        # index.json is written last (atomically): a directory without it is never loaded
+        tmp = out_dir / "index.json.tmp"
+        tmp.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        os.replace(tmp, out_dir / "index.json")
+        print(f"(*) IVF index saved -> {out_dir}")
+        return out_dir
+
+    @classmethod
+    def load(cls, path: str, matrix: Optional[np.ndarray] = None, **params) -> Optional["IVFIndex"]:
+        """
+        Load a saved index; its arrays stay memory-mapped read-only. `params` are the configured
+        knobs (as for the constructor). When `matrix` is given, returns None -- after saying why --
+        if the index was built over different vectors or with different structural parameters;
+        the caller should rebuild.
+        """
+        p = Path(path)
+        meta_path = p / "index.json"
+        if not meta_path.is_file():
+            if p.exists():
+                print(f"(*) {p} is not a saved IVF index directory -- rebuilding")
+            return None
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        stored = meta["params"]
+        index = cls(**{**stored, **params})
+        if params.get("n_probe") is None:
+            index.n_probe = meta.get("n_probe", index.n_probe)
+        if matrix is not None:
+            expected = index.structural_params(matrix.shape[0])
+            changed = {key: (stored.get(key), value) for key, value in expected.items() if stored.get(key) != value}
+            if changed:
+                details = ", ".join(f"{key}: saved {old} != configured {new}" for key, (old, new) in changed.items())
+                print(f"(*) IVF index at {p} was built with other parameters ({details}) -- rebuilding")
+                return None
+            if meta["digest"] != cls.build_digest(matrix, expected):
+                print(f"(*) IVF index at {p} is stale for the current catalog -- rebuilding")
+                return None
+        index.n_lists = stored["n_lists"]
+        index.centroids = np.load(p / "centroids.npy", mmap_mode="r")
+        index.list_offsets = np.load(p / "list_offsets.npy", mmap_mode="r")
+        index.list_ids = np.load(p / "list_ids.npy", mmap_mode="r")
+        index.digest = meta["digest"]
+        return index
+
+
+ANN_BACKENDS = {
+    IVFIndex.name: IVFIndex,
+}
+
+
+def build_ann_backend(name: Optional[str], **params) -> Optional[ANNBackend]:
+    """
+    Instantiate an (unbuilt) ANN backend by name. 'exact'/None means no ANN stage.
+    """
+    if not name or name == "exact":
+        return None
+    if name not in ANN_BACKENDS:
+        raise ValueError(f"Unknown ANN backend: {name}. Available: {['exact', *ANN_BACKENDS]}")
+    return ANN_BACKENDS[name](**params)
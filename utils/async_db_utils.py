@@ -0,0 +1,108 @@
+"""
+utils/async_db_utils.py
+
+Responsibilities:
+- Async counterpart of DBUtil for handlers running on the event loop, backed by an asyncpg pool.
+- Queries keep DBUtil's `%s` placeholder style and are translated to asyncpg's `$n` form once;
+  asyncpg prepares and caches every statement per connection (`statement_cache_size`).
+- Expose:
+    - to_asyncpg(query) -> str
+    - AsyncDBUtil.fetch(query, params=None) -> list[asyncpg.Record]
+    - AsyncDBUtil.fetchval(query, params=None)
+    - AsyncDBUtil.execute(query, params=None) -> str
+    - AsyncDBUtil.pool_stats() -> dict
+    - AsyncDBUtil.DATABASE_ERRORS: what a failed query / unreachable database raises
+"""
+
+import asyncio
+import re
+import time
+from functools import lru_cache
+from typing import Optional, Sequence
+
+import asyncpg
+
+_PLACEHOLDER = re.compile(r"%s")
+
+
+@lru_cache(maxsize=256)
+def to_asyncpg(query: str) -> str:
+    """
+    'WHERE a = %s AND b = %s' -> 'WHERE a = $1 AND b = $2'
+    """
+    counter = iter(range(1, 10_000))
+    return _PLACEHOLDER.sub(lambda _: f"${next(counter)}", query)
+
+
+class AsyncDBUtil:
+    DATABASE_ERRORS = (asyncpg.PostgresError, asyncpg.InterfaceError, OSError, asyncio.TimeoutError)
+
+    def __init__(self, db_config: dict, session_settings: Optional[dict] = None,
+                 pool: Optional[dict] = None) -> None:
+        self.db_config = dict(db_config)
+        # DBUtil configs are psycopg2 kwargs: 'dbname' -> 'database', port as string
+        if "dbname" in self.db_config:
+            self.db_config["database"] = self.db_config.pop("dbname")
+        if "port" in self.db_config:
+            self.db_config["port"] = int(self.db_config["port"])
+        self.session_settings = {key: str(value) for key, value in (session_settings or {}).items()}
+        self.pool_config = pool or {}
+        self.pool = None
+        self._pool_lock = None
+        self.queries = 0
+        self.errors = 0
+        self.acquire_seconds = 0.0
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        if self.pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self.pool is None:
+                    self.pool = await asyncpg.create_pool(
+                        min_size=int(self.pool_config.get("min_size", 2)),
+                        max_size=int(self.pool_config.get("max_size", 32)),
+                        statement_cache_size=int(self.pool_config.get("statement_cache_size", 256)),
+                        max_inactive_connection_lifetime=float(self.pool_config.get("max_idle_seconds", 300)),
+                        server_settings=self.session_settings,
+                        **self.db_config
+                    )
+                    print(f"(*) Async connection pool ready (max={self.pool.get_max_size()})")
+        return self.pool
+
+    async def _run(self, method: str, query: str, params: Optional[Sequence]):
+        pool = await self._get_pool()
+        started = time.perf_counter()
+        async with pool.acquire(timeout=float(self.pool_config.get("checkout_timeout", 30))) as conn:
+            self.acquire_seconds += time.perf_counter() - started
+            self.queries += 1
+            try:
+                return await getattr(conn, method)(to_asyncpg(query), *(params or ()))
+            except Exception:
+                self.errors += 1
+                raise
+
+    async def fetch(self, query: str, params: Optional[Sequence] = None) -> list:
+        return await self._run("fetch", query, params)
+
+    async def fetchval(self, query: str, params: Optional[Sequence] = None):
+        return await self._run("fetchval", query, params)
+
+    async def execute(self, query: str, params: Optional[Sequence] = None) -> str:
+        return await self._run("execute", query, params)
+
+    def pool_stats(self) -> dict:
+        return {
+            "size": self.pool.get_size() if self.pool else 0,
+            "idle": self.pool.get_idle_size() if self.pool else 0,
+            "max_size": self.pool.get_max_size() if self.pool else int(self.pool_config.get("max_size", 32)),
+            "queries": self.queries,
+            "errors": self.errors,
+            "avg_acquire_ms": round(1000 * self.acquire_seconds / self.queries, 3) if self.queries else 0.0,
+        }
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+            print("(*) Async connection pool closed")
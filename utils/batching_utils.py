@@ -0,0 +1,126 @@
+"""
+utils/batching_utils.py
+
+Responsibilities:
+- Dynamic micro-batching for embedding requests coming from many threads / coroutines.
+- Requests queued together (up to `max_batch_size`) are encoded in a single `encode(list_of_texts)`
+  call on a dedicated worker thread; callers get their vector back through a future. A batch is
+  flushed as soon as the queue is empty, so a lone request never waits: requests arriving while a
+  batch is being encoded form the next one. `max_wait_ms` only bounds how long a batch keeps
+  collecting while requests keep arriving.
+- Expose:
+    - EmbeddingBatcher.submit(text) -> concurrent.futures.Future
+    - EmbeddingBatcher.encode(text) -> np.ndarray              # blocking, for sync handlers
+    - EmbeddingBatcher.encode_many(texts) -> list[np.ndarray]
+    - EmbeddingBatcher.encode_async(text) -> np.ndarray         # awaitable, for async handlers
+    - EmbeddingBatcher.stats() -> dict
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional, Sequence
+
+
+class EmbeddingBatcher:
+    def __init__(self, encode_fn: Callable[[list], Sequence], max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0, name: str = "embedding-batcher") -> None:
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue: "queue.Queue[Optional[tuple[str, Future]]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.max_queue_depth = 0
+        self.encode_seconds = 0.0
+        self._running = True
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, text: str) -> Future:
+        if not self._running:
+            raise RuntimeError("EmbeddingBatcher is closed")
+        future = Future()
+        self._queue.put((text, future))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            with self._stats_lock:
+                self.max_queue_depth = max(self.max_queue_depth, depth)
+        return future
+
+    def encode(self, text: str, timeout: Optional[float] = None):
+        return self.submit(text).result(timeout=timeout)
+
+    def encode_many(self, texts: Sequence[str], timeout: Optional[float] = None) -> list:
+        futures = [self.submit(text) for text in texts]
+        return [future.result(timeout=timeout) for future in futures]
+
+    async def encode_async(self, text: str):
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _collect(self, first: tuple) -> list:
+        """
+        `first` plus whatever is already queued; stops when the queue is empty, the batch is full or
+        `max_wait` has elapsed.
+        """
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size and time.perf_counter() < deadline:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Close requested: finish this batch, then let the worker loop see the sentinel.
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [(text, future) for text, future in self._collect(first) if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                vectors = self.encode_fn([text for text, _ in batch])
+            except Exception as ex:
+                for _, future in batch:
+                    future.set_exception(ex)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(batch)
+                self.encode_seconds += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "avg_encode_ms": round(1000 * self.encode_seconds / self.batches, 2) if self.batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        if self._running:
+            self._running = False
+            self._queue.put(None)
+            self._worker.join(timeout=timeout)
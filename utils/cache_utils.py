@@ -0,0 +1,343 @@
+"""
+utils/cache_utils.py
+
+Responsibilities:
+- Normalize free-text queries into stable cache keys (case, whitespace and accents folded).
+- Cache embeddings in a bounded, thread-safe LRU with a TTL, backed by an optional SQLite
+  tier on disk that survives restarts.
+- Cache search results per catalog version, so a new ingest invalidates them.
+- Keep fetched HTTP bodies on disk with their validators (ETag / Last-Modified) so recurring crawls
+  can revalidate with conditional requests instead of downloading unchanged pages again.
+- Expose:
+    - normalize_query(text) -> str
+    - EmbeddingCache.get(text) / EmbeddingCache.put(text, vector)
+    - EmbeddingCache.get_or_compute(text, compute) -> np.ndarray
+    - EmbeddingCache.stats() -> dict
+    - SearchResultCache.get(key, endpoint) / put(key, results) / set_version(version) / stats()
+    - HttpCache.get(url) / validators(entry) / hit(url, entry) / put(url, headers, body) / stats()
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """
+    'Colle  Carrelage ÉTANCHE ' -> 'colle carrelage etanche'
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.casefold().split())
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed on the normalized text.
+
+    Memory tier: LRU bounded by `max_size` entries. Disk tier (when `disk_path` is set): SQLite
+    table of float32 blobs. Entries older than `ttl_seconds` are treated as misses in both tiers.
+    `namespace` (e.g. the model name) keeps vectors of different models apart in a shared file.
+    With `hash_keys`, entries are keyed by the SHA-1 of the normalized text instead of the text
+    itself (compact keys for long product descriptions).
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: Optional[float] = None,
+                 disk_path: Optional[str] = None, namespace: str = "default", hash_keys: bool = False) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self.hash_keys = hash_keys
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple[float, np.ndarray]]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._disk = None
+        if disk_path:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            self._disk.commit()
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def _key(self, text: str) -> str:
+        key = normalize_query(text)
+        return hashlib.sha1(key.encode("utf-8")).hexdigest() if self.hash_keys else key
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, created_at: float, vector: np.ndarray) -> None:
+        self._memory[key] = (created_at, vector)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self._key(text)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._memory[key]
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT created_at, vector FROM embeddings WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                ).fetchone()
+                if row and not self._expired(row[0]):
+                    vector = np.frombuffer(row[1], dtype=np.float32)
+                    self._remember(key, row[0], vector)
+                    self.disk_hits += 1
+                    return vector
+            self.misses += 1
+            return None
+
+    def put(self, text: str, vector) -> np.ndarray:
+        key = self._key(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, created_at, vector)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO embeddings (namespace, key, created_at, vector) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, created_at, vector.tobytes())
+                )
+                self._disk.commit()
+        return vector
+
+    def get_or_compute(self, text: str, compute: Callable[[str], object]) -> np.ndarray:
+        vector = self.get(text)
+        if vector is None:
+            vector = self.put(text, compute(text))
+        return vector
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM embeddings WHERE namespace = ?", (self.namespace,))
+                self._disk.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._memory),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+
+class SearchResultCache:
+    """
+    LRU cache of search results keyed on the normalized `(query, region, vendor, limit)` tuple
+    plus the catalog version. A new catalog version drops every entry; hit/miss counters are
+    kept per endpoint.
+    """
+
+    def __init__(self, max_size: int = 5000, ttl_seconds: Optional[float] = 600) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple[float, list]]" = OrderedDict()
+        self.catalog_version = None
+        self.invalidations = 0
+        self._stats: dict[str, dict[str, int]] = {}
+
+    @staticmethod
+    def make_key(query: str, region: Optional[str], vendor: Optional[str], limit: int, version) -> tuple:
+        # region/vendor are exact-match SQL filters, so only the free-text query is normalized
+        return normalize_query(query), region or None, vendor or None, int(limit), version
+
+    def set_version(self, version) -> bool:
+        """
+        Record the current catalog version; returns True (and clears the cache) when it changed.
+        """
+        with self._lock:
+            if version == self.catalog_version:
+                return False
+            if self.catalog_version is not None:
+                self.invalidations += 1
+                print(f"(*) Catalog version {self.catalog_version} -> {version}: search cache invalidated")
+            self.catalog_version = version
+            self._entries.clear()
+            return True
+
+    def _count(self, endpoint: str, outcome: str) -> None:
+        counters = self._stats.setdefault(endpoint, {"hits": 0, "misses": 0})
+        counters[outcome] += 1
+
+    def get(self, key: tuple, endpoint: str = "default") -> Optional[list]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and key[-1] == self.catalog_version and (
+                    self.ttl_seconds is None or time.time() - entry[0] <= self.ttl_seconds):
+                self._entries.move_to_end(key)
+                self._count(endpoint, "hits")
+                return [dict(item) for item in entry[1]]
+            if entry is not None:
+                del self._entries[key]
+            self._count(endpoint, "misses")
+            return None
+
+    def put(self, key: tuple, results: list) -> None:
+        with self._lock:
+            if key[-1] != self.catalog_version:
+                return
+            self._entries[key] = (time.time(), [dict(item) for item in results])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            endpoints = {
+                endpoint: {**counters, "hit_ratio": round(counters["hits"] / total, 4) if total else 0.0}
+                for endpoint, counters in self._stats.items()
+                for total in [counters["hits"] + counters["misses"]]
+            }
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "catalog_version": self.catalog_version,
+                "invalidations": self.invalidations,
+                "endpoints": endpoints,
+            }
+
+
+class HttpCache:
+    """
+    SQLite store of HTTP responses that carry a validator, keyed on the URL. Bodies are kept
+    zlib-compressed. Only the response headers needed to rebuild the response are stored.
+    Freshness is never assumed: every use goes through a conditional request (`validators`), and
+    the caller reports a 304 with `hit` or a new body with `put`.
+    """
+    STORED_HEADERS = ("content-type", "etag", "last-modified", "content-language")
+
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                stored_at REAL NOT NULL,
+                validated_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def get(self, url: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, headers, body FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "headers": json.loads(row[2]), "body": row[3]}
+
+    @staticmethod
+    def validators(entry: Optional[dict]) -> dict:
+        """
+        Conditional request headers for a cached entry.
+        """
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @staticmethod
+    def body(entry: dict) -> bytes:
+        return zlib.decompress(entry["body"])
+
+    def hit(self, url: str, entry: dict) -> bytes:
+        """
+        Record a 304 for `url` and return the cached body.
+        """
+        body = self.body(entry)
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(body)
+            self._db.execute("UPDATE http_cache SET validated_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+        return body
+
+    def put(self, url: str, headers, body: bytes) -> bool:
+        """
+        Store a 200 response; responses without ETag / Last-Modified cannot be revalidated and are skipped.
+        """
+        with self._lock:
+            self.misses += 1
+        etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return False
+        kept = {name: headers[name] for name in self.STORED_HEADERS if headers.get(name)}
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO http_cache (url, etag, last_modified, headers, body, stored_at, validated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, json.dumps(kept), zlib.compress(body, 6), now, now)
+            )
+            self._db.commit()
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM http_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
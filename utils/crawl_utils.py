@@ -0,0 +1,329 @@
+"""
+utils/crawl_utils.py
+
+Responsibilities:
+- Concurrent, polite fetching for the scrapers on top of the blocking `RequestUtils`:
+    - a concurrency limit per crawler (requests in flight across all its hosts), plus an optional
+      `CrawlBudget` shared by several crawlers on one event loop (e.g. one per supplier)
+    - a token bucket per host: one token every `rate_limit_seconds` (drawn uniformly from [low, high]
+      for each token, like the scraper's former sleeps), at most `burst` tokens banked
+    - retries with (optionally exponential) backoff through `operation_utils.retry`; every attempt
+      takes a fresh token, so retries never bypass the host rate limit
+- Blocking requests run in a dedicated thread pool sized to the concurrency limit, so the event loop
+  only schedules; CPU-bound parsing can be pushed to the same pool with `run_blocking`.
+- Persistent crawl state (SQLite) for incremental, resumable crawls: the <lastmod> and outcome of
+  every URL and sitemap already crawled. Outcomes are buffered and committed at checkpoints.
+- Expose:
+    - TokenBucket(interval, burst=1).acquire()
+    - HostRateLimiter(interval, burst=1).acquire(url)
+    - CrawlBudget(limit)
+    - AsyncCrawler(request_utils, rate_limit_seconds, concurrency=8, retries=3, backoff=2, burst=1, budget=None)
+    - AsyncCrawler.fetch(url, timeout=20) / run_blocking(func, *args) / close() / stats()
+    - drain(items, handler, workers, stop=None) -> int   (items: iterable or async iterable)
+    - CrawlState(path, supplier, revisit_days=None).should_fetch(url, lastmod) / mark(url, lastmod, status)
+    - CrawlState.sitemap_unchanged(url, lastmod) / sitemap_done(url, lastmod) / checkpoint() / stats()
+"""
+
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from pathlib import Path
+from typing import AsyncIterable, Awaitable, Callable, Iterable, Optional, Sequence, Union
+from urllib.parse import urlparse
+
+from .operation_utils import retry
+
+
+class TokenBucket:
+    def __init__(self, interval: Union[float, Sequence[float]], burst: int = 1) -> None:
+        if isinstance(interval, (int, float)):
+            interval = (interval, interval)
+        self.low, self.high = float(interval[0]), float(interval[1])
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._interval = self._draw()
+        self._lock = asyncio.Lock()
+
+    def _draw(self) -> float:
+        return random.uniform(self.low, self.high)
+
+    async def acquire(self) -> None:
+        """
+        Wait for a token. Waiters are served one at a time (FIFO on the lock).
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if self._interval > 0:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self._interval)
+                else:
+                    self.tokens = float(self.capacity)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self._interval = self._draw()
+                    return
+                await asyncio.sleep((1 - self.tokens) * self._interval)
+
+
+class HostRateLimiter:
+    def __init__(self, interval: Union[float, Sequence[float]], burst: int = 1) -> None:
+        self._buckets = defaultdict(lambda: TokenBucket(interval, burst))
+
+    async def acquire(self, url: str) -> None:
+        await self._buckets[urlparse(url).netloc.lower()].acquire()
+
+
+class CrawlBudget:
+    """
+    Global cap on requests in flight, shared by the crawlers running on one event loop.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = max(1, int(limit))
+        self._loop = None
+        self._semaphore = None
+        self.in_flight = 0
+
+    async def __aenter__(self) -> "CrawlBudget":
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.limit)
+        await self._semaphore.acquire()
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+class AsyncCrawler:
+    def __init__(self, request_utils, rate_limit_seconds: Union[float, Sequence[float]], concurrency: int = 8,
+                 retries: int = 3, backoff: float = 2, burst: int = 1, budget: Optional[CrawlBudget] = None) -> None:
+        self.request = request_utils
+        self.budget = budget
+        self.concurrency = max(1, int(concurrency))
+        self.retries = int(retries)
+        self.backoff = backoff
+        self.rate_limit_seconds, self.burst = rate_limit_seconds, burst
+        self.limiter = None
+        low = rate_limit_seconds if isinstance(rate_limit_seconds, (int, float)) else rate_limit_seconds[0]
+        self._retry_delay = max(float(low), 0.5)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="crawler")
+        self._slots = None
+        self._loop = None
+        self._stats = {"requests": 0, "errors": 0, "failures": 0}
+        self._fetch = retry(exceptions=(Exception,), backoff=backoff)(self._attempt)
+
+    async def run_blocking(self, func: Callable, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def _attempt(self, url: str, timeout: int):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # asyncio primitives belong to one event loop: rebuild them for each `asyncio.run`
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self.limiter = HostRateLimiter(self.rate_limit_seconds, self.burst)
+        # Slot and global budget first, then token: the request starts as soon as its token is granted,
+        # so the per-host spacing holds even when every slot or the whole budget is busy.
+        async with self._slots, (self.budget or nullcontext()):
+            await self.limiter.acquire(url)
+            self._stats["requests"] += 1
+            try:
+                # Retries are driven by `fetch` (one rate-limit token each), not inside RequestUtils
+                return await self.run_blocking(self.request.get_data, url=url, timeout=timeout, retries=0)
+            except Exception:
+                self._stats["errors"] += 1
+                raise
+
+    async def fetch(self, url: str, timeout: int = 20):
+        """
+        Rate-limited GET with retries; raises the last error once the retries are exhausted.
+        """
+        try:
+            return await self._fetch(url, timeout, retries=self.retries, delay=self._retry_delay)
+        except Exception:
+            self._stats["failures"] += 1
+            raise
+
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def drain(items: Union[Iterable, AsyncIterable], handler: Callable[..., Awaitable], workers: int,
+                stop: Optional[Callable[[], bool]] = None) -> int:
+    """
+    Run `handler(item)` over `items` with `workers` concurrent tasks pulling from one shared iterator
+    (items are consumed lazily, nothing is queued ahead). `items` may be an async iterable, e.g. an
+    async generator that fetches and parses sitemaps as it goes. `stop()` is checked before each item.
+    Handler errors are the handler's to report; they do not stop the other workers.
+    Returns the number of items handled.
+    """
+    handled = [0]
+    if hasattr(items, "__aiter__"):
+        iterator = items.__aiter__()
+        pulling = asyncio.Lock()  # an async generator cannot be advanced by two tasks at once
+
+        async def next_item():
+            async with pulling:
+                try:
+                    return True, await iterator.__anext__()
+                except StopAsyncIteration:
+                    return False, None
+    else:
+        sync_iterator = iter(items)
+
+        async def next_item():
+            item = next(sync_iterator, _END)
+            return item is not _END, item
+
+    async def worker() -> None:
+        while True:
+            if stop is not None and stop():
+                return
+            found, item = await next_item()
+            if not found:
+                return
+            try:
+                await handler(item)
+            except Exception as ex:
+                print(f"(*) Failed to process {item}: {ex}")
+            handled[0] += 1
+
+    await asyncio.gather(*(worker() for _ in range(max(1, int(workers)))))
+    return handled[0]
+
+
+_END = object()
+
+
+class CrawlState:
+    """
+    What was crawled, per supplier: for each URL the <lastmod> seen when it was crawled and the
+    outcome ("product", "not_product", "incomplete", "failed"); for each sitemap the <lastmod> of its
+    last complete crawl.
+
+    A URL is fetched again only when it is new, its <lastmod> changed, its last attempt failed or (with
+    `revisit_days`) it has no <lastmod> and was crawled longer ago than that. Outcomes are kept in
+    memory until `checkpoint()` commits them, so an interrupted crawl resumes after the last checkpoint;
+    the caller checkpoints only once the matching products are durably written.
+    """
+    RETRY_STATUSES = ("failed",)
+
+    def __init__(self, path: str, supplier: str, revisit_days: Optional[float] = None) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.supplier = supplier
+        self.revisit_seconds = revisit_days * 86400 if revisit_days else None
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS crawled_urls (
+                supplier TEXT NOT NULL,
+                url TEXT NOT NULL,
+                lastmod TEXT,
+                status TEXT NOT NULL,
+                crawled_at REAL NOT NULL,
+                PRIMARY KEY (supplier, url)
+            )
+        """)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS crawled_sitemaps (
+                supplier TEXT NOT NULL,
+                url TEXT NOT NULL,
+                lastmod TEXT,
+                completed_at REAL NOT NULL,
+                PRIMARY KEY (supplier, url)
+            )
+        """)
+        self._db.commit()
+        self._pending_urls: dict[str, tuple] = {}
+        self._pending_sitemaps: dict[str, tuple] = {}
+        self._stats = {"fetched": 0, "skipped": 0, "skipped_sitemaps": 0, "checkpoints": 0}
+
+    def should_fetch(self, url: str, lastmod: Optional[str]) -> bool:
+        with self._lock:
+            row = self._pending_urls.get(url)
+            if row is None:
+                row = self._db.execute(
+                    "SELECT lastmod, status, crawled_at FROM crawled_urls WHERE supplier = ? AND url = ?",
+                    (self.supplier, url)
+                ).fetchone()
+            else:
+                row = row[:3]
+            fetch = (
+                row is None
+                or row[1] in self.RETRY_STATUSES
+                or (lastmod is not None and lastmod != row[0])
+                or (lastmod is None and self.revisit_seconds is not None and time.time() - row[2] > self.revisit_seconds)
+            )
+            self._stats["fetched" if fetch else "skipped"] += 1
+            return fetch
+
+    def mark(self, url: str, lastmod: Optional[str], status: str) -> None:
+        with self._lock:
+            self._pending_urls[url] = (lastmod, status, time.time())
+
+    def sitemap_unchanged(self, url: str, lastmod: Optional[str]) -> bool:
+        """
+        True when the sitemap was completely crawled at this same <lastmod> (never without a lastmod).
+        """
+        if lastmod is None:
+            return False
+        with self._lock:
+            row = self._db.execute(
+                "SELECT lastmod FROM crawled_sitemaps WHERE supplier = ? AND url = ?", (self.supplier, url)
+            ).fetchone()
+            unchanged = row is not None and row[0] == lastmod
+            if unchanged:
+                self._stats["skipped_sitemaps"] += 1
+            return unchanged
+
+    def sitemap_done(self, url: str, lastmod: Optional[str]) -> None:
+        with self._lock:
+            self._pending_sitemaps[url] = (lastmod, time.time())
+
+    def pending(self) -> int:
+        return len(self._pending_urls)
+
+    def checkpoint(self) -> None:
+        with self._lock:
+            if not self._pending_urls and not self._pending_sitemaps:
+                return
+            self._db.executemany(
+                "INSERT OR REPLACE INTO crawled_urls (supplier, url, lastmod, status, crawled_at) VALUES (?, ?, ?, ?, ?)",
+                [(self.supplier, url, *values) for url, values in self._pending_urls.items()]
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO crawled_sitemaps (supplier, url, lastmod, completed_at) VALUES (?, ?, ?, ?)",
+                [(self.supplier, url, *values) for url, values in self._pending_sitemaps.items()]
+            )
+            self._db.commit()
+            self._pending_urls.clear()
+            self._pending_sitemaps.clear()
+            self._stats["checkpoints"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            known = self._db.execute(
+                "SELECT COUNT(*) FROM crawled_urls WHERE supplier = ?", (self.supplier,)
+            ).fetchone()[0]
+            return dict(self._stats, known_urls=known)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -1,13 +1,46 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
-from psycopg2 import sql, OperationalError
+from psycopg2 import sql, OperationalError, InterfaceError
+from psycopg2.extensions import TRANSACTION_STATUS_UNKNOWN
+from psycopg2.pool import ThreadedConnectionPool
+
+# Read-only statements are safe to retry on a fresh connection after a connection failure.
+READ_ONLY_QUERY = re.compile(r"^\s*(SELECT|SHOW|EXPLAIN)\b", re.IGNORECASE)
 
 
 class DBUtil:
-    def __init__(self, db_config, table_name = "PRODUCTS") -> None:
+    """
+    Single-connection mode (default): one connection + cursor, commit after every statement.
+
+    Pooled mode (`pool={"min_size", "max_size", ...}`): a bounded, thread-safe pool. Every call checks
+    a connection out and back in, so concurrent FastAPI threads never share a cursor. Pooled
+    connections are in autocommit mode (reads skip the COMMIT round trip); multi-statement writes
+    use `transaction()`. Broken connections are discarded and read-only queries retried;
+    (re)connecting backs off exponentially.
+    """
+    def __init__(self, db_config, table_name = "PRODUCTS", session_settings: dict = None, pool: dict = None) -> None:
         self.db_config = db_config
         self.TABLE_NAME = table_name
+        # Session-level GUCs applied on every (re)connect, e.g. {"hnsw.ef_search": 40}
+        self.session_settings = session_settings or {}
         self.connection = None
         self.cursor = None
+        self.pool_config = pool or {}
+        self.pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = None
+        self._last_checked = {}
+        self._metrics_lock = threading.Lock()
+        self.pool_metrics = {"checkouts": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+                             "in_use": 0, "errors": 0, "discarded": 0, "reconnects": 0}
+
+    @property
+    def is_pooled(self) -> bool:
+        return bool(self.pool_config)
     
     def init_queries(self, CREATE_TABLE_QUERY, INSERT_DATA_QUERY):
         self.CREATE_TABLE_QUERY = CREATE_TABLE_QUERY
@@ -34,15 +67,173 @@ class DBUtil:
         try:
             self.connection = psycopg2.connect(**self.db_config)
             self.cursor = self.connection.cursor()
+            for key, value in self.session_settings.items():
+                self.cursor.execute(sql.SQL("SET {} = %s").format(sql.Identifier(*key.split("."))), (str(value),))
+            self.connection.commit()
             print("(*) Connected to PostgreSQL database successfully")
         except OperationalError as ex:
             print(f"(*) Error connecting to PostgreSQL database: {ex}")
     
+    def __init_pool(self):
+        """
+        Create the pool, retrying with exponential backoff while the database is unreachable.
+        """
+        max_size = int(self.pool_config.get("max_size", 10))
+        min_size = min(int(self.pool_config.get("min_size", 1)), max_size)
+        retries = int(self.pool_config.get("max_retries", 5))
+        backoff = float(self.pool_config.get("backoff_seconds", 0.5))
+        options = " ".join(f"-c {key}={value}" for key, value in self.session_settings.items())
+        connect_kwargs = {**self.db_config, **({"options": options} if options else {})}
+        for attempt in range(retries + 1):
+            try:
+                self.pool = ThreadedConnectionPool(min_size, max_size, **connect_kwargs)
+                self._slots = threading.BoundedSemaphore(max_size)
+                print(f"(*) Connection pool ready (min={min_size}, max={max_size})")
+                return
+            except OperationalError as ex:
+                if attempt == retries:
+                    raise
+                delay = backoff * (2 ** attempt)
+                print(f"(*) Error creating connection pool: {ex} -- retrying in {delay:.1f}s")
+                with self._metrics_lock:
+                    self.pool_metrics["reconnects"] += 1
+                time.sleep(delay)
+
+    def __healthy(self, conn) -> bool:
+        if conn.closed or conn.info.transaction_status == TRANSACTION_STATUS_UNKNOWN:
+            return False
+        interval = float(self.pool_config.get("health_check_seconds", 30))
+        try:
+            conn.autocommit = True
+            if time.monotonic() - self._last_checked.get(id(conn), 0.0) < interval:
+                return True
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            self._last_checked[id(conn)] = time.monotonic()
+            return True
+        except (OperationalError, InterfaceError):
+            return False
+
+    @contextmanager
+    def checkout(self):
+        """
+        Borrow a healthy pooled connection; blocks (up to `checkout_timeout`) while the pool is exhausted.
+        """
+        if self.pool is None:
+            with self._pool_lock:
+                if self.pool is None:
+                    self.__init_pool()
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=float(self.pool_config.get("checkout_timeout", 30))):
+            raise TimeoutError("Timed out waiting for a pooled database connection")
+        waited = time.perf_counter() - started
+        conn = None
+        try:
+            conn = self.pool.getconn()
+            while not self.__healthy(conn):
+                self.__discard(conn)
+                # Already returned to the pool: a failing getconn below must not discard it twice
+                conn = None
+                conn = self.pool.getconn()
+            with self._metrics_lock:
+                self.pool_metrics["checkouts"] += 1
+                self.pool_metrics["wait_seconds"] += waited
+                self.pool_metrics["max_wait_seconds"] = max(self.pool_metrics["max_wait_seconds"], waited)
+                self.pool_metrics["in_use"] += 1
+            try:
+                yield conn
+            finally:
+                with self._metrics_lock:
+                    self.pool_metrics["in_use"] -= 1
+        except (OperationalError, InterfaceError):
+            if conn is not None:
+                self.__discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self.pool.putconn(conn)
+            self._slots.release()
+
+    def __discard(self, conn):
+        self._last_checked.pop(id(conn), None)
+        self.pool.putconn(conn, close=True)
+        with self._metrics_lock:
+            self.pool_metrics["discarded"] += 1
+
+    @contextmanager
+    def transaction(self):
+        """
+        Pooled: a cursor inside one explicit transaction (commit on success, rollback on error).
+        Single-connection mode: the shared cursor, committed once at the end.
+        """
+        if not self.is_pooled:
+            if self.connection is None or self.cursor is None:
+                self.__connect()
+            try:
+                yield self.cursor
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+            return
+        with self.checkout() as conn:
+            conn.autocommit = False
+            try:
+                with conn.cursor() as cursor:
+                    yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                if not conn.closed:
+                    conn.autocommit = True
+
+    def __execute_pooled(self, query, params=None):
+        # Writes are not retried: the failure may have happened after the server committed them.
+        retries = int(self.pool_config.get("query_retries", 1)) if READ_ONLY_QUERY.match(query) else 0
+        for attempt in range(retries + 1):
+            try:
+                with self.checkout() as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(query, params)
+                        if cursor.description:
+                            return cursor.fetchall()
+                        return None
+            except (OperationalError, InterfaceError) as ex:
+                with self._metrics_lock:
+                    self.pool_metrics["errors"] += 1
+                if attempt == retries:
+                    print(f"(*) Error executing query: {ex}")
+                    return None
+                time.sleep(float(self.pool_config.get("backoff_seconds", 0.5)) * (2 ** attempt))
+            except Exception as ex:
+                with self._metrics_lock:
+                    self.pool_metrics["errors"] += 1
+                print(f"(*) Error executing query: {ex}")
+                return None
+
+    def pool_stats(self) -> dict:
+        with self._metrics_lock:
+            metrics = dict(self.pool_metrics)
+        checkouts = metrics["checkouts"]
+        return {
+            "pooled": self.is_pooled,
+            "min_size": self.pool.minconn if self.pool else None,
+            "max_size": self.pool.maxconn if self.pool else None,
+            **metrics,
+            "avg_wait_ms": round(1000 * metrics["wait_seconds"] / checkouts, 3) if checkouts else 0.0,
+            "max_wait_ms": round(1000 * metrics["max_wait_seconds"], 3),
+        }
+
     def execute_query(self, query, params=None):
         """
         Executes the given SQL query.
         If fetch=True, it returns the fetched results.
         """
+        if self.is_pooled:
+            return self.__execute_pooled(query, params)
         try:
             if self.connection is None or self.cursor is None:
                 self.__connect()
@@ -56,6 +247,10 @@ class DBUtil:
             self.connection.rollback()
 
     def close(self):
+        if self.pool is not None:
+            self.pool.closeall()
+            self.pool = None
+            print("(*) Connection pool closed")
         if self.cursor:
             self.cursor.close()
         if self.connection:
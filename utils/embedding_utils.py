@@ -0,0 +1,176 @@
+"""
+utils/embedding_utils.py
+
+Responsibilities:
+- Interchangeable sentence-embedding backends behind the `encode(text | texts)` call the APIs and the
+  ingest job already use (same contract as `SentenceTransformer.encode`):
+    - "torch":     sentence-transformers / PyTorch (reference implementation)
+    - "onnx":      ONNX Runtime export of the same transformer, mean pooling + L2 normalization in numpy
+    - "onnx-int8": the ONNX export with dynamically int8-quantized weights
+- The torch backend loads the model from a local directory (`model_path`, written once by
+  `database_ingestion/src/download_model.py`), never from the Hugging Face hub at startup.
+- ONNX backends load only local files (`model.onnx` / `model_int8.onnx` + `tokenizer.json`) written by
+  `database_ingestion/src/export_onnx_model.py`; they do not import torch.
+- Expose:
+    - build_embedding_backend(backend="torch", **options) -> EmbeddingBackend
+    - local_model_dir(model_path) -> Path
+    - EmbeddingBackend.encode(text | texts) -> np.ndarray
+    - export_onnx(model_name_or_path, out_dir, quantize=True) -> dict
+"""
+
+import os
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_MODEL_PATH = "../../models/all-MiniLM-L6-v2"
+
+
+def local_model_dir(model_path: str) -> Path:
+    """
+    The local sentence-transformers model directory; FileNotFoundError when it has not been downloaded.
+    """
+    path = Path(model_path)
+    if not (path / "config.json").is_file():
+        raise FileNotFoundError(f"Embedding model not found: {path.resolve()} "
+                                f"(run download_model.py first to save {DEFAULT_MODEL} there)")
+    return path
+
+
+class EmbeddingBackend:
+    name = "base"
+
+    def _encode_batch(self, texts: list) -> np.ndarray:
+        raise NotImplementedError
+
+    def encode(self, data: Union[str, Sequence[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """
+        A single string -> (dim,) vector; a list of strings -> (n, dim) matrix.
+        """
+        single = isinstance(data, str)
+        texts = [data] if single else list(data)
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        vectors = np.concatenate([self._encode_batch(texts[start:start + batch_size])
+                                  for start in range(0, len(texts), batch_size)])
+        return vectors[0] if single else vectors
+
+    @property
+    def dimension(self) -> int:
+        raise NotImplementedError
+
+
+class TorchBackend(EmbeddingBackend):
+    name = "torch"
+
+    def __init__(self, model_path: str = DEFAULT_MODEL_PATH, device: str = "cpu", **_) -> None:
+        model_dir = local_model_dir(model_path)
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(str(model_dir), device=device)
+
+    def encode(self, data, batch_size: int = 32, **kwargs) -> np.ndarray:
+        return self.model.encode(data, batch_size=batch_size, **kwargs)
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    Transformer forward pass in ONNX Runtime; pooling reproduces the sentence-transformers
+    MiniLM head (attention-masked mean of the token embeddings, then L2 normalization).
+    """
+    name = "onnx"
+    model_file = "model.onnx"
+
+    def __init__(self, onnx_path: str, max_length: int = 256, intra_op_threads: Optional[int] = None,
+                 normalize: bool = True, **_) -> None:
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        onnx_path = Path(onnx_path)
+        model_file = onnx_path / self.model_file
+        if not model_file.exists():
+            raise FileNotFoundError(f"ONNX model not found: {model_file} (run export_onnx_model.py first)")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = int(intra_op_threads or os.cpu_count() or 1)
+        self.session = ort.InferenceSession(str(model_file), sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(str(onnx_path / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        self.normalize = normalize
+        self._dimension = None
+
+    def _encode_batch(self, texts: list) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": np.asarray([e.ids for e in encodings], dtype=np.int64), "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.asarray([e.type_ids for e in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, feeds)[0]
+        weights = mask[:, :, None].astype(np.float32)
+        vectors = (token_embeddings * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        self._dimension = vectors.shape[1]
+        return vectors.astype(np.float32)
+
+    @property
+    def dimension(self) -> int:
+        if self._dimension is None:
+            self._encode_batch(["dimension probe"])
+        return self._dimension
+
+
+class QuantizedOnnxBackend(OnnxBackend):
+    name = "onnx-int8"
+    model_file = "model_int8.onnx"
+
+
+EMBEDDING_BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    OnnxBackend.name: OnnxBackend,
+    QuantizedOnnxBackend.name: QuantizedOnnxBackend,
+}
+
+
+def build_embedding_backend(backend: str = "torch", **options) -> EmbeddingBackend:
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}. Available: {list(EMBEDDING_BACKENDS)}")
+    return EMBEDDING_BACKENDS[backend](**options)
+
+
+def export_onnx(model_name_or_path: str, out_dir: str, quantize: bool = True, opset: int = 14) -> dict:
+    """
+    Export the transformer of a sentence-transformers model to `<out_dir>/model.onnx` (+ tokenizer.json)
+    and, with `quantize`, a dynamically int8-quantized `<out_dir>/model_int8.onnx`.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    st_model = SentenceTransformer(model_name_or_path, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    tokenizer.save_pretrained(str(out))
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(transformer, tuple(sample[name] for name in input_names), str(out / OnnxBackend.model_file),
+                          input_names=input_names, output_names=["last_hidden_state"],
+                          dynamic_axes=dynamic_axes, opset_version=opset)
+    files = {"onnx": str(out / OnnxBackend.model_file)}
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(files["onnx"], str(out / QuantizedOnnxBackend.model_file), weight_type=QuantType.QInt8)
+        files["onnx-int8"] = str(out / QuantizedOnnxBackend.model_file)
+    return files
@@ -0,0 +1,153 @@
+"""
+utils/html_utils.py
+
+Responsibilities:
+- Parse fetched HTML once with the fastest available parser:
+    - lxml.html (libxml2, C) when lxml is installed: the tree stays in C and selectors are
+      precompiled XPath expressions
+    - BeautifulSoup + "html.parser" otherwise, with precompiled soupsieve selectors
+- Selectors are declared once as simple CSS (`tag`, `.class`, `tag.class`, `[attr]`, `[attr='v']`,
+  comma-separated lists) and compiled for whichever tree they are applied to; `select_one` returns the
+  first match in document order on both backends.
+- Text helpers that give the same strings on both backends (script/style text is ignored).
+- Expose:
+    - HTML_PARSER
+    - charset_from_content_type(content_type) -> str | None
+    - decode_html(content, encoding=None) -> str
+    - parse_html(html, encoding=None) -> page
+    - Selector(css).select_one(page)
+    - css_to_xpath(css) -> str
+    - text_of(element, separator="") -> str
+    - page_text(page) -> str
+    - contains_text(page, pattern) -> bool
+"""
+
+import re
+from importlib.util import find_spec
+from typing import Optional
+
+HTML_PARSER = "lxml" if find_spec("lxml") else "html.parser"
+
+_SIMPLE_SELECTOR = re.compile(
+    r"^(?P<tag>[a-zA-Z][\w-]*)?(?:\.(?P<cls>[\w-]+))?(?:\[(?P<attr>[\w-]+)(?:=['\"](?P<value>[^'\"]*)['\"])?\])?$"
+)
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+_CONTENT_TYPE_CHARSET = re.compile(r"charset=[\"']?([\w-]+)", re.IGNORECASE)
+_XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>")
+_VISIBLE_TEXT = "//text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::template)]"
+
+
+def css_to_xpath(css: str) -> str:
+    """
+    ".product-price, span.price, [data-testid='price']" -> equivalent XPath union.
+    """
+    paths = []
+    for part in css.split(","):
+        match = _SIMPLE_SELECTOR.match(part.strip())
+        if not match or not any(match.groupdict().values()):
+            raise ValueError(f"Unsupported selector: {part.strip()!r}")
+        conditions = []
+        if match["cls"]:
+            conditions.append(f"contains(concat(' ', normalize-space(@class), ' '), ' {match['cls']} ')")
+        if match["attr"]:
+            conditions.append(f"@{match['attr']}='{match['value']}'" if match["value"] is not None
+                              else f"@{match['attr']}")
+        paths.append(f"//{match['tag'] or '*'}" + "".join(f"[{condition}]" for condition in conditions))
+    return " | ".join(paths)
+
+
+def _is_lxml(page) -> bool:
+    # Not hasattr(): BeautifulSoup resolves unknown attributes as child-tag lookups
+    return type(page).__module__.startswith("lxml")
+
+
+def charset_from_content_type(content_type: Optional[str]) -> Optional[str]:
+    """
+    'text/html; charset=UTF-8' -> 'UTF-8'; None when the header declares no charset.
+    """
+    match = _CONTENT_TYPE_CHARSET.search(content_type or "")
+    return match.group(1) if match else None
+
+
+def decode_html(content: bytes, encoding: Optional[str] = None) -> str:
+    """
+    Charset from the Content-Type header (`encoding`), else the page's <meta charset>, else UTF-8
+    (cp1252 when the bytes are not valid UTF-8).
+    """
+    match = _META_CHARSET.search(content[:4096])
+    for candidate in (encoding, match.group(1).decode("ascii") if match else None):
+        if candidate:
+            try:
+                return content.decode(candidate, errors="replace")
+            except LookupError:
+                pass
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return content.decode("cp1252", errors="replace")
+
+
+def parse_html(html, encoding: Optional[str] = None):
+    """
+    `html` as str, or as the raw response bytes plus the charset declared in the Content-Type header.
+    """
+    if isinstance(html, bytes):
+        html = decode_html(html, encoding)
+    if HTML_PARSER == "lxml":
+        import lxml.html
+        # lxml refuses str input that carries an XML encoding declaration
+        return lxml.html.fromstring(_XML_DECLARATION.sub("", html, count=1))
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, HTML_PARSER)
+
+
+class Selector:
+    def __init__(self, css: str) -> None:
+        self.css = css
+        self.xpath = css_to_xpath(css)
+        self._compiled_xpath = None
+        self._compiled_css = None
+
+    def select_one(self, page):
+        if _is_lxml(page):
+            if self._compiled_xpath is None:
+                from lxml import etree
+                self._compiled_xpath = etree.XPath(self.xpath)
+            found = self._compiled_xpath(page)
+            return found[0] if found else None
+        if self._compiled_css is None:
+            import soupsieve
+            self._compiled_css = soupsieve.compile(self.css)
+        return self._compiled_css.select_one(page)
+
+
+_text_xpath = None
+
+
+def _visible_strings(page) -> list:
+    global _text_xpath
+    if _text_xpath is None:
+        from lxml import etree
+        _text_xpath = etree.XPath(_VISIBLE_TEXT)
+    return _text_xpath(page)
+
+
+def text_of(element, separator: str = "") -> str:
+    """
+    Stripped text pieces of an element joined by `separator` (BeautifulSoup's get_text(sep, strip=True)).
+    """
+    if not _is_lxml(element):
+        return element.get_text(separator, strip=True)
+    return separator.join(text.strip() for text in element.itertext() if text.strip())
+
+
+def page_text(page) -> str:
+    if not _is_lxml(page):
+        return page.get_text()
+    return "".join(_visible_strings(page))
+
+
+def contains_text(page, pattern: re.Pattern) -> bool:
+    if not _is_lxml(page):
+        return page.find(string=pattern) is not None
+    return any(pattern.search(text) for text in _visible_strings(page))
@@ -0,0 +1,152 @@
+"""
+utils/jsonl_utils.py
+
+Responsibilities:
+- Append-only storage for scraped products: one JSON object per line, in numbered segment files
+    <directory>/<prefix>-000001.jsonl[.gz]
+  Records are appended to a hidden `.part` file that is renamed into place (atomic on POSIX) when it
+  reaches `max_records` / `max_bytes` or the sink is closed, so readers only ever see complete segments.
+- Parts left behind by a crash are recovered on the next open (complete lines are kept).
+- Segments are read back with `utils.stream_utils.iter_records(<directory>)`.
+- Expose:
+    - JsonlSink(directory, prefix, compress=False, max_records=50000, max_bytes=256 MiB)
+    - JsonlSink.write(record) / write_many(records) / flush() / rotate() / close()
+    - list_segments(directory, prefix=None) -> list[Path]
+"""
+
+import gzip
+import json
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Optional
+
+SEGMENT_PATTERN = re.compile(r"^(?P<prefix>.+)-(?P<seq>\d{6})\.jsonl(?:\.gz)?$")
+
+
+def list_segments(directory: str, prefix: Optional[str] = None) -> list[Path]:
+    """
+    Published segments in write order (hidden `.part` files are skipped).
+    """
+    base = Path(directory)
+    if not base.is_dir():
+        return []
+    segments = []
+    for path in base.iterdir():
+        match = SEGMENT_PATTERN.match(path.name)
+        if match and (prefix is None or match["prefix"] == prefix):
+            segments.append((match["prefix"], int(match["seq"]), path))
+    return [path for _, _, path in sorted(segments)]
+
+
+class JsonlSink:
+    def __init__(self, directory: str, prefix: str, compress: bool = False,
+                 max_records: int = 50000, max_bytes: int = 256 * 2 ** 20) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.compress = compress
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self._file = None
+        self._part = None
+        self._records = 0
+        self._bytes = 0
+        self.written = 0
+        existing = [int(SEGMENT_PATTERN.match(p.name)["seq"]) for p in list_segments(directory, prefix)]
+        self._seq = max(existing, default=0)
+        self._recover()
+
+    @property
+    def _suffix(self) -> str:
+        return ".jsonl.gz" if self.compress else ".jsonl"
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.directory / f"{self.prefix}-{seq:06d}{self._suffix}"
+
+    def _recover(self) -> None:
+        """
+        Publish the complete lines of `.part` files left by a crash under their own sequence number.
+        """
+        for part in sorted(self.directory.glob(f".{self.prefix}-*.part")):
+            segment = self.directory / part.name[1:-len(".part")]
+            match = SEGMENT_PATTERN.match(segment.name)
+            if not match:
+                continue
+            self._seq = max(self._seq, int(match["seq"]))
+            opener = gzip.open if segment.name.endswith(".gz") else open
+            lines = []
+            try:
+                with opener(part, "rt", encoding="utf-8") as fh:
+                    lines.extend(line for line in fh if line.endswith("\n"))
+            except (EOFError, OSError):
+                pass  # truncated tail of a compressed part: keep what was decoded
+            if lines:
+                tmp = self.directory / f".{segment.name}.recover"
+                with opener(tmp, "wt", encoding="utf-8") as fh:
+                    fh.writelines(lines)
+                os.replace(tmp, segment)
+                print(f"(*) Recovered {len(lines)} records from {part.name}")
+            part.unlink()
+
+    def _open(self) -> None:
+        self._seq += 1
+        self._part = self.directory / f".{self._segment_path(self._seq).name}.part"
+        if self.compress:
+            self._file = gzip.open(self._part, "wt", encoding="utf-8")
+        else:
+            self._file = open(self._part, "w", encoding="utf-8")
+        self._records = 0
+        self._bytes = 0
+
+    def write(self, record: dict) -> None:
+        if self._file is None:
+            self._open()
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+        self._file.write(line)
+        self._records += 1
+        self._bytes += len(line)
+        self.written += 1
+        if self._records >= self.max_records or self._bytes >= self.max_bytes:
+            self.rotate()
+
+    def write_many(self, records: Iterable[dict]) -> int:
+        count = 0
+        for record in records:
+            self.write(record)
+            count += 1
+        if self._file is not None:
+            self._file.flush()
+        return count
+
+    def flush(self) -> None:
+        """
+        Make every record written so far durable in the current part (recovered after a crash).
+        """
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def rotate(self) -> Optional[Path]:
+        """
+        Seal the current part and publish it as the next segment.
+        """
+        if self._file is None:
+            return None
+        self._file.flush()
+        if not self.compress:
+            os.fsync(self._file.fileno())
+        self._file.close()
+        segment = self._segment_path(self._seq)
+        os.replace(self._part, segment)
+        self._file, self._part = None, None
+        return segment
+
+    def close(self) -> None:
+        self.rotate()
+
+    def __enter__(self) -> "JsonlSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,189 @@
+"""
+utils/lexical_utils.py
+
+Responsibilities:
+- French-aware tokenization of material names / descriptions / queries: accents and case folded,
+  elisions (l', d') and stop words dropped, light plural stemming, and dimension tokens normalized
+  so that "60x60", "60 x 60" and "60 × 60 cm" all produce the token "60x60".
+- In-memory BM25 inverted index over the catalog, aligned with VectorIndex rows. Postings are CSR
+  arrays (term -> slice of doc ids / weights), so a saved index can be memory-mapped read-only.
+- Expose:
+    - tokenize(text) -> list[str]
+    - BM25Index.build(documents) -> BM25Index
+    - BM25Index.save(path) / BM25Index.load(path, k1, b, n_docs=None) -> BM25Index | None
+    - BM25Index.score_all(text) -> np.ndarray
+    - BM25Index.score_documents(text, documents) -> np.ndarray
+    - BM25Index.top(text, k, mask=None) -> (positions, scores)
+"""
+
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .cache_utils import normalize_query
+
+_NUMBER = r"\d+(?:[.,]\d+)?"
+_DIMENSION_RE = re.compile(rf"({_NUMBER})\s*[x×*]\s*({_NUMBER})(?:\s*[x×*]\s*({_NUMBER}))?")
+_ELISION_RE = re.compile(r"\b(?:l|d|j|m|n|s|t|c|qu)['’]")
+_TOKEN_RE = re.compile(r"\d+(?:[.x]\d+)*|[a-z0-9]+")
+
+FRENCH_STOP_WORDS = frozenset("""
+    a au aux avec ce ces dans de des du en et la le les leur ou par pas pour sans se sur un une
+    the and of for with
+""".split())
+
+
+def _dimension(match: re.Match) -> str:
+    return " " + "x".join(group.replace(",", ".") for group in match.groups() if group) + " "
+
+
+def _stem(token: str) -> str:
+    # carreaux -> carreau, colles -> colle; numbers and short tokens untouched
+    if len(token) > 4 and not token[0].isdigit() and token[-1] in "sx":
+        return token[:-1]
+    return token
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    text = normalize_query(text or "")
+    text = _DIMENSION_RE.sub(_dimension, text)
+    text = _ELISION_RE.sub(" ", text)
+    text = re.sub(r"(\d),(\d)", r"\1.\2", text)
+    return [_stem(token) for token in _TOKEN_RE.findall(text) if token not in FRENCH_STOP_WORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed list of documents. Postings store the precomputed per-document term
+    weight, so query scoring is an idf-weighted scatter-add over the matched postings.
+    The postings of term `t` are `doc_ids[indptr[t]:indptr[t + 1]]` / `weights[...]`.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.n_docs = 0
+        self.avg_len = 1.0
+        self.terms: dict[str, int] = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.idf = np.zeros(0, dtype=np.float32)
+
+    def build(self, documents: Sequence[str]) -> "BM25Index":
+        doc_tokens = [Counter(tokenize(doc)) for doc in documents]
+        lengths = np.array([sum(tf.values()) for tf in doc_tokens], dtype=np.float32)
+        avg_len = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+        norms = self.k1 * (1 - self.b + self.b * lengths / avg_len)
+
+        raw = defaultdict(lambda: ([], []))
+        for doc_id, tf in enumerate(doc_tokens):
+            for token, count in tf.items():
+                ids, weights = raw[token]
+                ids.append(doc_id)
+                weights.append(count * (self.k1 + 1) / (count + norms[doc_id]))
+
+        self.n_docs = len(documents)
+        self.avg_len = avg_len
+        tokens = sorted(raw)
+        self.terms = {token: t for t, token in enumerate(tokens)}
+        counts = np.array([len(raw[token][0]) for token in tokens], dtype=np.int64)
+        self.indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.doc_ids = np.fromiter((i for token in tokens for i in raw[token][0]), dtype=np.int32,
+                                   count=int(self.indptr[-1]))
+        self.weights = np.fromiter((w for token in tokens for w in raw[token][1]), dtype=np.float32,
+                                   count=int(self.indptr[-1]))
+        self.idf = np.log(1 + (self.n_docs - counts + 0.5) / (counts + 0.5)).astype(np.float32)
+        print(f"(*) BM25 index built: {self.n_docs} docs, {len(self.terms)} terms")
+        return self
+
+    def score_all(self, text: str) -> np.ndarray:
+        """
+        BM25 score of every document for the query text (0 for documents sharing no term).
+        """
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for token in set(tokenize(text)):
+            t = self.terms.get(token)
+            if t is not None:
+                start, end = self.indptr[t], self.indptr[t + 1]
+                scores[self.doc_ids[start:end]] += self.idf[t] * self.weights[start:end]
+        return scores
+
+    def score_documents(self, text: str, documents: Sequence[str]) -> np.ndarray:
+        """
+        BM25 score of arbitrary documents (e.g. candidates returned by pgvector) for the query text,
+        with the idf and average length of the indexed catalog.
+        """
+        query = {self.terms[token] for token in tokenize(text) if token in self.terms}
+        scores = np.zeros(len(documents), dtype=np.float32)
+        if not query:
+            return scores
+        for i, doc in enumerate(documents):
+            tokens = tokenize(doc)
+            norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.avg_len)
+            for token, count in Counter(tokens).items():
+                t = self.terms.get(token)
+                if t in query:
+                    scores[i] += self.idf[t] * count * (self.k1 + 1) / (count + norm)
+        return scores
+
+    def top(self, text: str, k: int, mask: Optional[np.ndarray] = None,
+            scores: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Positions and scores of the `k` best matching documents (only documents with a score > 0,
+        restricted to `mask` when given), best first.
+        """
+        scores = self.score_all(text) if scores is None else scores
+        hits = scores > 0
+        if mask is not None:
+            hits &= mask
+        positions = np.flatnonzero(hits)
+        if len(positions) > k:
+            positions = positions[np.argpartition(-scores[positions], k - 1)[:k]]
+        positions = positions[np.argsort(-scores[positions], kind="stable")]
+        return positions, scores[positions]
+
+    def save(self, path: str) -> Path:
+        """
+        Write the index to the directory `path`: CSR arrays as .npy, terms one per line, bm25.json last.
+        """
+        out_dir = Path(path)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for name in ("indptr", "doc_ids", "weights", "idf"):
+            np.save(out_dir / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        # Tokens never contain whitespace (see _TOKEN_RE)
+        (out_dir / "terms.txt").write_text("\n".join(sorted(self.terms, key=self.terms.get)), encoding="utf-8")
+        tmp = out_dir / "bm25.json.tmp"
+        tmp.write_text(json.dumps({"k1": self.k1, "b": self.b, "n_docs": self.n_docs,
+                                   "avg_len": self.avg_len}), encoding="utf-8")
+        os.replace(tmp, out_dir / "bm25.json")
+        return out_dir
+
+    @classmethod
+    def load(cls, path: str, k1: float, b: float, n_docs: Optional[int] = None) -> Optional["BM25Index"]:
+        """
+        Load a saved index; the postings stay memory-mapped read-only. Returns None -- after saying
+        why -- when it was built with other k1 / b or over another number of documents.
+        """
+        p = Path(path)
+        if not (p / "bm25.json").is_file():
+            return None
+        meta = json.loads((p / "bm25.json").read_text(encoding="utf-8"))
+        if (meta["k1"], meta["b"]) != (k1, b) or (n_docs is not None and meta["n_docs"] != n_docs) \
+                or "avg_len" not in meta:
+            print(f"(*) BM25 index at {p} was built with k1={meta['k1']}, b={meta['b']} over {meta['n_docs']} "
+                  f"docs -- rebuilding")
+            return None
+        index = cls(k1=k1, b=b)
+        index.n_docs = meta["n_docs"]
+        index.avg_len = meta["avg_len"]
+        terms = (p / "terms.txt").read_text(encoding="utf-8")
+        index.terms = {token: t for t, token in enumerate(terms.split("\n"))} if terms else {}
+        for name in ("indptr", "doc_ids", "weights", "idf"):
+            setattr(index, name, np.load(p / f"{name}.npy", mmap_mode="r"))
+        return index
@@ -0,0 +1,148 @@
+"""
+utils/normalization_utils.py
+
+Responsibilities:
+- Turn scraped product fields into typed values once, at ingest time:
+    - prices such as "12,95", "1 234,95" or "1.234,95" -> Decimal; a lone dot is a decimal point
+      ("12.950", "0.125"), dots are only thousands separators when there are several ("1.234.567")
+      or a decimal comma follows ("1.234,95")
+    - unit labels such as "€/M²", "€/Carton" or "€/kg" -> canonical unit + conversion factor
+    - VAT such as "20%", "5,5 %", 20 or 0.2 -> fraction (Decimal("0.2")); a "%" always means a
+      percentage ("1%" -> 0.01), bare numbers of 1 or more are read as percentages
+- Canonical units: "m2" (surface), "unit" (piece / packaging), "litre", "kg", "lm" (mètre linéaire,
+  the French trade unit for linear lengths). Prices are stored per canonical unit:
+  canonical_price = listed_price * factor (e.g. a price per gram * 1000 = price per kg).
+- "ml" is ambiguous on supplier pages: lower-case "ml" is the trade abbreviation of mètre linéaire,
+  "mL" (capital L) and "millilitre" are millilitres (litre, factor 1000). Leading French articles
+  are ignored ("€/le lot" -> unit).
+- Expose:
+    - CANONICAL_UNITS
+    - parse_decimal(value) -> Decimal | None
+    - parse_unit(label) -> tuple[str | None, Decimal]
+    - parse_vat_rate(value) -> Decimal | None
+    - fingerprint(*values) -> str
+    - normalize_product(row) -> dict
+"""
+
+import hashlib
+import re
+import unicodedata
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+CANONICAL_UNITS = ("m2", "unit", "litre", "kg", "lm")
+# Fields hashed into CONTENT_HASH (what the embedding is computed from) and PRICE_HASH (everything else
+# shown in a result: price, units, VAT, quality and listing metadata).
+CONTENT_FIELDS = ("material_name", "description")
+PRICE_FIELDS = ("unit_price", "unit", "listed_unit", "vat_rate", "quality_score", "region", "vendor", "source")
+
+# (pattern on the folded label, canonical unit, factor to convert a listed price into a canonical price).
+# Order matters: surface units are matched before the bare "m" of linear metres.
+UNIT_ALIASES = [
+    (re.compile(r"^(m2|metres? carres?)"), "m2", Decimal(1)),
+    (re.compile(r"^cm2"), "m2", Decimal(10000)),
+    (re.compile(r"^(millilitres?|milliliters?)\b"), "litre", Decimal(1000)),
+    (re.compile(r"^(ml|lm|m|metres? lineaires?|metres?)\b"), "lm", Decimal(1)),
+    (re.compile(r"^cm\b"), "lm", Decimal(100)),
+    (re.compile(r"^(l|litres?|liters?)\b"), "litre", Decimal(1)),
+    (re.compile(r"^cl\b"), "litre", Decimal(100)),
+    (re.compile(r"^(kg|kilos?|kilogrammes?)\b"), "kg", Decimal(1)),
+    (re.compile(r"^(g|grammes?)\b"), "kg", Decimal(1000)),
+    (re.compile(r"^(t|tonnes?)\b"), "kg", Decimal("0.001")),
+    (re.compile(r"^(u|unites?|units?|pieces?|pces?|pc|carton|lot|sac|rouleau|pot|boite|paquet|palette|kit)\b"),
+     "unit", Decimal(1)),
+]
+# Millilitres are told apart from mètres linéaires by the case of the label: "€/mL", "5 mL"
+_MILLILITRE_LABEL = re.compile(r"(?:^|[/\s\d])mL\b")
+_ARTICLES = re.compile(r"^(?:(?:le|la|les|un|une)\s+|l['’]\s*)")
+_NUMBER_CHARS = re.compile(r"[^0-9,.\-]")
+# Several dot groups on a non-zero integer part ("1.234.567"); a single one ("12.950") is a decimal point
+_THOUSANDS_DOTS = re.compile(r"^-?[1-9]\d{0,2}(\.\d{3}){2,}$")
+
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+
+
+def parse_decimal(value) -> Optional[Decimal]:
+    """
+    '1 234,95 €' -> Decimal('1234.95'); '1.234.567' -> Decimal('1234567'); '12.950' -> Decimal('12.95')
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value))
+    text = _NUMBER_CHARS.sub("", str(value))
+    if "," in text and "." in text:
+        # The right-most separator is the decimal one
+        thousands = "." if text.rfind(",") > text.rfind(".") else ","
+        text = text.replace(thousands, "").replace(",", ".")
+    elif "," in text:
+        text = text.replace(",", ".")
+    elif _THOUSANDS_DOTS.match(text):
+        text = text.replace(".", "")
+    try:
+        return Decimal(text) if text else None
+    except InvalidOperation:
+        return None
+
+
+def parse_unit(label: Optional[str]) -> tuple[Optional[str], Decimal]:
+    """
+    '€/M²' -> ('m2', 1); '€/Carton' -> ('unit', 1); '€/g' -> ('kg', 1000); '€/ml' -> ('lm', 1);
+    '€/mL' -> ('litre', 1000); unknown -> (None, 1)
+    """
+    if not label:
+        return None, Decimal(1)
+    if _MILLILITRE_LABEL.search(label):
+        return "litre", Decimal(1000)
+    text = _fold(label).replace("€", " ").replace("eur", " ")
+    text = text.split("/", 1)[-1].replace("par ", " ").strip()
+    text = _ARTICLES.sub("", text)
+    for pattern, unit, factor in UNIT_ALIASES:
+        if pattern.match(text):
+            return unit, factor
+    return None, Decimal(1)
+
+
+def parse_vat_rate(value) -> Optional[Decimal]:
+    """
+    '20%' / '20' / 0.2 -> Decimal('0.2'); '5,5 %' -> Decimal('0.055'); '1%' -> Decimal('0.01')
+    """
+    rate = parse_decimal(value)
+    if rate is None:
+        return None
+    if isinstance(value, str) and "%" in value:
+        return rate / 100
+    # Bare number: a fraction below 1 (0.055), a percentage otherwise (20, 5.5; a 100% VAT does not exist)
+    return rate / 100 if rate >= 1 else rate
+
+
+def fingerprint(*values) -> str:
+    """
+    SHA-1 over the values (None and "" hash alike); 40 hex chars.
+    """
+    payload = "\x1f".join("" if value is None else str(value) for value in values)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_product(row: dict) -> dict:
+    """
+    Typed copy of a scraped product: UNIT_PRICE per canonical unit, canonical UNIT, the original
+    label kept as LISTED_UNIT, VAT as a fraction and a numeric quality score, plus the content
+    and price fingerprints used to skip unchanged rows on re-ingest.
+    """
+    unit, factor = parse_unit(row.get("unit"))
+    price = parse_decimal(row.get("unit_price"))
+    product = {
+        **row,
+        "unit_price": price * factor if price is not None else None,
+        "unit": unit,
+        "listed_unit": row.get("unit"),
+        "vat_rate": parse_vat_rate(row.get("vat_rate")),
+        "quality_score": parse_decimal(row.get("quality_score")),
+    }
+    product["content_hash"] = fingerprint(*(product.get(field) for field in CONTENT_FIELDS))
+    product["price_hash"] = fingerprint(*(product.get(field) for field in PRICE_FIELDS))
+    return product
@@ -1,3 +1,4 @@
+import asyncio
 import functools
 import time
 import yaml, json
@@ -5,15 +6,35 @@ from pathlib import Path
 import os
 
 
-def retry(retries=3, delay=0, exceptions=(Exception,)):
+def retry(retries=3, delay=0, exceptions=(Exception,), backoff=1):
     """
-    Retry decorator.
+    Retry decorator (works on plain and `async def` functions).
     Args:
         retries (int): Number of times to retry before giving up.
         delay (int/float): Seconds to wait between retries.
         exceptions (tuple): Exception classes to catch and retry on.
+        backoff (int/float): Multiplier applied to the wait after every failed attempt.
+    Both `retries` and `delay` can be overridden per call with keyword arguments of the same name.
     """
     def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                retries_limit = kwargs.pop("retries", retries)
+                interval = kwargs.pop("delay", delay)
+                attempts = 0
+                while True:
+                    try:
+                        return await func(*args, **kwargs)
+                    except exceptions:
+                        attempts += 1
+                        if attempts > retries_limit:
+                            raise
+                        if interval:
+                            await asyncio.sleep(interval)
+                            interval *= backoff
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             retries_limit = kwargs.pop("retries", retries)
@@ -26,8 +47,9 @@ def retry(retries=3, delay=0, exceptions=(Exception,)):
                     attempts += 1
                     if attempts > retries_limit:
                         raise
-                    if delay:
+                    if interval:
                         time.sleep(interval)
+                        interval *= backoff
         return wrapper
     return decorator
 
@@ -0,0 +1,137 @@
+"""
+utils/pipeline_utils.py
+
+Responsibilities:
+- Building blocks of the streaming ingest pipeline:
+    reader (generator) -> dispatch (main thread) -> [bounded queue] -> writer (single thread)
+  The dispatch stage hands CPU-bound work to a process pool and enqueues futures. The bounded queue
+  caps the batches in flight, so a slow writer or slow workers block the reader (backpressure) and
+  memory stays flat.
+- Embedding worker processes, each with its own model instance and a share of the CPU threads.
+- Resumable progress: a JSON checkpoint, replaced atomically after every committed batch.
+- Expose:
+    - EmbeddingWorkerPool(embedding_config, processes=None).submit(texts) -> Future[np.ndarray]
+    - run_staged(items, dispatch, write, queue_size=8) -> int
+    - Checkpoint(path).load() / save(**state) / clear()
+"""
+
+import json
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from .embedding_utils import build_embedding_backend
+
+_worker_backend = None
+
+
+def _init_worker(embedding_config: dict, threads: int) -> None:
+    global _worker_backend
+    if embedding_config.get("backend", "torch") == "torch":
+        import torch
+        torch.set_num_threads(threads)
+    _worker_backend = build_embedding_backend(**{**embedding_config, "intra_op_threads": threads})
+
+
+def _encode(texts: list, batch_size: int) -> np.ndarray:
+    return np.asarray(_worker_backend.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+
+class EmbeddingWorkerPool:
+    """
+    Process pool of embedding workers. Processes are spawned (not forked) so no torch / OpenMP state
+    is inherited; the CPU cores are split evenly between them.
+    """
+
+    def __init__(self, embedding_config: dict, processes: Optional[int] = None, encode_batch_size: int = 64) -> None:
+        cpus = os.cpu_count() or 1
+        self.processes = max(1, int(processes or cpus))
+        self.encode_batch_size = encode_batch_size
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(embedding_config, max(1, cpus // self.processes)),
+        )
+        print(f"(*) Embedding worker pool: {self.processes} processes x {max(1, cpus // self.processes)} threads")
+
+    def submit(self, texts: list) -> Future:
+        if not texts:
+            future = Future()
+            future.set_result(np.empty((0, 0), dtype=np.float32))
+            return future
+        return self._executor.submit(_encode, texts, self.encode_batch_size)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_DONE = object()
+
+
+def run_staged(items: Iterable, dispatch: Callable, write: Callable, queue_size: int = 8) -> int:
+    """
+    Run `dispatch(item)` for every item in the calling thread and `write(dispatched)` in a single
+    writer thread, in input order, with at most `queue_size` dispatched items waiting. The first
+    writer error stops the pipeline and is re-raised. Returns the number of items written.
+    """
+    pending: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+    failure: list = []
+    written = [0]
+
+    def writer() -> None:
+        while True:
+            item = pending.get()
+            if item is _DONE:
+                return
+            if failure:
+                continue  # drain so the dispatcher never blocks on a dead writer
+            try:
+                write(item)
+                written[0] += 1
+            except BaseException as ex:
+                failure.append(ex)
+
+    thread = threading.Thread(target=writer, name="ingest-writer", daemon=True)
+    thread.start()
+    try:
+        for item in items:
+            if failure:
+                break
+            pending.put(dispatch(item))
+    finally:
+        pending.put(_DONE)
+        thread.join()
+    if failure:
+        raise failure[0]
+    return written[0]
+
+
+class Checkpoint:
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = Path(path) if path else None
+
+    def load(self) -> dict:
+        if self.path is None or not self.path.exists():
+            return {}
+        with open(self.path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def save(self, **state) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(state, fh)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        if self.path is not None and self.path.exists():
+            self.path.unlink()
@@ -0,0 +1,266 @@
+"""
+utils/quantization_utils.py
+
+Responsibilities:
+- Compress L2-normalized embeddings for the first (approximate) scoring pass of VectorIndex:
+    - "float16": half-precision copy (2 bytes / dim).
+    - "int8":    per-dimension scalar quantization (1 byte / dim).
+    - "pq":      product quantization, `m` sub-spaces x 256 centroids (1 byte / sub-space).
+- Quantizer parameters are plain JSON-able dicts so the ingest job can fit them once and ship
+  them to the API workers through the database.
+- Expose:
+    - build_quantizer(mode, params=None, **options) -> Quantizer | None
+    - Quantizer.fit(matrix) / encode(matrix) / score(codes, query) / score_batch(codes, queries) / params()
+    - fit_quantizer_params(matrix, modes, options=None) -> dict
+    - estimate_memory(n_rows, dim, pq_m=48) -> dict
+"""
+
+from typing import Optional
+
+import numpy as np
+
+
+class Quantizer:
+    mode = "base"
+    # Rows scored per chunk: bounds the float32 temporaries created while scoring codes.
+    chunk_size = 65536
+
+    @property
+    def is_fitted(self) -> bool:
+        return True
+
+    def fit(self, matrix: np.ndarray) -> "Quantizer":
+        return self
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def _prepare(self, query: np.ndarray):
+        """
+        Per-query scoring context (kept local so concurrent searches never share state).
+        """
+        return query
+
+    def _score_chunk(self, codes: np.ndarray, prepared) -> np.ndarray:
+        raise NotImplementedError
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """
+        Approximate inner products between `query` and every encoded row.
+        """
+        prepared = self._prepare(np.asarray(query, dtype=np.float32))
+        out = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], self.chunk_size):
+            out[start:start + self.chunk_size] = self._score_chunk(codes[start:start + self.chunk_size], prepared)
+        return out
+
+    def _score_chunk_batch(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """
+        (n_queries, len(codes)) scores of one chunk; subclasses with a matrix form override this.
+        """
+        return np.stack([self._score_chunk(codes, self._prepare(query)) for query in queries])
+
+    def score_batch(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """
+        Approximate inner products between every query and every encoded row: (n_queries, n_rows).
+        Each chunk of codes is decoded once for all the queries.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        out = np.empty((queries.shape[0], codes.shape[0]), dtype=np.float32)
+        for start in range(0, codes.shape[0], self.chunk_size):
+            out[:, start:start + self.chunk_size] = self._score_chunk_batch(codes[start:start + self.chunk_size],
+                                                                            queries)
+        return out
+
+    def params(self) -> dict:
+        return {"mode": self.mode}
+
+    def bytes_per_vector(self, dim: int) -> int:
+        raise NotImplementedError
+
+
+class Float16Quantizer(Quantizer):
+    mode = "float16"
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(matrix, dtype=np.float16)
+
+    def _score_chunk(self, codes: np.ndarray, prepared: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) @ prepared
+
+    def _score_chunk_batch(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        return queries @ codes.astype(np.float32).T
+
+    def bytes_per_vector(self, dim: int) -> int:
+        return 2 * dim
+
+
+class Int8Quantizer(Quantizer):
+    """
+    x[d] ~ (code[d] + 128) * scale[d] + offset[d], with scale/offset taken from the per-dimension
+    min/max of the fitted matrix. Inner products are computed without dequantizing:
+        <x, q> ~ (code + 128) @ (scale * q) + offset @ q
+    """
+    mode = "int8"
+
+    def __init__(self, scale: Optional[list] = None, offset: Optional[list] = None) -> None:
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float32)
+        self.offset = None if offset is None else np.asarray(offset, dtype=np.float32)
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.scale is not None and self.offset is not None
+
+    def fit(self, matrix: np.ndarray) -> "Int8Quantizer":
+        low = matrix.min(axis=0).astype(np.float32)
+        high = matrix.max(axis=0).astype(np.float32)
+        scale = (high - low) / 255.0
+        scale[scale == 0] = 1.0
+        self.scale, self.offset = scale, low
+        return self
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        codes = np.rint((matrix - self.offset) / self.scale) - 128
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def _prepare(self, query: np.ndarray) -> tuple:
+        return self.scale * query, float(self.offset @ query)
+
+    def _score_chunk(self, codes: np.ndarray, prepared: tuple) -> np.ndarray:
+        scaled_query, bias = prepared
+        return (codes.astype(np.float32) + 128) @ scaled_query + bias
+
+    def _score_chunk_batch(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        return (self.scale * queries) @ (codes.astype(np.float32) + 128).T + (queries @ self.offset)[:, None]
+
+    def params(self) -> dict:
+        return {"mode": self.mode, "scale": self.scale.tolist(), "offset": self.offset.tolist()}
+
+    def bytes_per_vector(self, dim: int) -> int:
+        return dim
+
+
+def kmeans(data: np.ndarray, k: int, n_iter: int = 15, seed: int = 42) -> np.ndarray:
+    """
+    Plain Lloyd k-means (squared euclidean); returns the (k, dim) centroids.
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), size=k, replace=False)].astype(np.float32)
+    for _ in range(n_iter):
+        distances = (data ** 2).sum(1)[:, None] - 2 * data @ centroids.T + (centroids ** 2).sum(1)[None, :]
+        labels = np.argmin(distances, axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+class ProductQuantizer(Quantizer):
+    """
+    Splits vectors into `m` sub-vectors, each encoded by the id of its nearest of `n_centroids`
+    sub-space centroids. Queries are scored with asymmetric distance computation: a (m, n_centroids)
+    lookup table of sub-query / centroid inner products summed over each row's codes.
+    """
+    mode = "pq"
+
+    def __init__(self, m: int = 48, n_centroids: int = 256, n_iter: int = 15, train_size: int = 65536,
+                 seed: int = 42, codebooks: Optional[list] = None) -> None:
+        if n_centroids > 256:
+            raise ValueError("ProductQuantizer stores codes as uint8: n_centroids must be <= 256")
+        self.m = m
+        self.n_centroids = n_centroids
+        self.n_iter = n_iter
+        self.train_size = train_size
+        self.seed = seed
+        self.codebooks = None if codebooks is None else np.asarray(codebooks, dtype=np.float32)
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.codebooks is not None
+
+    def _split(self, matrix: np.ndarray) -> list[np.ndarray]:
+        if matrix.shape[-1] % self.m:
+            raise ValueError(f"Dimension {matrix.shape[-1]} is not divisible by pq m={self.m}")
+        return np.split(matrix, self.m, axis=-1)
+
+    def fit(self, matrix: np.ndarray) -> "ProductQuantizer":
+        rng = np.random.default_rng(self.seed)
+        sample = matrix[rng.choice(len(matrix), size=min(len(matrix), self.train_size), replace=False)]
+        sample = np.asarray(sample, dtype=np.float32)
+        # Small catalogs (< n_centroids rows) get one centroid per row in every sub-space.
+        self.codebooks = np.stack([kmeans(sub, self.n_centroids, n_iter=self.n_iter, seed=self.seed)
+                                   for sub in self._split(sample)])
+        return self
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        codes = np.empty((matrix.shape[0], self.m), dtype=np.uint8)
+        for j, sub in enumerate(self._split(np.asarray(matrix, dtype=np.float32))):
+            book = self.codebooks[j]
+            distances = -2 * sub @ book.T + (book ** 2).sum(1)[None, :]
+            codes[:, j] = np.argmin(distances, axis=1)
+        return codes
+
+    def _prepare(self, query: np.ndarray) -> np.ndarray:
+        sub_queries = self._split(query)
+        return np.stack([self.codebooks[j] @ sub_queries[j] for j in range(self.m)])
+
+    def _score_chunk(self, codes: np.ndarray, prepared: np.ndarray) -> np.ndarray:
+        return prepared[np.arange(self.m), codes].sum(axis=1)
+
+    def params(self) -> dict:
+        return {"mode": self.mode, "m": self.m, "n_centroids": self.n_centroids,
+                "codebooks": self.codebooks.tolist()}
+
+    def bytes_per_vector(self, dim: int) -> int:
+        return self.m
+
+
+QUANTIZERS = {
+    Float16Quantizer.mode: Float16Quantizer,
+    Int8Quantizer.mode: Int8Quantizer,
+    ProductQuantizer.mode: ProductQuantizer,
+}
+
+
+def build_quantizer(mode: Optional[str], params: Optional[dict] = None, **options) -> Optional[Quantizer]:
+    """
+    Instantiate a quantizer. `params` (as produced by `Quantizer.params()`) restores a fitted one;
+    otherwise `options` configure an unfitted quantizer. "float32"/None means no quantization.
+    """
+    if not mode or mode == "float32":
+        return None
+    if mode not in QUANTIZERS:
+        raise ValueError(f"Unknown quantization mode: {mode}. Available: {['float32', *QUANTIZERS]}")
+    if params:
+        params = {key: value for key, value in params.items() if key != "mode"}
+        return QUANTIZERS[mode](**{**options, **params})
+    return QUANTIZERS[mode](**options)
+
+
+def fit_quantizer_params(matrix: np.ndarray, modes: list, options: Optional[dict] = None) -> dict:
+    """
+    Fit every quantizer in `modes` on `matrix` (L2-normalized rows) and return {mode: params}.
+    Used by the ingest job to ship ready-made parameters to the API workers.
+    """
+    options = options or {}
+    fitted = {}
+    for mode in modes:
+        quantizer = build_quantizer(mode, **options.get(mode, {}))
+        if quantizer is not None:
+            fitted[mode] = quantizer.fit(matrix).params()
+    return fitted
+
+
+def estimate_memory(n_rows: int, dim: int, pq_m: int = 48) -> dict:
+    """
+    Bytes needed to hold `n_rows` vectors of `dim` dimensions in each storage mode.
+    """
+    return {
+        "float32": n_rows * dim * 4,
+        "float16": n_rows * dim * 2,
+        "int8": n_rows * dim,
+        "pq": n_rows * pq_m,
+    }
@@ -1,10 +1,35 @@
+"""
+utils/request_utils.py
+
+Responsibilities:
+- HTTP GETs for the scrapers:
+    - one pooled `requests.Session` per host: keep-alive connections are reused across requests
+      (and across the crawler's threads), responses are compressed in transit
+    - optional on-disk conditional-GET cache (`cache_path`): a known URL is requested with
+      If-None-Match / If-Modified-Since and a 304 is answered from the cache as a regular 200
+- Count requests, bytes downloaded and cache hits.
+- Expose:
+    - RequestUtils(cache_path=None, pool_size=10)
+    - RequestUtils.get_data(url, timeout=20, retries=3, delay=0) -> requests.Response
+    - RequestUtils.stats() / close()
+"""
+
+import threading
+from importlib.util import find_spec
+from typing import Optional
+from urllib.parse import urlparse
+
 import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from .cache_utils import HttpCache
 from .operation_utils import retry
 
+ACCEPT_ENCODING = "gzip, deflate, br" if find_spec("brotli") or find_spec("brotlicffi") else "gzip, deflate"
 
 
 class RequestUtils:
-    def __init__(self):
+    def __init__(self, cache_path: Optional[str] = None, pool_size: int = 10):
         self.headers = {
             "User-Agent": (
                 "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -13,14 +38,80 @@ class RequestUtils:
             ),
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
             "Accept-Language": "en-US,en;q=0.9,fr;q=0.8",
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Connection": "keep-alive",
         }
-    
+        self.pool_size = pool_size
+        self.cache = HttpCache(cache_path) if cache_path else None
+        self._sessions: dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "not_modified": 0, "bytes_downloaded": 0}
+
+    def _session(self, url: str) -> requests.Session:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.headers.update(self.headers)
+                # Retries are handled by `retry` / the crawler, not by urllib3
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def _count(self, **increments) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                self._stats[name] += value
+
+    @staticmethod
+    def _wire_bytes(response: requests.Response) -> int:
+        body = response.content  # drains the stream, so tell() covers the whole body
+        try:
+            return int(response.raw.tell())
+        except (AttributeError, TypeError, ValueError):
+            return len(body)
+
+    @staticmethod
+    def _from_cache(url: str, entry: dict, body: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = body
+        response.from_cache = True
+        return response
+
     @retry(retries=3, delay=0)
     def get_data(self, url, timeout: int = 20):
-        response = requests.get(url, headers=self.headers, timeout=timeout)
+        entry = self.cache.get(url) if self.cache is not None else None
+        response = self._session(url).get(url, headers=HttpCache.validators(entry), timeout=timeout)
+        # Bytes on the wire (compressed) when urllib3 reports them, else the decoded body size
+        self._count(requests=1, bytes_downloaded=self._wire_bytes(response))
+        if response.status_code == 304 and entry is not None:
+            self._count(not_modified=1)
+            return self._from_cache(url, entry, self.cache.hit(url, entry))
         if response.status_code != 200:
             raise Exception(f"Invalid Response -- {response.status_code = }")
+        if self.cache is not None:
+            self.cache.put(url, response.headers, response.content)
+        response.from_cache = False
         return response
-    
 
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats, hosts=len(self._sessions))
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
 
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,62 @@
+"""
+utils/sitemap_utils.py
+
+Responsibilities:
+- Stream sitemap entries with `ElementTree.iterparse`: each <url> / <sitemap> element is yielded as
+  soon as it is closed and then dropped from the tree, so a 50 000-URL sitemap never exists as a
+  full document tree or URL list. Gzip-compressed sitemaps (".xml.gz") are detected by their magic bytes.
+- Expose:
+    - SitemapEntry(loc, lastmod, sitemap)   (sitemap=True for child sitemaps of a sitemap index)
+    - iter_sitemap(content) -> Iterator[SitemapEntry]
+"""
+
+import gzip
+import io
+from typing import IO, Iterator, NamedTuple, Optional, Union
+from xml.etree import ElementTree as ET
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class SitemapEntry(NamedTuple):
+    loc: str
+    lastmod: Optional[str]
+    sitemap: bool
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_sitemap(content: Union[bytes, IO[bytes]]) -> Iterator[SitemapEntry]:
+    """
+    (loc, lastmod) of every <url> of a urlset, or of every <sitemap> of a sitemap index (sitemap=True),
+    in document order. Raises ElementTree.ParseError on malformed XML, after the entries read so far.
+    """
+    stream = io.BytesIO(content) if isinstance(content, (bytes, bytearray)) else content
+    if stream.read(2) == GZIP_MAGIC:
+        stream.seek(0)
+        stream = gzip.GzipFile(fileobj=stream)
+    else:
+        stream.seek(0)
+    root = None
+    for event, element in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            continue
+        name = _local_name(element.tag)
+        if name not in ("url", "sitemap"):
+            continue
+        loc, lastmod = None, None
+        for child in element:
+            child_name = _local_name(child.tag)
+            if child_name == "loc" and child.text:
+                loc = child.text.strip()
+            elif child_name == "lastmod" and child.text:
+                lastmod = child.text.strip()
+        if loc:
+            yield SitemapEntry(loc, lastmod, name == "sitemap")
+        # Drop the finished entry (and the root's reference to it): memory stays flat
+        element.clear()
+        root.clear()
@@ -0,0 +1,237 @@
+"""
+utils/snapshot_utils.py
+
+Responsibilities:
+- Versioned on-disk snapshot of the catalog index, written by the ingest job:
+    <base_dir>/<version>/embeddings.npy      L2-normalized float32 matrix (n, dim)
+    <base_dir>/<version>/codes_<mode>.npy    optional quantized codes, one file per mode
+    <base_dir>/<version>/col_<COLUMN>*.npy   metadata columns aligned with the matrix rows:
+                                             text      -> utf-8 bytes + int64 offsets (+ null mask)
+                                             number    -> float64, NaN for NULL
+                                             category  -> int32 codes into the values listed in metadata.json
+    <base_dir>/<version>/bm25/               optional BM25 postings (see lexical_utils)
+    <base_dir>/<version>/ivf/                optional IVF index (see ann_utils)
+    <base_dir>/<version>/metadata.json       version, columns and their kinds, quantizers
+    <base_dir>/CURRENT                       name of the latest complete version
+- API workers open every array with `np.load(mmap_mode="r")`, so every process on the host shares a
+  single page-cache copy and startup neither copies the matrix nor materializes the metadata rows.
+- Snapshots written before the columnar layout (rows inlined in metadata.json) still load.
+- Expose:
+    - ColumnarRows
+    - write_snapshot(base_dir, matrix, columns, rows, codes=None, quantizers=None, categorical=(),
+                     lexical=None, ann=None) -> Path
+    - latest_snapshot(base_dir) -> Path | None
+    - load_snapshot(path) -> dict
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from decimal import Decimal
+from numbers import Number
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+CURRENT_FILE = "CURRENT"
+FORMAT_VERSION = 2
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _as_text(value) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def _column_kind(values: list, categorical: bool) -> str:
+    if categorical:
+        return "category"
+    if all(value is None or (isinstance(value, Number) and not isinstance(value, bool)) for value in values):
+        return "number"
+    return "text"
+
+
+def _write_column(out_dir: Path, name: str, values: list, categorical: bool) -> dict:
+    """
+    Save one metadata column as .npy arrays; returns its entry for metadata.json.
+    """
+    kind = _column_kind(values, categorical)
+    spec = {"name": name, "kind": kind}
+    if kind == "number":
+        np.save(out_dir / f"col_{name}.npy",
+                np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64))
+    elif kind == "category":
+        categories = sorted({_as_text(value) for value in values if value is not None})
+        lookup = {value: code for code, value in enumerate(categories)}
+        np.save(out_dir / f"col_{name}.npy",
+                np.array([-1 if value is None else lookup[_as_text(value)] for value in values], dtype=np.int32))
+        spec["values"] = categories
+    else:
+        encoded = [b"" if value is None else _as_text(value).encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        np.save(out_dir / f"col_{name}.offsets.npy", offsets)
+        np.save(out_dir / f"col_{name}.data.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        nulls = np.array([value is None for value in values], dtype=bool)
+        if nulls.any():
+            np.save(out_dir / f"col_{name}.null.npy", nulls)
+    return spec
+
+
+class ColumnarRows:
+    """
+    Read-only, row-indexable view over the memory-mapped metadata columns of a snapshot: `rows[i]` is
+    the tuple of column values (text as str, numbers as float, NULL as None), decoded on access.
+    """
+
+    def __init__(self, path: Path, specs: list, count: int) -> None:
+        self.specs = specs
+        self.count = count
+        self._columns = []
+        for spec in specs:
+            name = spec["name"]
+            if spec["kind"] == "text":
+                null_path = path / f"col_{name}.null.npy"
+                self._columns.append((
+                    np.load(path / f"col_{name}.offsets.npy", mmap_mode="r"),
+                    np.load(path / f"col_{name}.data.npy", mmap_mode="r"),
+                    np.load(null_path, mmap_mode="r") if null_path.exists() else None,
+                ))
+            else:
+                self._columns.append(np.load(path / f"col_{name}.npy", mmap_mode="r"))
+        self._codes = [{value: code for code, value in enumerate(spec.get("values", []))} for spec in specs]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def value(self, i: int, col: int):
+        kind, column = self.specs[col]["kind"], self._columns[col]
+        if kind == "number":
+            number = float(column[i])
+            return None if np.isnan(number) else number
+        if kind == "category":
+            code = int(column[i])
+            return None if code < 0 else self.specs[col]["values"][code]
+        offsets, data, nulls = column
+        if nulls is not None and nulls[i]:
+            return None
+        return data[offsets[i]:offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __getitem__(self, i: int) -> tuple:
+        i = int(i)
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return tuple(self.value(i, col) for col in range(len(self.specs)))
+
+    def __iter__(self):
+        return (self[i] for i in range(self.count))
+
+    def equals_mask(self, col: int, value) -> np.ndarray:
+        """
+        Boolean mask of the rows whose column `col` equals `value`, without decoding any row.
+        """
+        kind, column = self.specs[col]["kind"], self._columns[col]
+        if kind == "category":
+            code = self._codes[col].get(_as_text(value))
+            return np.zeros(self.count, dtype=bool) if code is None else np.asarray(column) == code
+        if kind == "number":
+            return np.asarray(column) == float(value)
+        offsets, data, nulls = column
+        target = _as_text(value).encode("utf-8")
+        mask = np.diff(offsets) == len(target)
+        for i in np.flatnonzero(mask):
+            mask[i] = data[offsets[i]:offsets[i + 1]].tobytes() == target
+        if nulls is not None:
+            mask &= ~np.asarray(nulls)
+        return mask
+
+
+def write_snapshot(base_dir: str, matrix: np.ndarray, columns: list, rows: list,
+                   codes: Optional[dict] = None, quantizers: Optional[dict] = None, keep: int = 3,
+                   categorical: Sequence[str] = (), lexical=None, ann=None) -> Path:
+    """
+    Write a new snapshot version and atomically point CURRENT at it. Older versions beyond `keep`
+    are removed (workers still mapping them keep their open file handles).
+    `categorical` names the low-cardinality columns stored as codes (region / vendor filters);
+    `lexical` (BM25Index) and `ann` (IVFIndex) are saved alongside when given.
+    """
+    base = Path(base_dir)
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    tmp_dir = base / f".{version}.tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    np.save(tmp_dir / "embeddings.npy", np.ascontiguousarray(matrix, dtype=np.float32))
+    for mode, mode_codes in (codes or {}).items():
+        np.save(tmp_dir / f"codes_{mode}.npy", np.ascontiguousarray(mode_codes))
+    specs = [_write_column(tmp_dir, name, [row[col] for row in rows], name in categorical)
+             for col, name in enumerate(columns)]
+    if lexical is not None:
+        lexical.save(tmp_dir / "bm25")
+    if ann is not None:
+        ann.save(tmp_dir / "ivf")
+    metadata = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "dimension": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "count": len(rows),
+        "columns": list(columns),
+        "column_specs": specs,
+        "quantizers": quantizers or {},
+        "lexical": lexical is not None,
+        "ann": ann is not None,
+    }
+    with open(tmp_dir / "metadata.json", "w", encoding="utf-8") as fh:
+        json.dump(metadata, fh, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+    version_dir = base / version
+    os.replace(tmp_dir, version_dir)
+    current_tmp = base / f".{CURRENT_FILE}.tmp"
+    current_tmp.write_text(version, encoding="utf-8")
+    os.replace(current_tmp, base / CURRENT_FILE)
+
+    versions = sorted(p for p in base.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for old in versions[:-keep] if keep else []:
+        shutil.rmtree(old, ignore_errors=True)
+    print(f"(*) Snapshot {version} written -> {version_dir}")
+    return version_dir
+
+
+def latest_snapshot(base_dir: str) -> Optional[Path]:
+    current = Path(base_dir) / CURRENT_FILE
+    if not current.exists():
+        return None
+    version_dir = Path(base_dir) / current.read_text(encoding="utf-8").strip()
+    return version_dir if (version_dir / "metadata.json").exists() else None
+
+
+def load_snapshot(path: str) -> dict:
+    """
+    Open a snapshot: arrays are read-only memory maps, `rows` a ColumnarRows view (a list of rows
+    for snapshots written before the columnar layout). `lexical_path` / `ann_path` point at the
+    saved BM25 / IVF indexes, or are None.
+    """
+    path = Path(path)
+    with open(path / "metadata.json", "r", encoding="utf-8") as fh:
+        metadata = json.load(fh)
+    if metadata.get("format", 1) >= 2:
+        metadata["rows"] = ColumnarRows(path, metadata["column_specs"], metadata["count"])
+    else:
+        metadata["rows"] = [tuple(row) for row in metadata["rows"]]
+    metadata["matrix"] = np.load(path / "embeddings.npy", mmap_mode="r")
+    metadata["codes"] = {
+        p.stem[len("codes_"):]: np.load(p, mmap_mode="r") for p in path.glob("codes_*.npy")
+    }
+    metadata["lexical_path"] = str(path / "bm25") if metadata.get("lexical") else None
+    metadata["ann_path"] = str(path / "ivf") if metadata.get("ann") else None
+    metadata["path"] = str(path)
+    return metadata
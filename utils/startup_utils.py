@@ -0,0 +1,112 @@
+"""
+utils/startup_utils.py
+
+Responsibilities:
+- Load heavy resources (embedding model, spaCy pipeline, search index) in background threads,
+  concurrently, so the web worker starts serving (health checks) immediately.
+- Stages may depend on each other: a stage's loader can call `manager.get(<other stage>)`, which
+  blocks that loader thread only.
+- Track per-stage status and wall-clock timings for a readiness endpoint.
+- Expose:
+    - StartupManager.add_stage(name, loader, required=True)
+    - StartupManager.start()
+    - StartupManager.get(name, timeout=None)      # blocking
+    - StartupManager.require(name)                # non-blocking, raises StageNotReady
+    - StartupManager.is_ready / status()
+    - warm_up_encoder(model, texts) -> float
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Sequence
+
+
+class StageNotReady(RuntimeError):
+    pass
+
+
+class StartupManager:
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self.max_workers = max_workers
+        self._stages: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self.started_at = None
+
+    def add_stage(self, name: str, loader: Callable[[], object], required: bool = True) -> None:
+        """
+        Register a loader; `required` stages gate overall readiness.
+        """
+        self._stages[name] = {"loader": loader, "required": required, "future": Future(),
+                              "status": "pending", "seconds": None, "error": None}
+
+    def _run_stage(self, name: str) -> None:
+        stage = self._stages[name]
+        started = time.perf_counter()
+        with self._lock:
+            stage["status"] = "loading"
+        print(f"(*) Startup stage '{name}' loading")
+        try:
+            value = stage["loader"]()
+        except Exception as ex:
+            with self._lock:
+                stage["status"], stage["error"] = "failed", f"{type(ex).__name__}: {ex}"
+                stage["seconds"] = round(time.perf_counter() - started, 3)
+            print(f"(*) Startup stage '{name}' failed after {stage['seconds']:.2f}s -- {stage['error']}")
+            stage["future"].set_exception(ex)
+            return
+        with self._lock:
+            stage["status"], stage["seconds"] = "ready", round(time.perf_counter() - started, 3)
+        print(f"(*) Startup stage '{name}' ready in {stage['seconds']:.2f}s")
+        stage["future"].set_result(value)
+
+    def start(self) -> None:
+        """
+        Launch every stage at once. One thread per stage, so a stage waiting on a dependency never
+        starves the dependency of a worker.
+        """
+        if self._executor is not None:
+            return
+        self.started_at = time.perf_counter()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers or max(1, len(self._stages)),
+                                            thread_name_prefix="startup")
+        for name in self._stages:
+            self._executor.submit(self._run_stage, name)
+        self._executor.shutdown(wait=False)
+
+    def get(self, name: str, timeout: Optional[float] = None):
+        return self._stages[name]["future"].result(timeout=timeout)
+
+    def require(self, name: str):
+        stage = self._stages[name]
+        if stage["status"] != "ready":
+            raise StageNotReady(f"'{name}' is {stage['status']}" + (f" ({stage['error']})" if stage["error"] else ""))
+        return stage["future"].result()
+
+    @property
+    def is_ready(self) -> bool:
+        return all(stage["status"] == "ready" for stage in self._stages.values() if stage["required"])
+
+    def status(self) -> dict:
+        with self._lock:
+            stages = {name: {key: stage[key] for key in ("status", "seconds", "error", "required")}
+                      for name, stage in self._stages.items()}
+        failed = any(stage["status"] == "failed" and stage["required"] for stage in stages.values())
+        return {
+            "status": "failed" if failed else "ready" if self.is_ready else "loading",
+            "uptime_seconds": round(time.perf_counter() - self.started_at, 3) if self.started_at else 0.0,
+            "stages": stages,
+        }
+
+
+def warm_up_encoder(model, texts: Sequence[str]) -> float:
+    """
+    Run a few throw-away encodes (single and batched) so the first request does not pay for
+    lazy kernel initialisation / allocator growth. Returns the seconds spent.
+    """
+    started = time.perf_counter()
+    texts = list(texts) or ["warm-up"]
+    model.encode(texts[0])
+    model.encode(texts)
+    return time.perf_counter() - started
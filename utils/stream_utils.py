@@ -0,0 +1,97 @@
+"""
+utils/stream_utils.py
+
+Responsibilities:
+- Read product records one at a time, with flat memory, from:
+    - JSON arrays ("[{...}, {...}]", as written by the scraper), parsed incrementally
+    - JSONL files (one object per line), optionally gzip-compressed (".gz")
+    - directories of JSONL segments written by `utils.jsonl_utils.JsonlSink`
+- Group a record stream into fixed-size batches.
+- Expose:
+    - iter_json_array(path, chunk_size=1 << 16) -> Iterator[dict]
+    - iter_jsonl(path) -> Iterator[dict]
+    - iter_records(path, skip=0) -> Iterator[dict]
+    - batched(iterable, size) -> Iterator[list]
+"""
+
+import gzip
+import json
+from itertools import chain, islice
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from .jsonl_utils import list_segments
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+def _open_text(path: str):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_json_array(path: str, chunk_size: int = 1 << 16) -> Iterator:
+    """
+    Yield the elements of a top-level JSON array without loading the whole file: the file is read
+    in `chunk_size` pieces and each element is decoded as soon as it is complete.
+    """
+    with _open_text(path) as fh:
+        buffer, pos, eof = "", 0, False
+        started = False
+        while True:
+            while pos < len(buffer) and (buffer[pos] in _WHITESPACE or (started and buffer[pos] == ",")):
+                pos += 1
+            if pos < len(buffer) and not started:
+                if buffer[pos] != "[":
+                    raise ValueError(f"{path}: expected a JSON array")
+                started, pos = True, pos + 1
+                continue
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            if pos < len(buffer):
+                try:
+                    item, end = _DECODER.raw_decode(buffer, pos)
+                    # A value ending exactly at the buffer end may be truncated (e.g. a number)
+                    if end < len(buffer) or eof:
+                        yield item
+                        pos = end
+                        continue
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+            if eof:
+                if started:
+                    raise ValueError(f"{path}: unterminated JSON array")
+                return
+            chunk = fh.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+
+
+def iter_jsonl(path: str) -> Iterator:
+    with _open_text(path) as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_records(path: str, skip: int = 0) -> Iterator:
+    """
+    Stream records from a .json / .jsonl (optionally .gz) file or a directory of JSONL segments,
+    skipping the first `skip` records (used to resume from a checkpoint).
+    """
+    if Path(path).is_dir():
+        records = chain.from_iterable(iter_jsonl(segment) for segment in list_segments(path))
+        return islice(records, skip, None)
+    name = str(path)[:-3] if str(path).endswith(".gz") else str(path)
+    records = iter_jsonl(path) if name.endswith((".jsonl", ".ndjson")) else iter_json_array(path)
+    return islice(records, skip, None)
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
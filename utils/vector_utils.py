@@ -0,0 +1,457 @@
+"""
+utils/vector_utils.py
+
+Responsibilities:
+- Hold the product catalog embeddings in memory as one contiguous, L2-normalized float32 matrix.
+- Keep the product metadata in arrays aligned with the matrix rows.
+- Score a query with a single matrix-vector product and select the top-k with argpartition.
+- Optionally narrow large catalogs with an ANN backend (see ann_utils) and re-rank its shortlist exactly.
+- Optionally fuse BM25 scores over material name + description (see lexical_utils) with cosine
+  similarity, using the lexical hits as a candidate prefilter; or re-rank candidates found
+  elsewhere (pgvector) with the same fused score.
+- Optionally keep only quantized codes (float16 / int8 / pq, see quantization_utils) for the first
+  scoring pass and re-rank the best few hundred candidates against the float32 vectors, which are then
+  memory-mapped rather than held in RAM next to the codes.
+- Optionally load everything from a memory-mapped ingest snapshot (see snapshot_utils) instead of DB rows:
+  metadata columns, BM25 postings and the IVF index are mapped read-only too, and region / vendor
+  filters compare category codes instead of Python strings.
+- Expose:
+    - to_pgvector(vector) -> str
+    - VectorIndex.build(rows) -> int
+    - VectorIndex.load_snapshot(path) -> int
+    - VectorIndex.search(vector, region=None, vendor=None, limit=5) -> list[list]
+    - VectorIndex.search_batch(vectors, filters) -> list[list[list]]
+    - VectorIndex.fuse_lexical(rows, text, limit=5) -> list
+"""
+
+import os
+import tempfile
+import threading
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .ann_utils import IVFIndex, build_ann_backend
+from .lexical_utils import BM25Index
+from .quantization_utils import build_quantizer, estimate_memory
+from .snapshot_utils import ColumnarRows, load_snapshot
+
+
+def to_pgvector(vector: Sequence[float]) -> str:
+    """
+    Render a vector as a pgvector text literal ('[0.1,0.2,...]'), to be bound as `%s::vector`.
+    """
+    return "[" + ",".join(repr(float(v)) for v in vector) + "]"
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize every row in place (zero rows are left untouched) and return the matrix.
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+class VectorIndex:
+    """
+    In-memory exact cosine index over the PRODUCTS table.
+
+    `rows` are Products tuples: metadata columns first, EMBEDDING (as a float array) last.
+    Search results keep the same layout as the legacy fallback path: the metadata columns
+    followed by the similarity score.
+
+    With `ann_backend` set (e.g. "ivf") and at least `ann_min_rows` rows, queries only score the
+    backend's shortlist; the backend is loaded from `ann_path` when it matches the catalog and
+    rebuilt (and saved) otherwise.
+
+    With `hybrid` set ({"alpha", "prefilter_k", "k1", "b"}), a BM25 index over the name and
+    description columns is built alongside. Queries that pass their text are ranked by
+    `alpha * cosine + (1 - alpha) * normalized BM25`; when the text has at least `limit` lexical
+    hits, only the top `prefilter_k` of them (plus the ANN shortlist, if any) are vector-scored.
+    The reported similarity stays the cosine similarity. `fuse_lexical` applies the same ranking to
+    candidate rows found elsewhere (pgvector), scored with the catalog's BM25 statistics.
+
+    With `quantization` set ({"mode", "rerank_k", "rerank_path", <mode>: options}), candidates are
+    first scored on the quantized codes; the top `rerank_k` are re-scored exactly. The float32 vectors
+    are only read for those candidates, so they are memory-mapped instead of held in RAM: from the
+    snapshot, else written to `rerank_path`, else to an unlinked temporary file.
+    """
+
+    def __init__(self, region_col: int = 5, vendor_col: int = 6, ann_backend: Optional[str] = None,
+                 ann_params: Optional[dict] = None, ann_path: Optional[str] = None,
+                 ann_min_rows: int = 50000, hybrid: Optional[dict] = None,
+                 name_col: int = 1, description_col: int = 2, quantization: Optional[dict] = None) -> None:
+        self.region_col = region_col
+        self.vendor_col = vendor_col
+        self.name_col = name_col
+        self.description_col = description_col
+        self.hybrid = hybrid
+        self.quantization = quantization or {}
+        self.rerank_k = int(self.quantization.get("rerank_k", 256))
+        self.ann_backend = ann_backend
+        self.ann_params = ann_params or {}
+        self.ann_path = ann_path
+        self.ann_min_rows = ann_min_rows
+        self._lock = threading.Lock()
+        self._state = None
+
+    def __len__(self) -> int:
+        state = self._state
+        return 0 if state is None else len(state["rows"])
+
+    @property
+    def is_ready(self) -> bool:
+        return len(self) > 0
+
+    @property
+    def dimension(self) -> int:
+        state = self._state
+        return 0 if state is None else state["matrix"].shape[1]
+
+    def build(self, rows: Sequence[Sequence], quantizer_params: Optional[dict] = None) -> int:
+        """
+        (Re)build the index from DB rows and atomically swap it in. Rows with a missing
+        embedding or a dimension different from the majority are skipped.
+        `quantizer_params` are parameters fitted at ingest time; without them the quantizer is fitted here.
+        Returns the number of indexed rows.
+        """
+        rows = [row for row in rows if row and row[-1] is not None and len(row[-1])]
+        if not rows:
+            with self._lock:
+                self._state = None
+            return 0
+
+        dims = [len(row[-1]) for row in rows]
+        dim = max(set(dims), key=dims.count)
+        rows = [row for row in rows if len(row[-1]) == dim]
+
+        matrix = np.empty((len(rows), dim), dtype=np.float32)
+        for i, row in enumerate(rows):
+            matrix[i] = row[-1]
+        normalize_rows(matrix)
+
+        meta = [tuple(row[:-1]) for row in rows]
+        return self._install(np.ascontiguousarray(matrix), meta, quantizer_params)
+
+    def load_snapshot(self, path: str) -> int:
+        """
+        Install a snapshot written by the ingest job. The matrix, quantized codes for the configured
+        mode, metadata columns, and the BM25 / IVF indexes when they match the configuration, stay
+        memory-mapped read-only, shared across worker processes.
+        """
+        snapshot = load_snapshot(path)
+        mode = self.quantization.get("mode")
+        print(f"(*) Loading snapshot {snapshot['version']} from {snapshot['path']}")
+        return self._install(snapshot["matrix"], snapshot["rows"],
+                             snapshot["quantizers"].get(mode), codes=snapshot["codes"].get(mode),
+                             version=snapshot["version"], lexical_path=snapshot["lexical_path"],
+                             ann_path=snapshot["ann_path"])
+
+    def _install(self, matrix: np.ndarray, meta: Sequence, quantizer_params: Optional[dict],
+                 codes: Optional[np.ndarray] = None, version: Optional[str] = None,
+                 lexical_path: Optional[str] = None, ann_path: Optional[str] = None) -> int:
+        dim = matrix.shape[1]
+        ann = self._build_ann(matrix, ann_path)
+        quantizer, codes, matrix = self._build_quantized(matrix, quantizer_params, codes)
+        columnar = isinstance(meta, ColumnarRows)
+        state = {
+            "matrix": matrix,
+            "rows": meta,
+            "regions": None if columnar else np.array([r[self.region_col] for r in meta], dtype=object),
+            "vendors": None if columnar else np.array([r[self.vendor_col] for r in meta], dtype=object),
+            "ann": ann,
+            "lexical": self._build_lexical(meta, lexical_path),
+            "quantizer": quantizer,
+            "codes": codes,
+            "snapshot_version": version,
+        }
+        with self._lock:
+            self._state = state
+        print(f"(*) Vector index built with {len(meta)} rows (dim={dim})")
+        return len(meta)
+
+    def _build_quantized(self, matrix: np.ndarray, params: Optional[dict],
+                         codes: Optional[np.ndarray] = None) -> tuple:
+        """
+        Returns (quantizer, codes, rerank matrix); the rerank matrix is always memory-mapped.
+        Pre-computed `codes` (from a snapshot) are only reused together with their shipped `params`.
+        """
+        mode = self.quantization.get("mode")
+        quantizer = build_quantizer(mode, params, **self.quantization.get(mode or "", {}))
+        if quantizer is None:
+            return None, None, matrix
+        if not quantizer.is_fitted:
+            quantizer.fit(matrix)
+            codes = None
+        if codes is None:
+            codes = quantizer.encode(matrix)
+        if not isinstance(matrix, np.memmap):
+            matrix = self._memory_map(matrix, self.quantization.get("rerank_path"))
+        print(f"(*) Quantized {codes.shape[0]} vectors ({mode}, {codes.nbytes / 2 ** 20:.1f} MiB)")
+        return quantizer, codes, matrix
+
+    @staticmethod
+    def _memory_map(matrix: np.ndarray, path: Optional[str]) -> np.memmap:
+        """
+        Write the matrix to `path` (or a temporary file, unlinked once mapped) and map it read-only,
+        so the resident copy can be released.
+        """
+        if path:
+            np.save(path, matrix)
+            return np.load(path, mmap_mode="r")
+        fd, tmp_path = tempfile.mkstemp(prefix="rerank_", suffix=".npy")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                np.save(fh, matrix)
+            return np.load(tmp_path, mmap_mode="r")
+        finally:
+            os.unlink(tmp_path)
+
+    def _build_lexical(self, meta: Sequence, path: Optional[str] = None) -> Optional[BM25Index]:
+        if not self.hybrid:
+            return None
+        k1, b = self.hybrid.get("k1", 1.2), self.hybrid.get("b", 0.75)
+        if path:
+            lexical = BM25Index.load(path, k1=k1, b=b, n_docs=len(meta))
+            if lexical is not None:
+                print(f"(*) Loaded BM25 index from {path}")
+                return lexical
+        documents = [f"{r[self.name_col] or ''} {r[self.description_col] or ''}" for r in meta]
+        return BM25Index(k1=k1, b=b).build(documents)
+
+    def _build_ann(self, matrix: np.ndarray, snapshot_path: Optional[str] = None):
+        """
+        The IVF index shipped in the snapshot, else the one saved at `ann_path`, when built over this
+        matrix with the configured parameters; otherwise a new one (saved to `ann_path`).
+        """
+        if not self.ann_backend or matrix.shape[0] < self.ann_min_rows:
+            return None
+        if self.ann_backend == IVFIndex.name:
+            for path in (snapshot_path, self.ann_path):
+                ann = IVFIndex.load(path, matrix=matrix, **self.ann_params) if path else None
+                if ann is not None:
+                    print(f"(*) Loaded IVF index from {path}")
+                    return ann
+        ann = build_ann_backend(self.ann_backend, **self.ann_params).build(matrix)
+        if self.ann_path:
+            ann.save(self.ann_path)
+        return ann
+
+    def _filter_mask(self, state: dict, region: Optional[str], vendor: Optional[str]) -> Optional[np.ndarray]:
+        """
+        Boolean mask of rows passing the region/vendor filters, or None when no filter applies.
+        """
+        mask = None
+        if region:
+            mask = self._equals_mask(state, "regions", self.region_col, region)
+        if vendor:
+            vendor_mask = self._equals_mask(state, "vendors", self.vendor_col, vendor)
+            mask = vendor_mask if mask is None else mask & vendor_mask
+        return mask
+
+    @staticmethod
+    def _equals_mask(state: dict, key: str, col: int, value: str) -> np.ndarray:
+        if state[key] is None:
+            return state["rows"].equals_mask(col, value)
+        return state[key] == value
+
+    @staticmethod
+    def _ann_shortlist(ann, query: np.ndarray, mask: Optional[np.ndarray], limit: int,
+                       n_probe: Optional[int], probed: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        ANN candidates passing the filters; widens the probe until `limit` candidates survive.
+        `probed` is the shortlist already probed at `n_probe` by a batched caller.
+        """
+        n_probe = n_probe or ann.n_probe
+        shortlist = probed
+        while True:
+            if shortlist is None:
+                shortlist = ann.candidates(query, n_probe=n_probe)
+            if mask is not None:
+                shortlist = shortlist[mask[shortlist]]
+            if len(shortlist) >= limit or n_probe >= ann.n_lists:
+                return shortlist
+            n_probe *= 2
+            shortlist = None
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, limit: int) -> np.ndarray:
+        """
+        Positions of the `limit` highest scores, best first.
+        """
+        if limit >= len(scores):
+            return np.argsort(-scores, kind="stable")
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def _query_matrix(self, state: dict, vectors: Sequence[Sequence[float]]) -> np.ndarray:
+        queries = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        if queries.shape[1] != state["matrix"].shape[1]:
+            raise ValueError(f"Query dimension {queries.shape[1]} != index dimension {state['matrix'].shape[1]}")
+        return normalize_rows(queries)
+
+    def _search_normalized(self, state: dict, query: np.ndarray, region: Optional[str], vendor: Optional[str],
+                           limit: int, n_probe: Optional[int] = None,
+                           full_scores: Optional[np.ndarray] = None, text: Optional[str] = None,
+                           approx_scores: Optional[np.ndarray] = None,
+                           probed: Optional[np.ndarray] = None) -> list[list]:
+        """
+        Top-k for one normalized query. A batched caller passes what it computed for the whole
+        chunk of queries: `full_scores` (query scored against every row), `approx_scores` (the same
+        on the quantized codes) or `probed` (the ANN shortlist). `text` enables hybrid ranking.
+        """
+        mask = self._filter_mask(state, region, vendor)
+        positions = None if mask is None else np.flatnonzero(mask)
+        ann = state["ann"]
+        lexical = state["lexical"] if text else None
+        lexical_scores = None
+        prefiltered = False
+        if lexical is not None:
+            lexical_scores = lexical.score_all(text)
+            hits, _ = lexical.top(text, self.hybrid.get("prefilter_k", 2000), mask=mask, scores=lexical_scores)
+            if len(hits) >= limit:
+                positions, prefiltered = hits, True
+        # A selective filter already leaves fewer rows than a probe would visit: score them exactly.
+        if ann is not None and (positions is None or prefiltered
+                                or len(positions) > len(state["rows"]) // ann.n_lists * ann.n_probe):
+            shortlist = self._ann_shortlist(ann, query, mask, limit, n_probe, probed=probed)
+            positions = np.union1d(positions, shortlist) if prefiltered else shortlist
+
+        if positions is not None and not len(positions):
+            return []
+        if state["quantizer"] is not None:
+            positions, scores = self._two_stage_scores(state, query, positions, limit, approx_scores)
+        elif positions is None:
+            scores = full_scores if full_scores is not None else state["matrix"] @ query
+        else:
+            scores = full_scores[positions] if full_scores is not None else state["matrix"][positions] @ query
+
+        ranking = scores
+        if lexical_scores is not None:
+            bm25 = lexical_scores if positions is None else lexical_scores[positions]
+            top_bm25 = float(bm25.max()) if len(bm25) else 0.0
+            if top_bm25 > 0:
+                alpha = self.hybrid.get("alpha", 0.7)
+                ranking = alpha * scores + (1 - alpha) * (bm25 / top_bm25)
+
+        top = self._top_k(ranking, limit)
+        if positions is not None:
+            rows_at = positions[top]
+        else:
+            rows_at = top
+        return [[*state["rows"][i], float(s)] for i, s in zip(rows_at, scores[top])]
+
+    def _two_stage_scores(self, state: dict, query: np.ndarray, positions: Optional[np.ndarray],
+                          limit: int, approx: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate pass over the quantized codes (`approx`: already scored against every row), then
+        exact float32 scores for the best `rerank_k`.
+        """
+        if approx is None:
+            codes = state["codes"] if positions is None else state["codes"][positions]
+            approx = state["quantizer"].score(codes, query)
+        elif positions is not None:
+            approx = approx[positions]
+        keep = self._top_k(approx, max(limit, self.rerank_k))
+        candidates = np.sort(keep if positions is None else positions[keep])  # sorted: sequential mmap reads
+        return candidates, state["matrix"][candidates] @ query
+
+    def memory_usage(self) -> dict:
+        """
+        Bytes held by the index: scan codes, re-rank vectors (resident or memory-mapped), the total
+        held in process memory (`resident_bytes`: memory-mapped arrays are excluded, their pages
+        live in the shared page cache), plus the footprint every storage mode would need.
+        """
+        state = self._state
+        if state is None:
+            return {"mode": self.quantization.get("mode") or "float32", "rows": 0}
+        matrix, codes = state["matrix"], state["codes"]
+        pq_m = self.quantization.get("pq", {}).get("m", 48)
+        return {
+            "mode": state["quantizer"].mode if state["quantizer"] is not None else "float32",
+            "rows": matrix.shape[0],
+            "dim": matrix.shape[1],
+            "scan_bytes": codes.nbytes if codes is not None else matrix.nbytes,
+            "rerank_bytes": matrix.nbytes if codes is not None else 0,
+            "matrix_memory_mapped": isinstance(matrix, np.memmap),
+            "resident_bytes": sum(array.nbytes for array in (matrix, codes)
+                                  if array is not None and not isinstance(array, np.memmap)),
+            "snapshot_version": state["snapshot_version"],
+            "estimated_bytes_per_mode": estimate_memory(matrix.shape[0], matrix.shape[1], pq_m=pq_m),
+        }
+
+    @property
+    def is_hybrid(self) -> bool:
+        state = self._state
+        return state is not None and state["lexical"] is not None
+
+    def fuse_lexical(self, rows: Sequence, text: str, limit: int = 5) -> list:
+        """
+        Re-rank (metadata..., similarity) rows -- e.g. pgvector candidates -- by
+        `alpha * similarity + (1 - alpha) * normalized BM25` of the text; best `limit` first.
+        Rows are returned unchanged (truncated) when the index is not hybrid.
+        """
+        state = self._state
+        rows = list(rows)
+        if state is None or state["lexical"] is None or not text:
+            return rows[:limit]
+        documents = [f"{row[self.name_col] or ''} {row[self.description_col] or ''}" for row in rows]
+        bm25 = state["lexical"].score_documents(text, documents)
+        similarity = np.array([float(row[-1]) for row in rows], dtype=np.float32)
+        ranking = similarity
+        top_bm25 = float(bm25.max()) if len(bm25) else 0.0
+        if top_bm25 > 0:
+            alpha = self.hybrid.get("alpha", 0.7)
+            ranking = alpha * similarity + (1 - alpha) * (bm25 / top_bm25)
+        return [rows[i] for i in self._top_k(ranking, limit)]
+
+    def search(self, vector: Sequence[float], region: Optional[str] = None,
+               vendor: Optional[str] = None, limit: int = 5, n_probe: Optional[int] = None,
+               text: Optional[str] = None) -> list[list]:
+        state = self._state
+        if state is None or limit <= 0 or vector is None or not len(vector):
+            return []
+        query = self._query_matrix(state, [vector])[0]
+        return self._search_normalized(state, query, region, vendor, limit, n_probe, text=text)
+
+    def search_batch(self, vectors: Sequence[Sequence[float]], filters: Sequence[dict],
+                     chunk_size: int = 32) -> list[list[list]]:
+        """
+        Search many queries at once. `filters[i]` holds the `region`/`vendor`/`limit` (and optional
+        `text` for hybrid ranking) of `vectors[i]`.
+        Each chunk of queries is scored with one matrix-matrix product: against the float32 matrix
+        (exact index), or against the quantized codes for the first pass (quantized index). With an
+        ANN backend, the centroids are probed for the whole chunk at once instead.
+        Results are returned in input order; empty queries yield empty results.
+        """
+        results = [[] for _ in vectors]
+        state = self._state
+        if state is None:
+            return results
+        valid = [i for i, vector in enumerate(vectors)
+                 if vector is not None and len(vector) and filters[i].get("limit", 5) > 0]
+        if not valid:
+            return results
+
+        queries = self._query_matrix(state, [vectors[i] for i in valid])
+        for start in range(0, len(valid), chunk_size):
+            block = queries[start:start + chunk_size]
+            block_scores = block_approx = probed = None
+            if state["ann"] is not None:
+                probed = state["ann"].candidates_batch(block)
+            elif state["quantizer"] is not None:
+                block_approx = state["quantizer"].score_batch(state["codes"], block)
+            else:
+                block_scores = block @ state["matrix"].T
+            for j, query in enumerate(block):
+                i = valid[start + j]
+                params = filters[i]
+                results[i] = self._search_normalized(
+                    state, query, params.get("region"), params.get("vendor"), params.get("limit", 5),
+                    full_scores=None if block_scores is None else block_scores[j], text=params.get("text"),
+                    approx_scores=None if block_approx is None else block_approx[j],
+                    probed=None if probed is None else probed[j]
+                )
+        return results